@@ -1,130 +1,62 @@
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
 import pandas as pd
 import streamlit as st
-from io import BytesIO
-import hashlib
-import time
+
+from paperon.cache import ResultCache, content_key
+from paperon.db import SqliteOrderStore
+from paperon.export import FORMATS, TempExport, missing_formats
+from paperon.ingest import TextSource, decode_upload, read_columns
+from paperon.dedup import POLICIES, POLICY_LABELS, register
+from paperon.jobs import JobQueue, csv_import_job
+from paperon.normalize import to_order_id
+from paperon.profiling import Profiler, stage
+from paperon.recalc import bulk_update, save_order_patch
+from paperon.render import order_card_html, yen_fmt
+from paperon.store import ConflictError, OrderStore, check_revision
 
 st.set_page_config(page_title="PaperOn Sales Mini", page_icon="🧾", layout="wide")
 
 # ======================================================
-# Global CSS: white bg + high-contrast text + compact UI
+# Global CSS (assets/app.css): white bg + high-contrast text + compact UI
 # ＋ Data Editor（編集中セル）の視認性を強化
 # ======================================================
-st.markdown("""
-<style>
-/* Base: force white background and dark text everywhere */
-:root, body, .stApp { background:#FFFFFF !important; color:#0B0B0C !important; }
-.block-container { padding-top: .6rem !important; padding-bottom: 1.0rem !important; }
-
-/* Sidebar visibility */
-section[data-testid="stSidebar"], [data-testid="stSidebar"] {
-  background:#FFFFFF !important; color:#0B0B0C !important;
-}
-[data-testid="stSidebar"] * { color:#0B0B0C !important; }
-[data-testid="stSidebar"] .stMarkdown, [data-testid="stSidebar"] p, 
-[data-testid="stSidebar"] span, [data-testid="stSidebar"] label { color:#0B0B0C !important; }
-
-/* Headings & text */
-h1,h2,h3,h4,h5,h6 { color:#0B0B0C !important; letter-spacing:.2px; }
-h1 { font-weight:800; margin: .2rem 0 .6rem !important; }
-h2 { font-weight:700; margin: .2rem 0 .5rem !important; }
-h3 { font-weight:700; margin: .2rem 0 .4rem !important; }
-p, span, div, small, label { color:#0B0B0C; }
-
-/* Inputs */
-.stTextInput input, .stNumberInput input, textarea, select {
-  color:#0B0B0C !important; background:#FFFFFF !important; border-radius: 10px !important;
-}
-.stSelectbox div[role="combobox"] { color:#0B0B0C !important; }
-[data-baseweb="select"] * { color:#0B0B0C !important; }
-
-/* Data components */
-[data-testid="stDataFrame"] *, [data-testid="stDataEditorGrid"] *, [data-testid="stTable"] * {
-  color:#0B0B0C !important;
-}
+@st.cache_resource
+def app_css():
+    # read once per process; every rerun only re-emits the string
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "app.css"), encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
 
-/* Data Editor: 編集中セルの視認性（白文字＋濃い青背景）*/
-[data-testid="stDataEditorGrid"] [role="gridcell"][aria-selected="true"] {
-  background:#1E3A8A !important; color:#FFFFFF !important; /* 選択セル背景・文字 */
-}
-[data-testid="stDataEditorGrid"] div[contenteditable="true"] {
-  color:#FFFFFF !important; caret-color:#FFFFFF !important; /* 入力中文字色・カーソル */
-}
-[data-testid="stDataEditorGrid"] div[contenteditable="true"]::selection {
-  background:#1D4ED8 !important; color:#FFFFFF !important; /* 入力中文字の選択配色 */
-}
-
-/* Buttons */
-.stButton > button { 
-  border-radius: 12px !important; font-weight: 700 !important; 
-  background:#2563EB !important; color:#FFFFFF !important; border: none !important;
-  padding: .5rem .9rem !important;
-}
-.stButton > button:hover { background:#1D4ED8 !important; color:#FFFFFF !important; }
-
-/* Cards */
-.paperon-card {
-  background:#FAFAFA; color:#0B0B0C;
-  border: 1px solid #ECECEC; border-radius: 14px; 
-  box-shadow: 0 4px 14px rgba(0,0,0,0.04); padding: 14px 14px; margin-bottom: 12px;
-}
-
-/* KPI tiles */
-.kpi {
-  background:#FFFFFF; border:1px solid #EAEAEA; border-radius:14px; padding: 10px 12px;
-}
-.kpi .label { color:#475569; font-size: 12px; font-weight: 700; }
-.kpi .value { color:#0B0B0C; font-size: 20px; font-weight: 800; }
-.kpi .sub   { color:#334155; font-size: 11px; font-weight: 600; }
-
-/* Order cards */
-.order-card {
-  border: 1px solid #EDEDED; border-radius: 16px; padding: 12px 14px; 
-  background: #FFFFFF; box-shadow: 0 3px 12px rgba(0,0,0,0.06);
-}
-.order-id   { font-weight:800; color:#2563EB; font-size: 13px; }
-.order-cust { font-weight:700; font-size: 16px; color:#0B0B0C; }
-.order-meta { color:#334155; font-size:12px; }
-.badge { 
-  display:inline-block; padding:2px 8px; border-radius:9999px; 
-  background:#EFF6FF; color:#1D4ED8; font-size:11px; font-weight:800; border:1px solid #DBEAFE;
-}
-
-/* Sticky CTA */
-.cta-bar {
-  position: sticky; bottom: 6px; z-index: 50;
-  background:#FFFFFFE6; backdrop-filter: blur(6px);
-  border: 1px solid #EDEDED; border-radius: 12px;
-  padding: 8px 10px; box-shadow: 0 8px 24px rgba(0,0,0,0.06);
-}
-
-/* Compact tables/editor spacing */
-[data-testid="stDataFrame"] > div { padding: 0 !important; }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(app_css(), unsafe_allow_html=True)
 
 # =========================
 # Config
 # =========================
-HEADER_COLS = [
-  "supplier.companyName","supplier.department","supplier.personName","supplier.postalCode","supplier.address","supplier.tel","supplier.fax",
-  "orderer.companyName","orderer.department","orderer.personName","orderer.owner","orderer.postalCode","orderer.address","orderer.tel","orderer.fax","orderer.email","orderer.homepage",
-  "totalPriceInfo.totalPrice","totalPriceInfo.subTotalPrice","totalPriceInfo.taxAmount","totalPriceInfo.taxInfo",
-  "subTotals.totalPriceInclude08","subTotals.totalPriceInclude10","subTotals.totalPriceIncludeEtc",
-  "subTotals.subTotalPriceExclude08","subTotals.subTotalPriceExclude10","subTotals.subTotalPriceExcludeEtc",
-  "subTotals.discount","subTotals.taxAmount08","subTotals.taxAmount10","subTotals.taxAmountEtc","subTotals.taxInfo","subTotals.etcAmount"
-]
-ITEM_COLS = [
-  "items.name","items.num","items.count","items.date","items.discount","items.etc","items.quantityUnit",
-  "items.taxExcludedUnitPrice","items.taxExcludedPrice","items.taxIncludedUnitPrice","items.taxIncludedPrice","items.taxAmount","items.taxInfo"
-]
-MONEY_COLS = [
-  "items.taxExcludedUnitPrice","items.taxExcludedPrice","items.taxIncludedUnitPrice","items.taxIncludedPrice","items.taxAmount",
-  "totalPriceInfo.totalPrice","totalPriceInfo.subTotalPrice","totalPriceInfo.taxAmount",
-  "subTotals.totalPriceInclude08","subTotals.totalPriceInclude10","subTotals.totalPriceIncludeEtc",
-  "subTotals.subTotalPriceExclude08","subTotals.subTotalPriceExclude10","subTotals.subTotalPriceExcludeEtc",
-  "subTotals.discount","subTotals.taxAmount08","subTotals.taxAmount10","subTotals.taxAmountEtc","subTotals.etcAmount"
-]
+# a private store per browser session unless PAPERON_DB opts into a shared one
+# (an SQLite file path, or ":memory:" for one in-process store)
+DB_PATH = os.environ.get("PAPERON_DB", ":session:")
+PROFILE_LOG = os.environ.get("PAPERON_PROFILE_LOG")  # JSON lines of the diagnostics runs
+DIAG_KEEP_RUNS = 20
+JOB_WORKERS = int(os.environ.get("PAPERON_JOB_WORKERS", "1"))
+JOB_LABELS = {"queued": "待機中", "running": "処理中", "done": "完了", "error": "エラー", "cancelled": "キャンセル済み", "skipped": "スキップ"}
+PAGES = ["① アップロード＆注文一覧", "② 注文詳細（編集）", "③ 売上分析"]
+PAGE_SIZES = [12, 24, 48, 96]
+SORT_KEYS = {"注文ID": "orderId", "得意先名": "orderer.companyName", "合計": "totalPriceInfo.totalPrice"}
+SEARCH_FIELDS = {"customer": "得意先", "person": "担当者", "item": "商品名", "num": "品番"}
+SELECT_LIMIT = 500  # orders offered by the Page 2 selector at once
+BULK_OPS = {"price": "価格改定（品番ごと）", "discount": "値引き（%）", "tax": "税率変更"}
+SALES_TABS = {"customer": "得意先別", "item": "商品別", "tax": "税率区分別", "date": "期間別"}
+SALES_PERIODS = {"day": "日", "week": "週", "month": "月", "year": "年"}
+SALES_LABELS = {"customer": "得意先名", "num": "品番", "name": "商品名", "bucket": "税率区分", "date": "期間",
+                "orders": "注文数", "subtotal": "小計", "tax": "消費税", "total": "合計",
+                "lines": "明細数", "quantity": "数量", "amount": "金額(税抜)"}
+TAX_BUCKET_LABELS = {"08": "8%（軽減）", "10": "10%", "Etc": "その他"}
+SALES_CHART_TOP = 20  # groups drawn in the customer / item charts
 JAPANESE_LABELS = {
     "orderId": "注文ID",
     "orderer.companyName": "得意先名",
@@ -146,90 +78,141 @@ JAPANESE_LABELS = {
 # =========================
 # Helpers
 # =========================
-def detect_encoding(file):
-    for enc in ["utf-8-sig","cp932","shift_jis","utf-8"]:
-        try:
-            file.seek(0)
-            _ = pd.read_csv(file, nrows=5, encoding=enc)
-            file.seek(0)
-            return enc
-        except Exception:
-            continue
-    return None
-
-def to_number(v):
-    if pd.isna(v): return pd.NA
-    s = str(v).replace(",", "").replace("円", "").strip()
-    try:
-        return pd.to_numeric(s, errors="coerce")
-    except Exception:
-        return pd.NA
-
-def make_order_key(row, present_cols):
-    key_cols = [c for c in [
-        "orderer.companyName","orderer.personName",
-        "totalPriceInfo.subTotalPrice","totalPriceInfo.taxAmount","totalPriceInfo.totalPrice"
-    ] if c in present_cols]
-    parts = [str(row.get(c, "")) for c in key_cols]
-    return "|".join(parts)
-
-def to_order_id(key):
-    h = hashlib.sha1(key.encode("utf-8")).hexdigest()[:8].upper()
-    return f"ORD-{h}"
-
-def normalize_tables(df):
-    present_headers = [c for c in HEADER_COLS if c in df.columns]
-    df_ff = df.copy()
-    if present_headers:
-        df_ff[present_headers] = df_ff[present_headers].ffill()
-
-    if "items.name" not in df_ff.columns:
-        raise ValueError("CSVに 'items.name' 列がありません。PaperOnの出力列名をご確認ください。")
-    items = df_ff[df_ff["items.name"].notna()].copy()
-
-    present_money = [c for c in MONEY_COLS if c in items.columns]
-    for c in present_money:
-        items[c] = items[c].apply(to_number)
-
-    present_cols = items.columns
-    keys = items.apply(lambda r: make_order_key(r, present_cols), axis=1)
-    if (keys == "").all():
-        keys = items.index.astype(str)
-    order_ids = keys.apply(to_order_id)
-    items.insert(0, "orderId", order_ids)
-
-    agg_map = {}
-    for c in ["totalPriceInfo.subTotalPrice","totalPriceInfo.taxAmount","totalPriceInfo.totalPrice"]:
-        if c in items.columns:
-            agg_map[c] = "max"
-
-    base_cols = [c for c in ["orderer.companyName","orderer.personName"] if c in items.columns]
-    orders = items.groupby("orderId", as_index=False).agg({**{c:"first" for c in base_cols}, **agg_map})
-
-    order_cols = ["orderId"] + base_cols + [c for c in ["totalPriceInfo.subTotalPrice","totalPriceInfo.taxAmount","totalPriceInfo.totalPrice"] if c in orders.columns]
-    orders = orders[order_cols]
-    return orders, items
-
-def yen_fmt(x):
-    try:
-        x = float(x)
-        return f"{x:,.0f} 円"
-    except Exception:
-        return "-"
+@st.cache_resource
+def get_result_cache():
+    # process-wide: shared by every session and rerun
+    return ResultCache(max_bytes=int(os.environ.get("PAPERON_CACHE_MB", "256")) * 1024 * 1024)
+
+@st.cache_resource
+def open_db_store(path):
+    # one connection per process, shared by all sessions
+    return SqliteOrderStore(path)
+
+@st.cache_resource
+def open_memory_store():
+    # one in-memory copy for every session of the process (the store is thread-safe)
+    return OrderStore()
+
+def get_store():
+    # ":session:" (the default) keeps a private store per browser session,
+    # ":memory:" shares one in-memory store and a file path one SQLite store between sessions
+    if DB_PATH == ":memory:":
+        return open_memory_store()
+    if DB_PATH == ":session:":
+        if "store" not in st.session_state:
+            st.session_state["store"] = OrderStore()
+        return st.session_state["store"]
+    return open_db_store(DB_PATH)
+
+@st.cache_resource
+def profile_log_handler(path):
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger = logging.getLogger("paperon.profile")
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    return handler
+
+@contextmanager
+def profiled(name):
+    # opt-in (sidebar): per-stage timings of one user action, kept for the diagnostics panel
+    if not st.session_state.get("diag_enabled"):
+        yield None
+        return
+    with Profiler(name, memory=st.session_state.get("diag_memory", False)) as prof:
+        yield prof
+    record_diag_run(name, prof.records())
+
+def record_diag_run(name, records):
+    at = time.strftime("%Y-%m-%dT%H:%M:%S")
+    for rec in records:
+        logging.getLogger("paperon.profile").info(json.dumps({**rec, "at": at}, ensure_ascii=False))
+    runs = st.session_state.setdefault("diag_runs", [])
+    if runs and runs[-1]["name"] == name:
+        runs.pop()  # e.g. one "list" entry per rerun, not one per keystroke
+    runs.append({"name": name, "at": at, "records": records})
+    del runs[:-DIAG_KEEP_RUNS]
+
+def render_diag_panel():
+    if not st.session_state.get("diag_enabled"):
+        return
+    runs = st.session_state.get("diag_runs", [])
+    with diag_panel:
+        if not runs:
+            st.caption("計測結果はまだありません。CSV登録・一覧表示・保存などを行うと表示されます。")
+            return
+        labels = [f"{r['at'][11:]} {r['name']}" for r in runs]
+        i = st.selectbox("計測", range(len(runs)), index=len(runs)-1, format_func=labels.__getitem__, key="diag_run")
+        df = pd.DataFrame(runs[i]["records"]).drop(columns=["run"])
+        st.dataframe(df.rename(columns={"stage": "ステージ", "seconds": "秒", "calls": "回数", "rows": "行数",
+                                        "rows_per_sec": "行/秒", "peak_mb": "ピークMB"}),
+                     use_container_width=True, hide_index=True)
+        jsonl = "".join(pd.DataFrame(r["records"]).assign(at=r["at"]).to_json(orient="records", lines=True, force_ascii=False) for r in runs)
+        st.download_button("JSON Lines をダウンロード", data=jsonl, file_name="paperon_profile.jsonl", mime="application/x-ndjson")
+
+if PROFILE_LOG:
+    profile_log_handler(PROFILE_LOG)
+
+@st.cache_resource
+def get_job_queue():
+    # process-wide worker threads; every session lists only its own jobs
+    return JobQueue(max_workers=JOB_WORKERS)
+
+def session_id():
+    if "session_id" not in st.session_state:
+        st.session_state["session_id"] = uuid.uuid4().hex
+    return st.session_state["session_id"]
+
+def _job_rows(jobs):
+    queue = get_job_queue()
+    for job in jobs:
+        st.markdown(f"**{job.name}** — {JOB_LABELS[job.status]}（{job.seconds:,.0f} 秒）")
+        if job.active:
+            st.progress(min(int(job.progress * 100), 100), text=job.message or JOB_LABELS[job.status])
+            st.button("キャンセル", key=f"job_cancel_{job.id}", on_click=queue.cancel, args=(job.id,))
+        else:
+            if job.status == "error":
+                st.error(job.error)
+            elif job.message:
+                st.caption(job.message)
+            st.button("閉じる", key=f"job_close_{job.id}", on_click=queue.forget, args=(job.id,))
+
+@st.experimental_fragment(run_every=1.0)
+def _jobs_live():
+    # polled while jobs run; the rest of the page stays usable
+    jobs = get_job_queue().jobs(owner=session_id())
+    _job_rows(jobs)
+    if not any(j.active for j in jobs):
+        st.rerun()  # the whole app (st.rerun has no fragment scope in 1.36): show the committed orders and KPIs
+
+def render_jobs_panel():
+    jobs = get_job_queue().jobs(owner=session_id())
+    if not jobs:
+        return
+    reported = st.session_state.setdefault("jobs_reported", set())
+    for job in jobs:
+        if not job.active and job.profile and job.id not in reported:
+            record_diag_run(job.name, job.profile)
+        if not job.active:
+            reported.add(job.id)
+    with st.sidebar:
+        st.markdown("---")
+        st.subheader("登録ジョブ")
+        if any(j.active for j in jobs):
+            _jobs_live()
+        else:
+            _job_rows(jobs)
 
 # =========================
 # State init
 # =========================
-if "orders" not in st.session_state:
-    st.session_state["orders"] = pd.DataFrame()
-if "items" not in st.session_state:
-    st.session_state["items"] = pd.DataFrame()
-if "selected_order" not in st.session_state:
-    st.session_state["selected_order"] = None
-if "tax_rate" not in st.session_state:
-    st.session_state["tax_rate"] = 0.10  # 10%
-if "page" not in st.session_state:
-    st.session_state["page"] = "① アップロード＆注文一覧"
+if "page" not in st.session_state:  # first run of the session
+    st.session_state.update({
+        "selected_order": None,
+        "tax_rate": 0.10,  # 10%
+        "editor_gen": {},  # orderId -> items editor generation (bumped after each save attempt)
+        "page": PAGES[0],
+    })
 
 # =========================
 # Navigation (programmatically switchable)
@@ -237,13 +220,18 @@ if "page" not in st.session_state:
 st.sidebar.header("メニュー")
 page = st.sidebar.radio(
     "ページを選択",
-    ["① アップロード＆注文一覧", "② 注文詳細（編集）"],
-    index=["① アップロード＆注文一覧", "② 注文詳細（編集）"].index(st.session_state["page"]),
+    PAGES,
+    index=PAGES.index(st.session_state["page"]),
     key="page_radio",
 )
 # keep session_state["page"] in sync
 st.session_state["page"] = page
 
+st.sidebar.markdown("---")
+st.sidebar.checkbox("🩺 診断（ステージ別の時間・メモリ）", key="diag_enabled")
+st.sidebar.checkbox("メモリも計測（処理が遅くなります）", key="diag_memory", disabled=not st.session_state.get("diag_enabled"))
+diag_panel = st.sidebar.container()
+
 # =========================
 # Hand-entry (page1 inline)
 # =========================
@@ -296,16 +284,19 @@ def hand_entry_form():
                 "totalPriceInfo.totalPrice": total
             }
 
-            # append
-            st.session_state["items"] = pd.concat([st.session_state["items"], tmp], ignore_index=True)
-            st.session_state["orders"] = pd.concat([st.session_state["orders"], pd.DataFrame([orders_row])], ignore_index=True)
+            # append (an identical entry submitted again is not doubled)
+            report = register(get_store(), pd.DataFrame([orders_row]), tmp)
+            order_id = next(iter(report.collisions.values()), order_id)
             st.session_state["tax_rate"] = tax_rate
-            st.success(f"手入力の注文を登録しました。注文ID: {order_id}  合計: {int(total):,} 円")
+            if report.duplicates:
+                st.warning(f"同じ内容の注文が既に登録されています。注文ID: {order_id}")
+            else:
+                st.success(f"手入力の注文を登録しました。注文ID: {order_id}  合計: {int(total):,} 円")
 
             # Move to detail page immediately
             st.session_state["selected_order"] = order_id
             st.session_state["page"] = "② 注文詳細（編集）"
-            st.experimental_rerun()
+            st.rerun()
 
 # =========================
 # Page 1
@@ -327,93 +318,189 @@ if st.session_state["page"] == "① アップロード＆注文一覧":
         st.markdown('<div class="paperon-card">', unsafe_allow_html=True)
         st.subheader("📥 CSVから注文登録")
         up = st.file_uploader("PaperOnのCSVを選択（Shift_JIS / UTF-8）", type=["csv"], label_visibility="collapsed")
+        st.radio("登録済みの注文が含まれていたら", POLICIES, format_func=POLICY_LABELS.__getitem__, horizontal=True, key="dup_policy")
         if up is not None:
-            enc = detect_encoding(up)
+            cache = get_result_cache()
+            # hash the upload once, not on every rerun (search keystrokes, page switches)
+            if st.session_state.get("upload_key", (None,))[0] != up.file_id:
+                st.session_state["upload_key"] = (up.file_id, content_key(up))
+            ckey = st.session_state["upload_key"][1]
+            probe = cache.get(("probe", ckey))
+            if probe is None:
+                with profiled("upload"):
+                    enc, text = decode_upload(up)
+                    with stage("columns"):
+                        try:
+                            ncols = len(read_columns(TextSource(text))) if enc else 0
+                        except (pd.errors.EmptyDataError, pd.errors.ParserError):
+                            enc, ncols = None, 0  # empty / unparsable: reported like an undecodable file
+                probe = cache.put(("probe", ckey), (enc, ncols))
+            enc, ncols = probe
             if enc is None:
                 st.error("エンコーディング判定に失敗しました。UTF-8 または Shift_JIS で保存して再試行してください。")
             else:
-                df = pd.read_csv(up, encoding=enc)
-                st.info(f"読み込み成功: rows={len(df)}, cols={len(df.columns)}, encoding={enc}")
+                st.info(f"読み込み成功: size={up.size/1024:,.0f} KB, cols={ncols}, encoding={enc}")
                 cols_btn = st.columns([1,1])
                 if cols_btn[0].button("📥 注文登録（CSV）", type="primary"):
-                    prog = st.progress(0, text="正規化しています...")
-                    time.sleep(0.2)
-                    try:
-                        orders, items = normalize_tables(df)
-                        time.sleep(0.2)
-                        for i in range(10):
-                            prog.progress(int((i+1)/10*100), text=f"登録中... {i+1}/10")
-                            time.sleep(0.03)
-                        st.success(f"登録完了：注文 {len(orders)} 件 / 明細 {len(items)} 件")
-                        st.session_state["orders"] = pd.concat([st.session_state["orders"], orders], ignore_index=True)
-                        st.session_state["items"]  = pd.concat([st.session_state["items"], items], ignore_index=True)
-                    except Exception as e:
-                        st.error(f"登録に失敗しました: {e}")
+                    if get_store().has_source(ckey):
+                        st.warning("同じ内容のCSVは既に登録済みのため、スキップしました。")
+                    elif any(j.active and j.name == up.name for j in get_job_queue().jobs(owner=session_id())):
+                        st.info("このファイルは登録処理中です。")
+                    else:
+                        # runs on a worker thread; progress is shown in the sidebar
+                        profile = st.session_state.get("diag_memory", False) if st.session_state.get("diag_enabled") else None
+                        job_fn = csv_import_job(get_store(), up.getvalue(), key=ckey, cache=cache, profile=profile,
+                                                policy=st.session_state["dup_policy"])
+                        get_job_queue().submit(up.name, job_fn, owner=session_id())
+                        st.success("登録を開始しました。進捗はサイドバーに表示されます（処理中も画面を操作できます）。")
+
+        with st.expander("📚 一括インポート（複数ファイル / フォルダ）"):
+            batch_ups = st.file_uploader("複数のCSVを選択", type=["csv"], accept_multiple_files=True, key="batch_files")
+            batch_dir = st.text_input("またはサーバー上のフォルダ（*.csv）", key="batch_dir")
+            n_cpu = os.cpu_count() or 1
+            workers = int(st.number_input("並列プロセス数", min_value=1, max_value=n_cpu, value=n_cpu, key="batch_workers"))
+            if st.button("📥 一括登録", key="batch_register"):
+                from paperon.batch import csv_paths, import_files  # process pool: only loaded when used
+                files = [(u.name, u.getvalue()) for u in batch_ups or []]
+                if batch_dir:
+                    if os.path.isdir(batch_dir):
+                        files += [(p, p) for p in csv_paths(batch_dir)]
+                    else:
+                        st.error(f"フォルダが見つかりません: {batch_dir}")
+                if not files:
+                    st.info("CSVファイルが選択されていません。")
+                else:
+                    prog = st.progress(0, text=f"0/{len(files)} ファイル")
+                    status = st.empty()
+                    done_rows = []
+                    def _on_file(done, total, r):
+                        prog.progress(int(done/total*100), text=f"{done}/{total} ファイル処理済み")
+                        done_rows.append({"ファイル": os.path.basename(r.name), "結果": "OK" if r.error is None else "エラー",
+                                          "明細": 0 if r.items is None else len(r.items), "秒": round(r.seconds, 2), "エラー": r.error or ""})
+                        status.dataframe(pd.DataFrame(done_rows), use_container_width=True, hide_index=True)
+                    with profiled("batch_import"):
+                        with stage("import", len(files)):
+                            res = import_files(files, max_workers=workers, on_file_done=_on_file, skip_key=get_store().has_source)
+                        with stage("merge", len(res.items)):
+                            report = register(get_store(), res.orders, res.items, sources=res.sources, policy=st.session_state["dup_policy"])
+                    labels = {"ok": "登録", "error": "エラー", "duplicate": "重複（同一内容）", "registered": "登録済みのためスキップ"}
+                    status.dataframe(pd.DataFrame([{"ファイル": os.path.basename(f.name), "結果": labels[f.status],
+                                                    "注文": 0 if f.orders is None else len(f.orders), "エラー": f.error or ""} for f in res.files]),
+                                     use_container_width=True, hide_index=True)
+                    st.success(f"一括登録完了：{len(res.sources)} ファイル / 注文 {len(res.orders)} 件 / 明細 {len(res.items)} 件")
+                    if report.message() or res.collisions:
+                        st.info("　".join(filter(None, [report.message(), res.collisions and f"ファイル間のID衝突 {len(res.collisions)} 件を別IDで登録"])))
         st.markdown('</div>', unsafe_allow_html=True)
 
     # Summary
+    store = get_store()
     st.subheader("サマリー")
-    if st.session_state["orders"].empty:
+    if store.empty:
         st.info("まだ注文が登録されていません。")
     else:
-        orders = st.session_state["orders"].copy()
-        total_orders = len(orders)
-        total_amount = pd.to_numeric(orders.get("totalPriceInfo.totalPrice"), errors="coerce").fillna(0).sum() if "totalPriceInfo.totalPrice" in orders.columns else 0
+        kpi = store.summary()  # maintained by the store on every write
         c1, c2, c3 = st.columns(3)
         with c1:
-            st.markdown(f'<div class="kpi"><div class="label">登録済み注文</div><div class="value">{total_orders:,}</div></div>', unsafe_allow_html=True)
+            st.markdown(f'<div class="kpi"><div class="label">登録済み注文</div><div class="value">{kpi["orders"]:,}</div></div>', unsafe_allow_html=True)
         with c2:
-            st.markdown(f'<div class="kpi"><div class="label">合計金額（合算）</div><div class="value">{yen_fmt(total_amount)}</div></div>', unsafe_allow_html=True)
+            st.markdown(f'<div class="kpi"><div class="label">合計金額（合算）</div><div class="value">{yen_fmt(kpi["total_amount"])}</div></div>', unsafe_allow_html=True)
         with c3:
-            if "orderer.companyName" in orders.columns and len(orders):
-                top = orders["orderer.companyName"].value_counts()
-                top_name = top.index[0] if len(top) else "-"
-                cnt = int(top.iloc[0]) if len(top) else 0
-                st.markdown(f'<div class="kpi"><div class="label">最多の得意先</div><div class="value">{top_name}</div><div class="sub">{cnt} 件</div></div>', unsafe_allow_html=True)
+            if kpi["top_customer"] is not None:
+                st.markdown(f'<div class="kpi"><div class="label">最多の得意先</div><div class="value">{kpi["top_customer"]}</div><div class="sub">{kpi["top_customer_orders"]} 件</div></div>', unsafe_allow_html=True)
             else:
                 st.markdown(f'<div class="kpi"><div class="label">最多の得意先</div><div class="value">-</div></div>', unsafe_allow_html=True)
 
     # Orders as cards
     st.subheader("注文リスト")
-    if st.session_state["orders"].empty:
+    if store.empty:
         st.caption("※ 登録が完了するとここに表示されます。")
     else:
-        orders = st.session_state["orders"].copy()
-        cols = st.columns(3)
-        for i, (_, r) in enumerate(orders.iterrows()):
-            with cols[i % 3]:
-                total = yen_fmt(r.get("totalPriceInfo.totalPrice", None))
-                sub = yen_fmt(r.get("totalPriceInfo.subTotalPrice", None))
-                tax = yen_fmt(r.get("totalPriceInfo.taxAmount", None))
-                cust = r.get("orderer.companyName","-")
-                person = r.get("orderer.personName","-")
-
-                st.markdown(f'''
-                <div class="order-card">
-                  <div class="order-id">{r["orderId"]}</div>
-                  <div class="order-cust">{cust}</div>
-                  <div class="order-meta">担当: {person if person else "-"}</div>
-                  <div style="margin-top:8px;">
-                    <span class="badge">小計 {sub}</span>
-                    <span class="badge" style="margin-left:6px;">税 {tax}</span>
-                    <span class="badge" style="margin-left:6px;background:#DCFCE7;border-color:#BBF7D0;color:#166534;">合計 {total}</span>
-                  </div>
-                </div>
-                ''', unsafe_allow_html=True)
-
-                if st.button("詳細を開く", key=f"open_{r['orderId']}"):
-                    st.session_state["selected_order"] = r["orderId"]
-                    st.session_state["page"] = "② 注文詳細（編集）"  # ← ページ2へ
-                    st.experimental_rerun()
+        f1, f2, f3, f4 = st.columns([2,1,1,1])
+        with f1:
+            query = st.text_input("検索（得意先・担当者・商品名・品番）", key="list_query", placeholder="スペース区切りで AND 検索")
+        with f2:
+            sort_label = st.selectbox("並び順", list(SORT_KEYS), key="list_sort")
+        with f3:
+            descending = st.checkbox("降順", key="list_desc")
+        with f4:
+            page_size = st.selectbox("表示件数", PAGE_SIZES, index=1, key="list_page_size")
+
+        with st.expander("詳細条件"):
+            g1, g2, g3, g4 = st.columns([2,1,1,1])
+            with g1:
+                fields = st.multiselect("検索対象", list(SEARCH_FIELDS), default=list(SEARCH_FIELDS), format_func=SEARCH_FIELDS.__getitem__, key="list_fields")
+            with g2:
+                match = st.radio("一致", ["substring", "prefix"], format_func={"substring": "部分一致", "prefix": "前方一致"}.__getitem__, key="list_match")
+            with g3:
+                min_total = st.number_input("合計（円）以上", min_value=0, value=None, step=1000, key="list_min_total")
+            with g4:
+                max_total = st.number_input("合計（円）以下", min_value=0, value=None, step=1000, key="list_max_total")
+
+        opened = None
+        with profiled("list"):
+            with stage("search"):
+                ids = store.search(query, fields or list(SEARCH_FIELDS), match, min_total, max_total)
+            with stage("query"):
+                _, n_match = store.query_orders(None, SORT_KEYS[sort_label], not descending, limit=0, ids=ids)
+                n_pages = max((n_match - 1) // page_size + 1, 1)
+                # seeded through session_state only (no value=), clamped when a filter shrank the result
+                st.session_state["list_page_no"] = min(st.session_state.get("list_page_no", 1), n_pages)
+                page_no = int(st.number_input(f"ページ（全 {n_pages} ページ）", min_value=1, max_value=n_pages, step=1, key="list_page_no"))
+                offset = (page_no - 1) * page_size
+                page_orders, _ = store.query_orders(None, SORT_KEYS[sort_label], not descending, offset=offset, limit=page_size, ids=ids)
+            st.caption(f"{n_match:,} 件中 {min(offset+1, n_match):,}–{offset+len(page_orders):,} 件を表示")
+
+            with stage("render", len(page_orders)):
+                cols = st.columns(3)
+                for i, r in enumerate(page_orders.to_dict("records")):
+                    with cols[i % 3]:
+                        st.markdown(order_card_html(r), unsafe_allow_html=True)
+                        if st.button("詳細を開く", key=f"open_{r['orderId']}"):
+                            opened = r["orderId"]
+        with st.expander(f"🛠 一括編集（対象: 絞り込み中の注文 {n_match:,} 件）"):
+            op = st.radio("操作", list(BULK_OPS), format_func=BULK_OPS.__getitem__, horizontal=True, key="bulk_op")
+            if op == "price":
+                plist = st.data_editor(pd.DataFrame({"品番": pd.Series(dtype=str), "新単価(税抜)": pd.Series(dtype=float)}),
+                                       num_rows="dynamic", use_container_width=True, key="bulk_prices")
+                bulk_kw = {"prices": {str(r["品番"]).strip(): r["新単価(税抜)"] for r in plist.dropna().to_dict("records") if str(r["品番"]).strip()}}
+            elif op == "discount":
+                d1, d2 = st.columns([1,2])
+                pct = d1.number_input("値引率（%）", min_value=0.0, max_value=100.0, value=10.0, step=1.0, key="bulk_pct")
+                nums = d2.text_input("対象の品番（カンマ区切り、空欄で全明細）", key="bulk_nums")
+                bulk_kw = {"discount": pct / 100, "nums": [n.strip() for n in nums.split(",") if n.strip()] or None}
+            else:
+                r1, r2 = st.columns(2)
+                rate08 = r1.number_input("軽減税率（8%対象の明細）", min_value=0.0, max_value=0.3, value=0.08, step=0.01, key="bulk_rate08")
+                rate10 = r2.number_input("標準税率（10%対象・税率なしの明細）", min_value=0.0, max_value=0.3, value=0.10, step=0.01, key="bulk_rate10")
+                bulk_kw = {"tax_rates": {"08": rate08, "10": rate10}}
+            st.caption("単価 × 数量で明細金額を、税率区分（8% / 10%）ごとに小計・消費税・合計を再計算します。変更のある注文だけを書き換えます。")
+            b1, b2 = st.columns(2)
+            preview, apply_bulk = b1.button("プレビュー", key="bulk_preview"), b2.button("一括適用", type="primary", key="bulk_apply")
+            if preview or apply_bulk:
+                targets = store.order_ids() if ids is None else list(ids)
+                with profiled("bulk"), stage("bulk", len(targets)):
+                    res = bulk_update(store, targets, dry_run=not apply_bulk, **bulk_kw)
+                msg = f"注文 {res['orders']:,} 件 / 明細 {res['items']:,} 件、合計 {yen_fmt(res['total_before'])} → {yen_fmt(res['total_after'])}"
+                if apply_bulk:
+                    st.success("一括編集を適用しました：" + msg)
+                else:
+                    st.info("適用すると：" + msg)
+
+        if opened is not None:
+            st.session_state["selected_order"] = opened
+            st.session_state["page"] = "② 注文詳細（編集）"  # ← ページ2へ
+            st.rerun()
 
     st.markdown("---")
     colL, colR = st.columns([1,1])
     with colL:
-        if st.button("🧼 全データ削除（デモ用）"):
-            st.session_state["orders"] = pd.DataFrame()
-            st.session_state["items"]  = pd.DataFrame()
+        # only a ":session:" store is private; any other store is shared by every session
+        confirmed = DB_PATH == ":session:" or st.checkbox("全ユーザー共有のデータをすべて削除する（元に戻せません）", key="confirm_clear")
+        if st.button("🧼 全データ削除（デモ用）", disabled=not confirmed) and confirmed:
+            store.clear()
+            st.session_state.pop("confirm_clear", None)
             st.session_state["selected_order"] = None
-            st.experimental_rerun()
+            st.rerun()
     with colR:
         st.caption("カードのクリックで詳細を開く実装も可能です。")
 
@@ -423,19 +510,45 @@ if st.session_state["page"] == "① アップロード＆注文一覧":
 elif st.session_state["page"] == "② 注文詳細（編集）":
     st.title("📄 注文詳細（入力・編集）")
 
-    if st.session_state["orders"].empty:
+    store = get_store()
+    if store.empty:
         st.info("注文がありません。『① アップロード＆注文一覧』でCSV/手入力から登録してください。")
+        render_jobs_panel()
+        render_diag_panel()
         st.stop()
 
-    order_ids = st.session_state["orders"]["orderId"].tolist()
-    default_id = st.session_state.get("selected_order", order_ids[0])
+    s1, s2 = st.columns([1,2])
+    with s1:
+        find = st.text_input("注文を検索", key="detail_query", placeholder="得意先・担当者・商品名・品番")
+    hits = store.search(find)
+    if hits is None:
+        order_ids = store.order_ids()
+    else:
+        page, n_hits = store.query_orders(sort_by="orderId", limit=SELECT_LIMIT, ids=hits)
+        order_ids = page["orderId"].tolist()
+        if not n_hits:
+            s1.caption("該当する注文がありません。")
+    default_id = st.session_state.get("selected_order")
+    if default_id not in order_ids and default_id in store:
+        order_ids = [default_id] + order_ids  # keep the open order selectable
+    if not order_ids:
+        render_jobs_panel()
+        render_diag_panel()
+        st.stop()
     # keep dropdown synced but allow change
-    order_id = st.selectbox("注文IDを選択", order_ids, index=order_ids.index(default_id) if default_id in order_ids else 0)
+    with s2:
+        order_id = st.selectbox("注文IDを選択", order_ids, index=order_ids.index(default_id) if default_id in order_ids else 0,
+                                format_func=lambda oid: oid if hits is None or oid in hits else f"{oid}（検索外）")
+        if hits is not None and n_hits > SELECT_LIMIT:
+            st.caption(f"{n_hits:,} 件中 {SELECT_LIMIT} 件を表示しています。条件を絞り込んでください。")
     st.session_state["selected_order"] = order_id
 
-    orders = st.session_state["orders"].copy()
-    items = st.session_state["items"].copy()
-    o_row = orders[orders["orderId"]==order_id].head(1).to_dict("records")[0]
+    o_row = store.get_order(order_id)
+    # revision this session's view of the order is based on (optimistic concurrency)
+    seen_revs = st.session_state.setdefault("order_revs", {})
+    current_rev = store.order_revision(order_id)
+    seen_rev = seen_revs.get(order_id, current_rev)
+    next_rev = current_rev  # what this run displays, unless it writes below
 
     # Header summary card
     total = yen_fmt(o_row.get("totalPriceInfo.totalPrice", None))
@@ -479,33 +592,40 @@ elif st.session_state["page"] == "② 注文詳細（編集）":
 
         saved_header = st.form_submit_button("ヘッダを保存")
         if saved_header:
-            idx = orders.index[orders["orderId"]==order_id][0]
-            orders.at[idx,"orderer.companyName"] = cust
-            orders.at[idx,"orderer.personName"] = person
             def _num(x):
                 try: return float(str(x).replace(","," ").replace("円"," ").strip())
                 except: return None
-            if "totalPriceInfo.subTotalPrice" in orders.columns:
-                orders.at[idx,"totalPriceInfo.subTotalPrice"] = _num(sub_total)
-            if "totalPriceInfo.taxAmount" in orders.columns:
-                orders.at[idx,"totalPriceInfo.taxAmount"] = _num(tax_v)
-            if "totalPriceInfo.totalPrice" in orders.columns:
-                orders.at[idx,"totalPriceInfo.totalPrice"] = _num(total_v)
-            st.session_state["orders"] = orders
-            st.success("ヘッダを保存しました。")
+            fields = {"orderer.companyName": cust, "orderer.personName": person}
+            if "totalPriceInfo.subTotalPrice" in o_row:
+                fields["totalPriceInfo.subTotalPrice"] = _num(sub_total)
+            if "totalPriceInfo.taxAmount" in o_row:
+                fields["totalPriceInfo.taxAmount"] = _num(tax_v)
+            if "totalPriceInfo.totalPrice" in o_row:
+                fields["totalPriceInfo.totalPrice"] = _num(total_v)
+            try:
+                with store.transaction():
+                    check_revision(store, order_id, seen_rev)
+                    store.update_order(order_id, fields)
+                    next_rev = store.order_revision(order_id)
+                st.success("ヘッダを保存しました。")
+            except ConflictError:
+                st.warning("この注文は他のユーザーが更新したため、保存しませんでした。最新の内容を表示しています。")
 
     # Items editor
     st.subheader("明細（編集可能）")
     item_cols_show = ["items.name","items.num","items.count","items.quantityUnit","items.taxExcludedUnitPrice","items.taxExcludedPrice"]
+    items = store.order_items(order_id)
     item_cols_show = [c for c in item_cols_show if c in items.columns]
-    df_items = items[items["orderId"]==order_id][["orderId"]+item_cols_show].copy().reset_index(drop=True)
+    df_items = items[["orderId"]+item_cols_show]
     j_cols = {k:JAPANESE_LABELS.get(k,k) for k in df_items.columns}
     df_show = df_items.rename(columns=j_cols)
-    edited = st.data_editor(
+    # a fresh editor after each save, so the saved edits are not replayed on the new rows
+    editor_key = f"editor_{order_id}_{st.session_state['editor_gen'].get(order_id, 0)}"
+    st.data_editor(
         df_show.drop(columns=["注文ID"]),
         num_rows="dynamic",
         use_container_width=True,
-        key=f"editor_{order_id}"
+        key=editor_key
     )
 
     # Sticky CTA
@@ -514,47 +634,87 @@ elif st.session_state["page"] == "② 注文詳細（編集）":
     with colA:
         save_clicked = st.button("🖫 明細を保存して再計算", type="primary")
     with colB:
-        if st.button("💾 Excelエクスポート"):
-            def _download_excel(orders, items):
-                buf = BytesIO()
-                with pd.ExcelWriter(buf, engine="xlsxwriter") as xw:
-                    orders.to_excel(xw, index=False, sheet_name="Orders")
-                    items.to_excel(xw, index=False, sheet_name="OrderItems")
-                return buf.getvalue()
-            data = _download_excel(st.session_state["orders"], st.session_state["items"]) 
-            st.download_button("ダウンロード", data=data, file_name="sales_after_edit.xlsx",
-                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        missing = missing_formats()
+        fmt = st.selectbox("エクスポート形式", [f for f in FORMATS if f not in missing], format_func=lambda f: f.upper(), key="export_fmt", label_visibility="collapsed")
+        for f, mod in missing.items():
+            st.caption(f"{f.upper()} 出力には {mod} が必要です（pip install {mod}）")
+        if st.button("💾 エクスポート"):
+            # written batch-wise to a temp file; only rebuilt when asked for again
+            # (TempExport deletes the file when replaced, or when the session is gone)
+            prev = st.session_state.get("export")
+            if prev:
+                prev["file"].remove()
+            st.session_state["export"] = {"file": TempExport(store, fmt), "fmt": fmt, "version": store.version}
+        exp = st.session_state.get("export")
+        if exp and (exp["fmt"] != fmt or exp["version"] != store.version):
+            exp["file"].remove()  # stale: deleted on this rerun instead of lingering in the temp dir
+            exp = st.session_state["export"] = None
+        if exp and os.path.exists(exp["file"].path):
+            file_name, mime = FORMATS[fmt]
+            with open(exp["file"].path, "rb") as f:
+                st.download_button("ダウンロード", data=f, file_name=file_name, mime=mime)
     with colC:
         st.caption("税率や数量を編集して保存すると小計/税/合計を再計算します。")
     st.markdown('</div>', unsafe_allow_html=True)
 
     if save_clicked:
+        # only what the editor reports as changed is written (the other rows and hidden columns stay)
         inv_map = {v:k for k,v in j_cols.items()}
-        edited_internal = edited.rename(columns=inv_map)
-        new_items = items[items["orderId"]!=order_id].copy()
-        edited_internal.insert(0, "orderId", order_id)
+        state = st.session_state.get(editor_key) or {}
+        cells = lambda row: {inv_map[k]: v for k, v in row.items() if k in inv_map}
+        updates = {int(p): cells(row) for p, row in state.get("edited_rows", {}).items()}
+        added = pd.DataFrame([cells(row) for row in state.get("added_rows", [])], columns=item_cols_show)
+        deleted = state.get("deleted_rows", [])
+        try:
+            with profiled("save"), stage("save", len(updates) + len(added) + len(deleted)), store.transaction():
+                totals = save_order_patch(store, order_id, float(st.session_state["tax_rate"]), updates, added, deleted,
+                                          expected_revision=seen_rev)
+                next_rev = store.order_revision(order_id)
+            subtotal, tax, total = (totals[c] for c in ["totalPriceInfo.subTotalPrice", "totalPriceInfo.taxAmount", "totalPriceInfo.totalPrice"])
+            st.success(f"保存しました。小計: {subtotal:,.0f} 円 / 税: {tax:,.0f} 円 / 合計: {total:,.0f} 円")
+        except ConflictError:
+            st.warning("この注文は他のユーザーが更新したため、保存しませんでした。最新の内容を表示しています。編集をやり直してください。")
+        st.session_state["editor_gen"][order_id] = st.session_state["editor_gen"].get(order_id, 0) + 1
+
+    seen_revs[order_id] = next_rev
 
-        if "items.taxExcludedUnitPrice" in edited_internal.columns and "items.count" in edited_internal.columns:
-            try:
-                edited_internal["items.taxExcludedPrice"] = pd.to_numeric(edited_internal["items.taxExcludedUnitPrice"], errors="coerce") * pd.to_numeric(edited_internal["items.count"], errors="coerce")
-            except Exception:
-                pass
-
-        subtotal = 0.0
-        if "items.taxExcludedPrice" in edited_internal.columns:
-            subtotal = pd.to_numeric(edited_internal["items.taxExcludedPrice"], errors="coerce").fillna(0).sum()
-
-        tax_rate = float(st.session_state["tax_rate"])
-        tax = round(subtotal * tax_rate, 0)
-        total = subtotal + tax
-
-        if "totalPriceInfo.subTotalPrice" in orders.columns:
-            orders.loc[orders["orderId"]==order_id, "totalPriceInfo.subTotalPrice"] = subtotal
-        if "totalPriceInfo.taxAmount" in orders.columns:
-            orders.loc[orders["orderId"]==order_id, "totalPriceInfo.taxAmount"] = tax
-        if "totalPriceInfo.totalPrice" in orders.columns:
-            orders.loc[orders["orderId"]==order_id, "totalPriceInfo.totalPrice"] = total
-
-        st.session_state["orders"] = orders
-        st.session_state["items"]  = pd.concat([new_items, edited_internal], ignore_index=True)
-        st.success(f"保存しました。小計: {subtotal:,.0f} 円 / 税: {tax:,.0f} 円 / 合計: {total:,.0f} 円")
+# =========================
+# Page 3
+# =========================
+elif st.session_state["page"] == "③ 売上分析":
+    st.title("📊 売上分析")
+    st.caption("集計はストアが登録・編集・削除のたびに差分で更新します（変更のあった注文の分だけ再集計）。")
+
+    store = get_store()
+    if store.empty:
+        st.info("注文がありません。『① アップロード＆注文一覧』でCSV/手入力から登録してください。")
+        render_jobs_panel()
+        render_diag_panel()
+        st.stop()
+
+    period = st.radio("期間の単位", list(SALES_PERIODS), index=2, format_func=SALES_PERIODS.__getitem__, horizontal=True, key="sales_period")
+    with profiled("analytics"):
+        with stage("sales"):
+            tables = {dim: store.sales(dim, period if dim == "date" else None) for dim in SALES_TABS}
+    for tab, (dim, df) in zip(st.tabs(list(SALES_TABS.values())), tables.items()):
+        with tab:
+            if not len(df):
+                st.caption("データがありません。")
+                continue
+            df = df.copy()
+            for key in ("customer", "num", "name", "date"):
+                if key in df.columns:
+                    df[key] = df[key].replace("", "（未設定）")
+            if dim == "tax":
+                df["bucket"] = df["bucket"].map(TAX_BUCKET_LABELS)
+            label = {"customer": "customer", "item": "name", "tax": "bucket", "date": "date"}[dim]
+            value = "total" if dim == "customer" else "amount"
+            chart = df if dim in ("tax", "date") else df.head(SALES_CHART_TOP)
+            st.bar_chart(chart.set_index(label)[value].rename(SALES_LABELS[value]), height=260)
+            if dim == "item" and len(df) > SALES_CHART_TOP:
+                st.caption(f"グラフは上位 {SALES_CHART_TOP} 商品（全 {len(df):,} 商品）")
+            cols = {**SALES_LABELS, "tax": "消費税（概算）"} if dim == "tax" else SALES_LABELS
+            st.dataframe(df.rename(columns=cols), use_container_width=True, hide_index=True)
+
+render_jobs_panel()
+render_diag_panel()
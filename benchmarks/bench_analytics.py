@@ -0,0 +1,72 @@
+"""Sales analytics per item count: first build, refresh after an edit, full recompute.
+
+    python -m benchmarks.bench_analytics [n_items ...]
+
+"build" is the first ``sales()`` call of a store (memory: one pass over the
+frames, sqlite: one GROUP BY per dimension). "edit" is one Page 2 save (a
+quantity change) plus reading all four tables again, i.e. the incremental
+refresh; "full" is the four group-bys recomputed over every item, what the
+dashboard would cost per rerun without the running totals.
+"""
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+from paperon.analytics import SalesIndex
+from paperon.db import SqliteOrderStore
+from paperon.ingest import read_normalized_csv
+from paperon.recalc import save_order_patch
+from paperon.store import OrderStore
+from benchmarks.synth import synth_csv
+
+DIMS = ["customer", "item", "tax", "date"]
+
+
+def _ms(fn, repeat=10):
+    runs = []
+    for k in range(repeat):
+        t0 = time.perf_counter()
+        fn(k)
+        runs.append((time.perf_counter() - t0) * 1e3)
+    return statistics.median(runs)
+
+
+def _tables(store, period="month"):
+    for dim in DIMS:
+        store.sales(dim, period if dim == "date" else None)
+
+
+def main(sizes):
+    warnings.simplefilter("ignore")
+    print(f"{'items':>9} {'store':>7} {'build[s]':>9} {'edit[ms]':>9} {'full[ms]':>9}")
+    for n_items in sizes:
+        orders, items = read_normalized_csv(io.BytesIO(synth_csv(max(n_items // 5, 1))), "utf-8-sig")
+        with tempfile.TemporaryDirectory() as tmp:
+            for kind, store in (("memory", OrderStore()), ("sqlite", SqliteOrderStore(os.path.join(tmp, "bench.db")))):
+                store.append(orders, items)
+                t0 = time.perf_counter()
+                _tables(store)
+                build = time.perf_counter() - t0
+                ids = store.order_ids()
+
+                def edit(k):
+                    save_order_patch(store, ids[k * 7 % len(ids)], 0.10, {0: {"items.count": k % 9 + 1}})
+                    _tables(store)
+
+                def full(_):
+                    index = SalesIndex()
+                    index.add(store.orders_frame(), store.items_frame())
+                    for dim in DIMS:
+                        index.table(dim, "month" if dim == "date" else None)
+                full_ms = _ms(full, 3) if kind == "memory" else float("nan")
+                print(f"{len(items):>9} {kind:>7} {build:>9.2f} {_ms(edit):>9.1f} {full_ms:>9.1f}", flush=True)
+                if kind == "sqlite":
+                    store.close()
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100_000, 1_000_000])
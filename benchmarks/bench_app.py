@@ -0,0 +1,80 @@
+"""Cold start and rerun latency of the Streamlit app (run through streamlit's AppTest).
+
+    python -m benchmarks.bench_app [n_items ...]
+
+"cold" is a fresh interpreter until the first script run has finished (imports
+included), i.e. what the first request of a new process waits for. The rerun
+columns are medians over repeated reruns of one session: page 1 unchanged,
+switching between page 1 and page 2, and page 2 unchanged. The app runs on a
+temporary SQLite store filled with synthetic orders.
+"""
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+PAGES = ["① アップロード＆注文一覧", "② 注文詳細（編集）"]
+_COLD = f"""
+import time, warnings
+t0 = time.perf_counter()
+warnings.simplefilter("ignore")
+from streamlit.testing.v1 import AppTest
+AppTest.from_file({APP!r}, default_timeout=120).run()
+print(time.perf_counter() - t0)
+"""
+
+
+def _fill(path, n_items):
+    from paperon.db import SqliteOrderStore
+    from paperon.ingest import read_normalized_csv
+    from benchmarks.synth import synth_csv
+    orders, items = read_normalized_csv(io.BytesIO(synth_csv(max(n_items // 5, 1))), "utf-8-sig")
+    store = SqliteOrderStore(path)
+    store.append(orders, items)
+    store.close()
+
+
+def _cold(repeat):
+    runs = [float(subprocess.run([sys.executable, "-c", _COLD], capture_output=True, text=True, check=True).stdout)
+            for _ in range(repeat)]
+    return min(runs)
+
+
+def _median_ms(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - t0) * 1e3)
+    return statistics.median(runs)
+
+
+def main(sizes, repeat=15):
+    warnings.simplefilter("ignore")
+    from streamlit.testing.v1 import AppTest
+    print(f"{'items':>9} {'cold[s]':>8} {'page1[ms]':>10} {'switch[ms]':>11} {'page2[ms]':>10}")
+    for n_items in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["PAPERON_DB"] = os.path.join(tmp, "bench.db")
+            _fill(os.environ["PAPERON_DB"], n_items)
+            cold = _cold(3)
+            at = AppTest.from_file(APP, default_timeout=120).run()
+            page1 = _median_ms(at.run, repeat)
+            shown = [0]
+
+            def switch():
+                shown[0] ^= 1
+                at.radio(key="page_radio").set_value(PAGES[shown[0]]).run()
+            switch_ms = _median_ms(switch, repeat * 2)
+            at.radio(key="page_radio").set_value(PAGES[1]).run()
+            page2 = _median_ms(at.run, repeat)
+            print(f"{n_items:>9} {cold:>8.2f} {page1:>10.1f} {switch_ms:>11.1f} {page2:>10.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000])
@@ -0,0 +1,65 @@
+"""Export time and peak Python memory vs item count.
+
+    python -m benchmarks.bench_export [n_items ...]
+
+"excel_inmem" is the previous pd.ExcelWriter-into-BytesIO export; the others
+are the batch-wise writers in paperon.export (written to a temp file).
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+import pandas as pd
+
+from paperon.export import export_to_tempfile
+from paperon.ingest import read_normalized_csv
+from paperon.store import OrderStore
+from benchmarks.synth import synth_csv
+
+
+def _excel_inmem(store):
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="xlsxwriter") as xw:
+        store.orders_frame().to_excel(xw, index=False, sheet_name="Orders")
+        store.items_frame().to_excel(xw, index=False, sheet_name="OrderItems")
+    return buf.getvalue()
+
+
+def _streamed(fmt):
+    def run(store):
+        os.remove(export_to_tempfile(store, fmt))
+    return run
+
+
+CASES = {"excel_inmem": _excel_inmem, "xlsx": _streamed("xlsx"), "csv": _streamed("csv"), "parquet": _streamed("parquet")}
+
+
+def measure(fn, store):
+    t0 = time.perf_counter()
+    fn(store)
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn(store)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(sizes):
+    warnings.simplefilter("ignore")
+    print(f"{'items':>9} {'case':>12} {'time[s]':>8} {'peak[MB]':>9}")
+    for n_items in sizes:
+        orders, items = read_normalized_csv(io.BytesIO(synth_csv(max(n_items // 5, 1))), "utf-8-sig")
+        store = OrderStore()
+        store.append(orders, items)
+        store.items_frame()  # the in-memory export reads this cached frame
+        for name, fn in CASES.items():
+            elapsed, peak = measure(fn, store)
+            print(f"{len(items):>9,} {name:>12} {elapsed:>8.2f} {peak / 2**20:>9.1f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 50_000])
@@ -0,0 +1,38 @@
+"""Store memory per item count: wide normalized frames vs the compact encoding.
+
+    python -m benchmarks.bench_memory [n_items ...]
+
+"wide" is what the store used to keep (the normalized items frame as is, one
+object column per CSV field); "compact" is ``OrderStore.memory_usage()``.
+"""
+import io
+import sys
+import time
+import warnings
+
+from paperon.ingest import read_normalized_csv
+from paperon.store import OrderStore
+from benchmarks.synth import synth_csv
+
+
+def main(sizes):
+    warnings.simplefilter("ignore")
+    print(f"{'items':>9} {'wide[MB]':>9} {'compact[MB]':>12} {'ratio':>6} {'append[s]':>10} {'order_items[ms]':>16}")
+    for n_items in sizes:
+        orders, items = read_normalized_csv(io.BytesIO(synth_csv(max(n_items // 5, 1))), "utf-8-sig")
+        wide = orders.memory_usage(deep=True).sum() + items.memory_usage(deep=True).sum()
+        store = OrderStore()
+        t0 = time.perf_counter()
+        store.append(orders, items)
+        append_s = time.perf_counter() - t0
+        ids = store.order_ids()[::max(len(orders) // 200, 1)]
+        t0 = time.perf_counter()
+        for oid in ids:
+            store.order_items(oid)
+        per_order = (time.perf_counter() - t0) / len(ids) * 1e3
+        compact = store.memory_usage()
+        print(f"{len(items):>9} {wide / 1e6:>9.1f} {compact / 1e6:>12.1f} {wide / compact:>6.1f} {append_s:>10.2f} {per_order:>16.2f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100_000])
@@ -0,0 +1,72 @@
+"""Row-wise (legacy) vs columnar normalize_tables.
+
+    python -m benchmarks.bench_normalize [n_items ...]
+"""
+import io
+import sys
+import time
+
+import pandas as pd
+
+from paperon.normalize import normalize_tables, to_order_id
+from paperon.schema import HEADER_COLS, MONEY_COLS
+from benchmarks.synth import synth_csv
+
+
+# ---- legacy implementation (per-cell apply + per-row hashing), kept for comparison ----
+def _to_number(v):
+    if pd.isna(v): return pd.NA
+    s = str(v).replace(",", "").replace("円", "").strip()
+    try:
+        return pd.to_numeric(s, errors="coerce")
+    except Exception:
+        return pd.NA
+
+
+def _make_order_key(row, present_cols):
+    key_cols = [c for c in [
+        "orderer.companyName","orderer.personName",
+        "totalPriceInfo.subTotalPrice","totalPriceInfo.taxAmount","totalPriceInfo.totalPrice"
+    ] if c in present_cols]
+    return "|".join(str(row.get(c, "")) for c in key_cols)
+
+
+def normalize_tables_rowwise(df):
+    present_headers = [c for c in HEADER_COLS if c in df.columns]
+    df_ff = df.copy()
+    if present_headers:
+        df_ff[present_headers] = df_ff[present_headers].ffill()
+    items = df_ff[df_ff["items.name"].notna()].copy()
+    for c in [c for c in MONEY_COLS if c in items.columns]:
+        items[c] = items[c].apply(_to_number)
+    present_cols = items.columns
+    keys = items.apply(lambda r: _make_order_key(r, present_cols), axis=1)
+    items.insert(0, "orderId", keys.apply(to_order_id))
+    agg_map = {c: "max" for c in ["totalPriceInfo.subTotalPrice","totalPriceInfo.taxAmount","totalPriceInfo.totalPrice"] if c in items.columns}
+    base_cols = [c for c in ["orderer.companyName","orderer.personName"] if c in items.columns]
+    orders = items.groupby("orderId", as_index=False).agg({**{c:"first" for c in base_cols}, **agg_map})
+    return orders[["orderId"] + base_cols + list(agg_map)], items
+
+
+def _best_of(fn, df, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(df)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(sizes):
+    print(f"{'items':>9} {'rowwise[s]':>11} {'columnar[s]':>12} {'speedup':>8}  same")
+    for n_items in sizes:
+        df = pd.read_csv(io.BytesIO(synth_csv(max(n_items // 5, 1))), encoding="utf-8-sig")
+        repeat = 3 if n_items <= 50_000 else 1
+        t_old, (o_old, i_old) = _best_of(normalize_tables_rowwise, df, repeat)
+        t_new, (o_new, i_new) = _best_of(normalize_tables, df, repeat)
+        same = o_old.equals(o_new) and i_old["orderId"].equals(i_new["orderId"])
+        print(f"{len(df):>9,} {t_old:>11.3f} {t_new:>12.3f} {t_old / t_new:>7.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000])
@@ -0,0 +1,49 @@
+"""Search latency per item count: index build, then text / range queries.
+
+    python -m benchmarks.bench_search [n_items ...]
+
+"scan" is the same text query as a pandas ``str.contains`` over the stored
+frames (what filtering without an index costs); the index columns are the
+median of repeated ``OrderStore.search`` calls.
+"""
+import io
+import statistics
+import sys
+import time
+import warnings
+
+from paperon.ingest import read_normalized_csv
+from paperon.store import OrderStore
+from benchmarks.synth import synth_csv
+
+QUERIES = [("得意先12", {}), ("商品7", {"fields": ("item",)}), ("p-0001", {"fields": ("num",), "match": "prefix"}),
+           ("", {"min_total": 50_000, "max_total": 60_000})]
+
+
+def _ms(fn, repeat=20):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - t0) * 1e3)
+    return statistics.median(runs)
+
+
+def main(sizes):
+    warnings.simplefilter("ignore")
+    print(f"{'items':>9} {'build[s]':>9} {'scan[ms]':>9} " + " ".join(f"{q or 'range':>12}" for q, _ in QUERIES) + "  [ms]")
+    for n_items in sizes:
+        orders, items = read_normalized_csv(io.BytesIO(synth_csv(max(n_items // 5, 1))), "utf-8-sig")
+        store = OrderStore()
+        store.append(orders, items)
+        t0 = time.perf_counter()
+        store.search("x")
+        build = time.perf_counter() - t0
+        frame = store.items_frame()
+        scan = _ms(lambda: set(frame.loc[frame["orderer.companyName"].astype(str).str.contains("得意先12", regex=False), "orderId"]), 3)
+        lat = [_ms(lambda: store.search(q, **kw)) for q, kw in QUERIES]
+        print(f"{len(items):>9} {build:>9.2f} {scan:>9.1f} " + " ".join(f"{v:>12.2f}" for v in lat))
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100_000])
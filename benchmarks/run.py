@@ -0,0 +1,210 @@
+"""End-to-end benchmark suite: time and peak Python memory per pipeline stage.
+
+    python -m benchmarks.run --sizes 1k,10k,100k --json results.json
+    python -m benchmarks.run --sizes 1k,10k --compare results.json
+
+Sizes are item rows (the synthetic exports average 5 items per order, 1-9 per
+order). Every stage is timed ``--repeat`` times (best run kept) and then run
+once more under tracemalloc for its peak; ``--no-memory`` skips that pass,
+which is worth doing at 1m. The JSON output carries the commit and library
+versions so results from different commits can be compared with --compare.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import pandas as pd
+
+from paperon.export import export_to_tempfile
+from paperon.ingest import decode_upload, read_normalized_csv
+from paperon.normalize import normalize_tables
+from paperon.recalc import save_order_patch
+from paperon.render import order_card_html
+from benchmarks.synth import synth_frame
+
+ITEMS_PER_ORDER = (1, 9)
+PAGE_SIZE = 24
+SAVES = 50
+
+
+def parse_size(s):
+    s = s.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1:], 1)
+    return int(float(s.rstrip("km")) * mult)
+
+
+def _make_store(kind, tmpdir):
+    if kind == "sqlite":
+        from paperon.db import SqliteOrderStore
+        return SqliteOrderStore(os.path.join(tmpdir, f"bench-{time.monotonic_ns()}.db"))
+    from paperon.store import OrderStore
+    return OrderStore()
+
+
+class Fixture:
+    """Inputs shared by the stages of one size."""
+
+    def __init__(self, n_items, store_kind, tmpdir):
+        n_orders = max(n_items // 5, 1)
+        self.raw = synth_frame(n_orders, ITEMS_PER_ORDER)
+        text = self.raw.to_csv(index=False)
+        self.csv = {enc: text.encode(enc) for enc in ("utf-8-sig", "cp932")}
+        self.orders, self.items = read_normalized_csv(io.BytesIO(self.csv["utf-8-sig"]), "utf-8-sig")
+        self.store = _make_store(store_kind, tmpdir)
+        self.store.append(self.orders, self.items)
+        ids = self.store.order_ids()
+        self.save_ids = ids[:: max(len(ids) // SAVES, 1)][:SAVES]
+
+
+def _decode(enc):
+    return lambda fx: decode_upload(io.BytesIO(fx.csv[enc]))
+
+
+def _read_csv(fx):
+    read_normalized_csv(io.BytesIO(fx.csv["cp932"]), "cp932")
+
+
+def _normalize(fx):
+    normalize_tables(fx.raw)
+
+
+def _render_all(fx):
+    # the card loop before pagination: every order through iterrows
+    for _, r in fx.store.orders_frame().iterrows():
+        order_card_html(r)
+
+
+def _render_page(fx):
+    page, _ = fx.store.query_orders(sort_by="orderId", offset=0, limit=PAGE_SIZE)
+    for r in page.to_dict("records"):
+        order_card_html(r)
+
+
+def _save(fx):
+    # one edited quantity per order, as the Page 2 editor reports it
+    for k, oid in enumerate(fx.save_ids):
+        save_order_patch(fx.store, oid, 0.10, {0: {"items.count": k % 9 + 1}})
+
+
+def _export(fmt):
+    return lambda fx: os.remove(export_to_tempfile(fx.store, fmt))
+
+
+STAGES = {
+    "decode_utf8sig": _decode("utf-8-sig"),
+    "decode_cp932": _decode("cp932"),
+    "read_csv_cp932": _read_csv,
+    "normalize_tables": _normalize,
+    "render_all_iterrows": _render_all,
+    "render_page": _render_page,
+    f"save_x{SAVES}": _save,
+    "export_xlsx": _export("xlsx"),
+    "export_csv": _export("csv"),
+    "export_parquet": _export("parquet"),
+}
+
+
+def measure(fn, fx, repeat, memory):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(fx)
+        best = min(best, time.perf_counter() - t0)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fn(fx)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, peak
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, stages, repeat=3, memory=True, store_kind="memory", on_result=None):
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n_items in sizes:
+            fx = Fixture(n_items, store_kind, tmpdir)
+            for name in stages:
+                seconds, peak = measure(STAGES[name], fx, repeat, memory)
+                res = {"stage": name, "size": n_items, "items": len(fx.items), "orders": len(fx.orders),
+                       "seconds": round(seconds, 6), "peak_mb": None if peak is None else round(peak / 1e6, 3)}
+                results.append(res)
+                if on_result is not None:
+                    on_result(res)
+            if hasattr(fx.store, "close"):
+                fx.store.close()
+    return {
+        "meta": {"commit": _git_commit(), "python": platform.python_version(), "pandas": pd.__version__,
+                 "platform": platform.platform(), "store": store_kind, "repeat": repeat,
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+
+
+def _print_row(res):
+    peak = "-" if res["peak_mb"] is None else f"{res['peak_mb']:.1f}"
+    print(f"{res['size']:>9} {res['stage']:>20} {res['seconds']:>9.4f} {peak:>9}", file=sys.stderr, flush=True)
+
+
+def compare(old, new):
+    """Print new/old ratios for every (stage, size) present in both runs."""
+    base = {(r["stage"], r["size"]): r for r in old["results"]}
+    print(f"old {old['meta'].get('commit')} -> new {new['meta'].get('commit')}")
+    print(f"{'size':>9} {'stage':>20} {'old[s]':>9} {'new[s]':>9} {'x':>6} {'old[MB]':>8} {'new[MB]':>8}")
+    for r in new["results"]:
+        o = base.get((r["stage"], r["size"]))
+        if o is None:
+            continue
+        ratio = o["seconds"] / r["seconds"] if r["seconds"] else float("inf")
+        mem = [f"{m:.1f}" if m is not None else "-" for m in (o["peak_mb"], r["peak_mb"])]
+        print(f"{r['size']:>9} {r['stage']:>20} {o['seconds']:>9.4f} {r['seconds']:>9.4f} {ratio:>6.2f} {mem[0]:>8} {mem[1]:>8}")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    p.add_argument("--sizes", default="1k,10k,100k", help="comma separated item counts, e.g. 1k,10k,100k,1m")
+    p.add_argument("--stages", default=",".join(STAGES), help="comma separated subset of: " + ", ".join(STAGES))
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--no-memory", action="store_true")
+    p.add_argument("--store", choices=["memory", "sqlite"], default="memory")
+    p.add_argument("--json", help="write the results here")
+    p.add_argument("--compare", help="a previous --json output to compare against")
+    a = p.parse_args(argv)
+    stages = [s for s in a.stages.split(",") if s]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        p.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    warnings.simplefilter("ignore")
+    print(f"{'size':>9} {'stage':>20} {'time[s]':>9} {'peak[MB]':>9}", file=sys.stderr)
+    out = run([parse_size(s) for s in a.sizes.split(",")], stages, a.repeat, not a.no_memory, a.store, _print_row)
+    if a.json:
+        with open(a.json, "w", encoding="utf-8") as f:
+            json.dump(out, f, ensure_ascii=False, indent=1)
+    if a.compare:
+        with open(a.compare, encoding="utf-8") as f:
+            compare(json.load(f), out)
+    if not a.json and not a.compare:
+        json.dump(out, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Synthetic PaperOn CSV exports for benchmarks.
+
+    python -m benchmarks.synth out.csv --orders 20000 --items 5 --encoding cp932
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from paperon.schema import HEADER_COLS, ITEM_COLS
+
+
+def _yen(a, money_style):
+    if money_style == "plain":
+        return pd.Series(a).astype(str)
+    return pd.Series(a).map("{:,}円".format)
+
+
+def synth_frame(n_orders, items_per_order=5, seed=0, header_rows="first", money_style="yen", n_customers=997):
+    """Raw (pre-normalization) PaperOn frame.
+
+    items_per_order: an int, or a (low, high) range drawn per order.
+    header_rows: "first" fills header cells on each order's first row only
+        (what the forward-fill expects), "all" repeats them on every row.
+    money_style: "yen" -> "1,234円", "plain" -> "1234".
+    """
+    rng = np.random.default_rng(seed)
+    if isinstance(items_per_order, (tuple, list)):
+        per_order = rng.integers(items_per_order[0], items_per_order[1] + 1, n_orders)
+    else:
+        per_order = np.full(n_orders, items_per_order)
+    order_no = np.repeat(np.arange(n_orders), per_order)
+    n = len(order_no)
+    starts = np.concatenate([[0], np.cumsum(per_order)[:-1]])
+    first = np.zeros(n, dtype=bool)
+    first[starts] = True
+    rows = first if header_rows == "first" else np.ones(n, dtype=bool)
+
+    unit = rng.integers(1, 500, n) * 10
+    count = rng.integers(1, 20, n)
+    price = unit * count
+    subtotal = np.bincount(order_no, weights=price, minlength=n_orders).astype(np.int64)
+    tax = subtotal // 10
+    cust = rng.integers(0, n_customers, n_orders)
+    person = rng.integers(0, 31, n_orders)
+    product = rng.integers(0, 211, n)
+
+    hdr = {
+        "supplier.companyName": np.full(n_orders, "PaperOn商事", dtype=object),
+        "supplier.tel": np.full(n_orders, "03-0000-0000", dtype=object),
+        "orderer.companyName": ("得意先" + pd.Series(cust).astype(str).str.zfill(3)).to_numpy(),
+        "orderer.personName": ("担当" + pd.Series(person).astype(str).str.zfill(2)).to_numpy(),
+        "orderer.postalCode": np.full(n_orders, "100-0001", dtype=object),
+        "totalPriceInfo.subTotalPrice": _yen(subtotal, money_style).to_numpy(),
+        "totalPriceInfo.taxAmount": _yen(tax, money_style).to_numpy(),
+        "totalPriceInfo.totalPrice": _yen(subtotal + tax, money_style).to_numpy(),
+        "totalPriceInfo.taxInfo": np.full(n_orders, "10%", dtype=object),
+        "subTotals.subTotalPriceExclude10": _yen(subtotal, money_style).to_numpy(),
+        "subTotals.taxAmount10": _yen(tax, money_style).to_numpy(),
+        "subTotals.totalPriceInclude10": _yen(subtotal + tax, money_style).to_numpy(),
+    }
+    cols = {}
+    for c in HEADER_COLS:
+        col = np.full(n, None, dtype=object)
+        if c in hdr:
+            col[rows] = hdr[c][order_no[rows]]
+        cols[c] = col
+    pnum = pd.Series(product).astype(str)
+    cols.update({
+        "items.name": ("商品" + pnum).to_numpy(),
+        "items.num": ("P-" + pnum.str.zfill(5)).to_numpy(),
+        "items.count": count,
+        "items.date": (pd.Timestamp("2024-04-01") + pd.to_timedelta(order_no % 60, unit="D")).strftime("%Y-%m-%d").to_numpy(),
+        "items.quantityUnit": np.full(n, "個", dtype=object),
+        "items.taxExcludedUnitPrice": _yen(unit, money_style).to_numpy(),
+        "items.taxExcludedPrice": _yen(price, money_style).to_numpy(),
+        "items.taxInfo": np.full(n, "10%", dtype=object),
+    })
+    for c in ITEM_COLS:
+        cols.setdefault(c, np.full(n, None, dtype=object))
+    return pd.DataFrame(cols)
+
+
+def synth_csv(n_orders, items_per_order=5, seed=0, encoding="utf-8-sig", **kw):
+    return synth_frame(n_orders, items_per_order, seed, **kw).to_csv(index=False).encode(encoding)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m benchmarks.synth")
+    p.add_argument("out")
+    p.add_argument("--orders", type=int, default=1000)
+    p.add_argument("--items", type=int, nargs="+", default=[5], help="N, or LOW HIGH")
+    p.add_argument("--encoding", choices=["utf-8-sig", "cp932"], default="utf-8-sig")
+    p.add_argument("--header-rows", choices=["first", "all"], default="first")
+    p.add_argument("--money", choices=["yen", "plain"], default="yen")
+    p.add_argument("--seed", type=int, default=0)
+    a = p.parse_args(argv)
+    items = a.items[0] if len(a.items) == 1 else tuple(a.items[:2])
+    with open(a.out, "wb") as f:
+        f.write(synth_csv(a.orders, items, a.seed, a.encoding, header_rows=a.header_rows, money_style=a.money))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Core (Streamlit-independent) logic for the PaperOn sales demo.
+
+``import paperon`` is cheap: the public helpers below are resolved lazily,
+so pandas is only imported once one of them is actually used.
+"""
+import importlib
+
+_EXPORTS = {
+    "normalize_tables": "normalize",
+    "to_order_id": "normalize",
+    "StreamingNormalizer": "normalize",
+    "detect_encoding": "ingest",
+    "decode_upload": "ingest",
+    "read_normalized_csv": "ingest",
+    "import_files": "batch",
+    "import_paths": "batch",
+    "OrderStore": "store",
+    "SqliteOrderStore": "db",
+    "export_store": "export",
+    "write_tables": "export",
+    "Profiler": "profiling",
+    "register": "dedup",
+}
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'paperon' has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,168 @@
+"""Sales totals by customer, item, tax rate bucket and item date, kept up to date by deltas.
+
+Every dimension is a running group-by: a dict from the group key to its
+summed measures. Stores feed ``add`` / ``remove`` the order and item rows a
+write adds or drops (like ``search.SearchIndex``), so a registration or an
+edit only moves the groups its rows fall into, and reading a table costs the
+number of groups rather than the number of items. Tables are cached until a
+write touches their dimension.
+"""
+import numpy as np
+import pandas as pd
+
+from .kpi import CUSTOMER_COL, TOTAL_COL
+from .recalc import TAX_BUCKETS, TAX_RATES, tax_buckets
+
+# measure -> summed column (None: number of rows)
+MEASURES = {
+    "orders": None, "subtotal": "totalPriceInfo.subTotalPrice", "tax": "totalPriceInfo.taxAmount", "total": TOTAL_COL,
+    "lines": None, "quantity": "items.count", "amount": "items.taxExcludedPrice",
+}
+_ORDER_MEASURES = ("orders", "subtotal", "tax", "total")
+_ITEM_MEASURES = ("lines", "quantity", "amount")
+# dimension -> (source table, key columns, key names in tables, measures)
+DIMENSIONS = {
+    "customer": ("orders", [CUSTOMER_COL], ["customer"], _ORDER_MEASURES),
+    "item": ("items", ["items.num", "items.name"], ["num", "name"], _ITEM_MEASURES),
+    "tax": ("items", ["items.taxInfo"], ["bucket"], _ITEM_MEASURES),
+    "date": ("items", ["items.date"], ["date"], _ITEM_MEASURES),
+}
+PERIODS = {"day": "D", "week": "W", "month": "M", "year": "Y"}
+ORDER_COLS = [CUSTOMER_COL] + [MEASURES[m] for m in _ORDER_MEASURES if MEASURES[m]]
+ITEM_COLS = sorted({c for t, keys, _, ms in DIMENSIONS.values() if t == "items" for c in keys + [MEASURES[m] for m in ms if MEASURES[m]]})
+
+
+def _text(v):
+    # a group key as text ("" when missing); integral floats lose their ".0"
+    if v is None or v is pd.NA or v != v:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def _key(frame, col):
+    if col not in frame.columns:
+        return np.full(len(frame), "", dtype=object)
+    codes, uniques = pd.factorize(frame[col])  # each distinct value converted once
+    return np.array([_text(v) for v in uniques] + [""], dtype=object)[codes]
+
+
+def _number(frame, col):
+    if col not in frame.columns:
+        return np.zeros(len(frame))
+    s = frame[col]
+    if s.dtype.kind in "iuf":
+        return s.to_numpy(dtype=float)
+    return pd.to_numeric(s, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def _days(texts):
+    days = pd.to_datetime(pd.Series(texts, dtype=object).replace("", None), errors="coerce", format="mixed")
+    return days.dt.strftime("%Y-%m-%d").fillna("").to_numpy()
+
+
+def _buckets(texts):
+    return tax_buckets(pd.DataFrame({"items.taxInfo": pd.Series(texts, dtype=object).replace("", None)})).to_numpy()
+
+
+_KEY_MAPS = {"tax": _buckets, "date": _days}
+_SMALL = 64  # rows up to which a delta is merged without a pandas groupby
+
+
+def _whole(v):
+    # sums of yen amounts back as int64 (float drift from +/- deltas rounded away)
+    v = np.round(v, 2)
+    return v.astype("int64") if (v % 1 == 0).all() else v
+
+
+class SalesIndex:
+    """See module docstring. ``add`` / ``remove`` take frames with an ``orderId``
+    column: order header rows and/or item rows."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._sums = {dim: {} for dim in DIMENSIONS}  # dim -> {key tuple: measure sums (rows first)}
+        self._tables = {}                             # (dim, period) -> cached table
+        self._mapped = {dim: {} for dim in _KEY_MAPS}  # raw key text -> bucket / day
+
+    def add(self, orders=None, items=None):
+        self._apply(orders, items, 1)
+
+    def remove(self, orders=None, items=None):
+        self._apply(orders, items, -1)
+
+    def add_groups(self, dim, groups):
+        """Add pre-aggregated rows of one dimension (e.g. from a SQL GROUP BY):
+        its key columns and one summed column per measure."""
+        _, keys, _, measures = DIMENSIONS[dim]
+        raw = [_key(groups, c) for c in keys]
+        self._merge(dim, raw, groups[list(measures)].to_numpy(dtype=float), 1)
+
+    def table(self, dim, period=None):
+        """Totals of ``dim`` ("customer", "item", "tax" or "date"), one row per
+        group, biggest sales first (tax buckets and dates in their own order).
+        ``period`` ("day", "week", "month", "year") rolls dates up."""
+        key = (dim, period if dim == "date" else None)
+        if key not in self._tables:
+            self._tables[key] = self._build(dim, key[1])
+        return self._tables[key]
+
+    def _apply(self, orders, items, sign):
+        numbers = {}  # source -> {measure: values}, shared by the dimensions of a table
+        for dim, (source, keys, _, measures) in DIMENSIONS.items():
+            frame = orders if source == "orders" else items
+            if frame is None or not len(frame):
+                continue
+            if source not in numbers:
+                numbers[source] = {m: np.ones(len(frame)) if MEASURES[m] is None else _number(frame, MEASURES[m])
+                                   for m in measures}
+            values = np.column_stack([numbers[source][m] for m in measures])
+            self._merge(dim, [_key(frame, c) for c in keys], values, sign)
+
+    def _merge(self, dim, raw, values, sign):
+        values = np.nan_to_num(values)
+        if len(values) > _SMALL:  # pre-aggregate big batches; small edits go row by row
+            groups = pd.DataFrame(values).groupby([pd.Series(k) for k in raw], sort=False).sum()
+            keys = [k if isinstance(k, tuple) else (k,) for k in groups.index]
+            values = groups.to_numpy()
+        else:
+            keys = list(zip(*raw))
+        if dim in _KEY_MAPS:  # raw text -> tax bucket / day, computed once per distinct text
+            known = self._mapped[dim]
+            new = list({k[0] for k in keys if k[0] not in known})
+            if new:
+                known.update(zip(new, _KEY_MAPS[dim](new)))
+            keys = [(known[k[0]],) for k in keys]
+        sums = self._sums[dim]
+        for k, v in zip(keys, values):
+            cur = sums.get(k)
+            if cur is None:
+                if sign > 0:
+                    sums[k] = v.copy()
+                continue
+            cur += sign * v
+            if cur[0] <= 0:  # last row of the group is gone
+                del sums[k]
+        self._tables = {t: df for t, df in self._tables.items() if t[0] != dim}
+
+    def _build(self, dim, period):
+        _, _, names, measures = DIMENSIONS[dim]
+        sums = self._sums[dim]
+        values = np.array(list(sums.values())).reshape(len(sums), len(measures))
+        keys = {name: [k[i] for k in sums] for i, name in enumerate(names)}
+        if dim == "date" and period not in (None, "day"):
+            day = pd.to_datetime(pd.Series(keys["date"], dtype=object).replace("", None), errors="coerce")
+            rolled = day.dt.to_period(PERIODS[period]).astype(str).where(day.notna(), "")
+            groups = pd.DataFrame(values).groupby(rolled.to_numpy(), sort=False).sum()
+            keys, values = {"date": list(groups.index)}, groups.to_numpy()
+        df = pd.DataFrame({**keys, **{m: _whole(v) for m, v in zip(measures, values.T)}})
+        if dim == "tax":
+            df["tax"] = _whole(np.round(df["amount"].to_numpy() * df["bucket"].map(TAX_RATES).to_numpy(dtype=float)))
+            df["total"] = df["amount"] + df["tax"]
+            return df.set_index("bucket").reindex([b for b in TAX_BUCKETS if b in set(df["bucket"])]).reset_index()
+        if dim == "date":
+            return df.iloc[np.lexsort((df["date"].to_numpy(dtype=str), df["date"].eq("").to_numpy()))].reset_index(drop=True)
+        return df.iloc[np.argsort(-df[measures[-1]].to_numpy(), kind="stable")].reset_index(drop=True)
@@ -0,0 +1,139 @@
+"""Batch import of many PaperOn CSVs on a process pool."""
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from .cache import content_key
+from .dedup import key_digest, order_keys, rekey
+from .ingest import TextSource, decode_upload, read_normalized_csv
+from .normalize import aggregate_orders, wide_order_id
+
+
+@dataclass
+class FileResult:
+    name: str
+    key: str = None
+    encoding: str = None
+    orders: pd.DataFrame = None
+    items: pd.DataFrame = None
+    error: str = None
+    seconds: float = 0.0
+    status: str = "ok"  # ok / error / duplicate / registered
+
+
+@dataclass
+class BatchResult:
+    orders: pd.DataFrame
+    items: pd.DataFrame
+    files: list = field(default_factory=list)
+    collisions: dict = field(default_factory=dict)  # (file name, orderId) -> wide ID, across files
+
+    @property
+    def sources(self):
+        return [f.key for f in self.files if f.status == "ok"]
+
+
+def _import_one(name, source):
+    """Worker: decode + normalize one file. ``source`` is a path or the raw bytes."""
+    t0 = time.perf_counter()
+    res = FileResult(name)
+    try:
+        if isinstance(source, (bytes, bytearray)):
+            buf = io.BytesIO(source)
+        else:
+            with open(source, "rb") as f:
+                buf = io.BytesIO(f.read())
+        res.key = content_key(buf)
+        res.encoding, text = decode_upload(buf)
+        if res.encoding is None:
+            raise ValueError("エンコーディング判定に失敗しました")
+        res.orders, res.items = read_normalized_csv(TextSource(text))
+    except Exception as e:
+        res.error, res.status = f"{type(e).__name__}: {e}", "error"
+    res.seconds = time.perf_counter() - t0
+    return res
+
+
+def _mp_context():
+    # the Streamlit server is multi-threaded, so avoid a plain fork()
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def merge_results(results, skip_key=None):
+    """Deterministic merge: files in name order, identical contents once, and
+    every orderId keeps the items of the first file that contains it. An
+    orderId that a later file uses for a different order key is re-keyed to
+    a wide ID in that file."""
+    results = sorted(results, key=lambda r: (r.name, r.key or ""))
+    seen_keys, seen_ids, digests, collisions = set(), set(), {}, {}
+    order_parts, item_parts = [], []
+    for r in results:
+        if r.status == "error":
+            continue
+        if r.key in seen_keys:
+            r.status = "duplicate"
+            continue
+        seen_keys.add(r.key)
+        if skip_key is not None and skip_key(r.key):
+            r.status = "registered"
+            continue
+        keys = order_keys(r.orders)
+        d = keys.map(key_digest)
+        clash = {oid: wide_order_id(keys[oid]) for oid in r.orders["orderId"]
+                 if digests.get(oid, d[oid]) != d[oid]}
+        if clash:
+            r.orders, r.items = rekey(r.orders, clash), rekey(r.items, clash)
+            d.index = [clash.get(oid, oid) for oid in d.index]
+            collisions.update(((r.name, oid), new) for oid, new in clash.items())
+        for oid, v in d.items():
+            digests.setdefault(oid, v)
+        items = r.items[~r.items["orderId"].isin(seen_ids)] if seen_ids else r.items
+        seen_ids.update(r.orders["orderId"])
+        order_parts.append(r.orders)
+        item_parts.append(items)
+    if not order_parts:
+        return BatchResult(pd.DataFrame(columns=["orderId"]), pd.DataFrame(columns=["orderId"]), results)
+    orders = aggregate_orders(pd.concat(order_parts, ignore_index=True))
+    items = pd.concat(item_parts, ignore_index=True)
+    return BatchResult(orders, items, results, collisions)
+
+
+def import_files(files, max_workers=None, on_file_done=None, skip_key=None):
+    """Import ``files`` = [(name, path_or_bytes), ...] in parallel.
+
+    ``on_file_done(done, total, FileResult)`` is called as each file finishes.
+    """
+    files = list(files)
+    workers = min(max_workers or os.cpu_count() or 1, len(files)) or 1
+    results = []
+    if workers == 1:
+        for name, source in files:
+            results.append(_import_one(name, source))
+            if on_file_done is not None:
+                on_file_done(len(results), len(files), results[-1])
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context()) as pool:
+            futures = [pool.submit(_import_one, name, source) for name, source in files]
+            for fut in as_completed(futures):
+                results.append(fut.result())
+                if on_file_done is not None:
+                    on_file_done(len(results), len(files), results[-1])
+    return merge_results(results, skip_key)
+
+
+def csv_paths(path):
+    """A CSV file, or every *.csv directly inside a directory (sorted)."""
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, n) for n in os.listdir(path) if n.lower().endswith(".csv"))
+    return [path]
+
+
+def import_paths(paths, max_workers=None, on_file_done=None, skip_key=None):
+    files = [(p, p) for path in paths for p in csv_paths(path)]
+    return import_files(files, max_workers, on_file_done, skip_key)
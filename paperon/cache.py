@@ -0,0 +1,97 @@
+"""Content-addressed cache of parsed/normalized uploads (survives Streamlit reruns)."""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from .normalize import ID_HEX
+from .schema import HEADER_COLS, ITEM_COLS, MONEY_COLS
+
+_CONFIG_FINGERPRINT = hashlib.sha1(
+    "\n".join(["|".join(HEADER_COLS), "|".join(ITEM_COLS), "|".join(MONEY_COLS)]
+              + ([f"id{ID_HEX}"] if ID_HEX != 8 else [])).encode("utf-8")  # default keeps existing keys valid
+).hexdigest()[:12]
+_MISSING = object()
+
+
+def content_key(file):
+    """Hash of the upload bytes plus the normalization config."""
+    h = hashlib.sha256()
+    if hasattr(file, "getbuffer"):
+        with file.getbuffer() as buf:
+            h.update(buf)
+    else:
+        file.seek(0)
+        h.update(file.read())
+        file.seek(0)
+    return f"{h.hexdigest()}:{_CONFIG_FINGERPRINT}"
+
+
+def nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(nbytes(v) for v in value.values())
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return 64
+
+
+class ResultCache:
+    """Thread-safe LRU bounded by the (deep) byte size of its values.
+
+    Values are shared between sessions and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key][0]
+
+    def put(self, key, value):
+        size = nbytes(value)
+        with self._lock:
+            if key in self._data:
+                self.size -= self._data.pop(key)[1]
+            if size > self.max_bytes:
+                return value
+            self._data[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, old) = self._data.popitem(last=False)
+                self.size -= old
+        return value
+
+    def get_or_compute(self, key, fn):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.put(key, fn())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
@@ -0,0 +1,84 @@
+"""Headless batch normalization: PaperOn CSVs -> orders/items files.
+
+    python -m paperon exports/2024-05/ -o out/ --format parquet
+    python -m paperon a.csv b.csv --db paperon.db      # append into the app's store
+"""
+import argparse
+import sys
+import time
+from contextlib import nullcontext
+
+
+def build_parser():
+    p = argparse.ArgumentParser(prog="python -m paperon", description="PaperOn CSV を注文（Orders）と明細（OrderItems）に正規化します。")
+    p.add_argument("inputs", nargs="+", help="CSVファイルまたはフォルダ（直下の *.csv）")
+    p.add_argument("-o", "--out", help="出力フォルダ（Orders/OrderItems を書き出す）")
+    p.add_argument("-f", "--format", choices=["csv", "parquet", "xlsx"], default="csv")
+    p.add_argument("--db", help="正規化結果を追記する SQLite ストア（アプリの PAPERON_DB）")
+    p.add_argument("--on-duplicate", choices=["skip", "merge", "replace"], default="skip",
+                   help="--db に登録済みの注文が再び来たとき: skip=無視 / merge=不足明細のみ追加 / replace=置き換え（既定: skip）")
+    p.add_argument("-j", "--workers", type=int, default=None, help="並列プロセス数（既定: CPU数）")
+    p.add_argument("-q", "--quiet", action="store_true")
+    p.add_argument("--profile", action="store_true", help="ステージ別の時間・メモリを JSON Lines で標準エラーに出力（-j 1 で正規化の内訳も計測）")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.out and not args.db:
+        build_parser().error("--out か --db のどちらかを指定してください")
+
+    # heavy imports only once the arguments are valid
+    from .batch import import_paths
+    from .dedup import register
+    from .export import missing_formats, write_tables
+    from .profiling import Profiler, stage
+    from .store import OrderStore
+
+    if args.out and args.format in missing_formats():
+        mod = missing_formats()[args.format]
+        build_parser().error(f"--format {args.format} には {mod} が必要です（pip install {mod}）")
+
+    def log(msg):
+        if not args.quiet:
+            print(msg, file=sys.stderr)
+
+    def on_file(done, total, r):
+        detail = f"error: {r.error}" if r.error else f"{len(r.items):,} items, {r.encoding}"
+        log(f"[{done}/{total}] {r.name} ({r.seconds:.2f}s) {detail}")
+
+    t0 = time.perf_counter()
+    target = None
+    if args.db:
+        from .db import SqliteOrderStore
+        target = SqliteOrderStore(args.db)
+    with Profiler("cli", memory=True) if args.profile else nullcontext() as prof:
+        with stage("import"):
+            res = import_paths(args.inputs, max_workers=args.workers, on_file_done=on_file,
+                               skip_key=target.has_source if target is not None else None)
+        for f in res.files:
+            if f.status in ("duplicate", "registered"):
+                log(f"skip {f.name}: {f.status}")
+        for (name, oid), new in res.collisions.items():
+            log(f"id collision in {name}: {oid} -> {new}")
+
+        if target is not None:
+            with stage("merge", len(res.items)):
+                report = register(target, res.orders, res.items, sources=res.sources, policy=args.on_duplicate)
+            for oid, new in report.collisions.items():
+                log(f"id collision with {args.db}: {oid} -> {new}")
+            log(f"appended to {args.db}: {report.new:,} new orders, {len(report.duplicates):,} duplicates ({args.on_duplicate})")
+        if args.out:
+            store = OrderStore()
+            store.append(res.orders, res.items)
+            with stage("export", len(res.items)):
+                for path in write_tables(store, args.out, args.format):
+                    log(f"wrote {path}")
+    if prof is not None:
+        sys.stderr.write(prof.to_jsonl())
+    log(f"{len(res.orders):,} orders / {len(res.items):,} items in {time.perf_counter() - t0:.1f}s")
+    return 1 if any(f.status == "error" for f in res.files) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Compact in-memory encoding of normalized item batches.
+
+A normalized items frame repeats every forward-filled header field on each
+item row and keeps amounts as object columns (numbers mixed with ``pd.NA``).
+``Segment`` stores such a batch as
+
+* the item columns, with yen amounts as nullable ``Int64`` (``Float64`` if a
+  value has a fraction) and repetitive strings as categoricals, and
+* a per-batch table of the distinct header tuples, referenced from each item
+  row by a small integer code (so a header is stored once per order).
+
+Reads decode back to plain columns in the original column order. Batches
+below ``_MIN_ROWS`` rows are stored unchanged; the encoding would cost more
+than it saves, and the store re-encodes them when it compacts its segments.
+"""
+import numpy as np
+import pandas as pd
+
+from .schema import HEADER_COLS, MONEY_COLS
+
+HEADER_CODE = "_hdr"
+_CATEGORY_MAX_RATIO = 0.5  # categorical only when values repeat at least twice on average
+_MIN_ROWS = 256  # smaller batches (one saved order, a hand entry) are kept as they are
+
+
+def compact_money(s):
+    """Amounts as ``Int64``/``Float64``; unchanged if any cell is not a number."""
+    if isinstance(s.dtype, pd.api.extensions.ExtensionDtype) and s.dtype.kind in "iuf":
+        return s
+    num = pd.to_numeric(s, errors="coerce")
+    if not num.isna().equals(s.isna()):
+        return s
+    valid = num.dropna()
+    if not len(valid) or ((valid % 1 == 0).all() and valid.abs().max() < 2**53):
+        return num.astype("Int64")
+    return num.astype("Float64")
+
+
+def compact_strings(s):
+    if s.dtype != object or len(s) == 0:
+        return s
+    if s.nunique(dropna=True) > len(s) * _CATEGORY_MAX_RATIO:
+        return s
+    if not s.dropna().map(type).eq(str).all():
+        return s
+    return s.astype("category")
+
+
+def compact_frame(frame):
+    out = {}
+    for c in frame.columns:
+        col = frame[c]
+        if c in MONEY_COLS:
+            col = compact_money(col)
+        out[c] = compact_strings(col)
+    return pd.DataFrame(out, index=frame.index)
+
+
+def _take(col, pos):
+    # positional take that decodes categoricals back to plain object values
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        codes = col.array.codes[pos]
+        cats = np.asarray(col.array.categories, dtype=object)
+        out = cats.take(codes) if len(cats) else np.full(len(codes), np.nan, dtype=object)  # all-NA column
+        out[codes < 0] = np.nan
+        return out
+    return col.array[pos]
+
+
+class Segment:
+    """One appended batch of items (see module docstring)."""
+
+    __slots__ = ("items", "headers", "columns")
+
+    def __init__(self, frame):
+        frame = frame.loc[:, ~frame.columns.duplicated()]
+        self.columns = list(frame.columns)
+        self.headers = None
+        if len(frame) < _MIN_ROWS:
+            self.items = frame
+            return
+        hcols = [c for c in HEADER_COLS if c in frame.columns]
+        if hcols:
+            codes = frame.groupby(hcols, dropna=False, sort=False).ngroup().to_numpy()
+            first = np.unique(codes, return_index=True)[1]
+            self.headers = compact_frame(frame[hcols].iloc[first].reset_index(drop=True))
+            frame = frame.drop(columns=hcols)
+            frame[HEADER_CODE] = codes.astype(np.int32)
+        self.items = compact_frame(frame)
+
+    def __len__(self):
+        return len(self.items)
+
+    def take(self, pos, columns=None):
+        return self._rows(np.asarray(pos), columns)
+
+    def slice(self, start, stop):
+        return self._rows(slice(start, stop))
+
+    def frame(self):
+        return self._rows(slice(None))
+
+    def memory_usage(self):
+        n = int(self.items.memory_usage(deep=True).sum())
+        if self.headers is not None:
+            n += int(self.headers.memory_usage(deep=True).sum())
+        return n
+
+    def records(self, pos):
+        """Rows ``pos`` as plain dicts (cheaper than a frame for a handful of rows)."""
+        data = self._arrays(np.asarray(pos), self.columns)
+        return [dict(zip(data, row)) for row in zip(*(list(v) for v in data.values()))]
+
+    def _rows(self, pos, columns=None):
+        columns = self.columns if columns is None else [c for c in self.columns if c in columns]
+        return pd.DataFrame(self._arrays(pos, columns), index=self.items.index[pos])
+
+    def _arrays(self, pos, columns):
+        items = self.items
+        if self.headers is None:
+            return {c: _take(items[c], pos) for c in columns}
+        codes = items[HEADER_CODE].to_numpy()[pos]
+        return {c: _take(self.headers[c], codes) if c in self.headers.columns else _take(items[c], pos) for c in columns}
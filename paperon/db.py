@@ -0,0 +1,562 @@
+"""SQLite-backed order store (same interface as ``store.OrderStore``)."""
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from .analytics import DIMENSIONS, ITEM_COLS as SALES_ITEM_COLS, MEASURES, ORDER_COLS as SALES_ORDER_COLS, SalesIndex
+from .dedup import BloomFilter, key_digests
+from .kpi import CUSTOMER_COL, TOTAL_COL, OrderStats
+from .schema import ORDER_KEY_COLS
+from .search import FIELDS, ITEM_FIELDS, ORDER_FIELDS, SearchIndex, has_conditions
+
+for _t in (np.int64, np.int32, np.int16, np.int8, np.uint32, np.uint16, np.uint8):
+    sqlite3.register_adapter(_t, int)
+sqlite3.register_adapter(np.bool_, bool)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (orderId TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS items (rowid INTEGER PRIMARY KEY, orderId TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS items_order ON items(orderId);
+CREATE TABLE IF NOT EXISTS uploads (sourceKey TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS revisions (orderId TEXT PRIMARY KEY, rev INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS order_keys (orderId TEXT PRIMARY KEY, digest INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+INSERT OR IGNORE INTO meta VALUES ('version', 0);
+"""
+_INDEXED_ORDER_COLS = ["orderer.companyName"]
+_INDEX_COLS = {  # columns each in-memory index reads, per table
+    "search": {"orders": [FIELDS[f] for f in ORDER_FIELDS] + [TOTAL_COL], "items": [FIELDS[f] for f in ITEM_FIELDS]},
+    "sales": {"orders": SALES_ORDER_COLS, "items": SALES_ITEM_COLS},
+}
+_BINDABLE = {"string", "integer", "floating", "mixed-integer-float", "decimal", "boolean", "empty", "bytes"}
+
+
+def _q(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _rows(df):
+    # NaN/NA -> NULL; anything sqlite cannot bind (dates, Decimals, ...) -> str
+    values = df.astype(object).where(df.notna(), None)
+    for c in values.columns:
+        if pd.api.types.infer_dtype(values[c], skipna=True) not in _BINDABLE:
+            ok = values[c].map(lambda v: v is None or isinstance(v, (str, int, float, bytes, np.integer, np.bool_)))
+            values.loc[~ok, c] = values.loc[~ok, c].astype(str)
+    return list(values.itertuples(index=False, name=None))
+
+
+class SqliteOrderStore:
+    """Orders/items persisted in a local SQLite file.
+
+    Columns are added on demand as new CSV layouts arrive. Writes touch only
+    the affected rows (the edited items on a Page 2 save); reads go through the
+    orderId / customer indexes, so opening an existing database loads nothing
+    up front. A ``version`` counter in the database lets every session (and
+    process) see when its cached frames are stale.
+
+    With ``bloom=True`` an in-memory Bloom filter of the stored orderIds
+    answers "definitely new" for most of an incoming batch, so duplicate
+    checks only query the database for the (likely) known IDs.
+    """
+
+    def __init__(self, path, bloom=True):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._columns_cache = {}
+        for c in _INDEXED_ORDER_COLS:
+            self._ensure_columns("orders", [c])
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {_q('orders_' + c)} ON orders({_q(c)})")
+        self._cache = {}
+        self._cache_version = None
+        self._stats = OrderStats()
+        self._stats_version = None  # DB version the stats reflect
+        self._bloom = False if not bloom else None  # None: (re)build on next use
+        self._bloom_version = None
+        self._indexes = {}  # "search" / "sales" -> SearchIndex / SalesIndex, built on first use
+        self._indexes_version = None  # DB version the indexes reflect
+        self._tx_depth = 0
+
+    # ---- reads ----
+    @property
+    def version(self):
+        return self._scalar("SELECT value FROM meta WHERE key='version'")
+
+    def __len__(self):
+        return self._scalar("SELECT COUNT(*) FROM orders")
+
+    def __contains__(self, order_id):
+        return self._scalar("SELECT COUNT(*) FROM orders WHERE orderId=?", (order_id,)) > 0
+
+    @property
+    def empty(self):
+        return self._scalar("SELECT NOT EXISTS (SELECT 1 FROM orders)") == 1
+
+    def order_ids(self):
+        return self._cached("order_ids", lambda: [r[0] for r in self._fetch("SELECT orderId FROM orders ORDER BY rowid")])
+
+    def get_order(self, order_id):
+        df = self._read("SELECT * FROM orders WHERE orderId=?", (order_id,))
+        if df.empty:
+            raise KeyError(order_id)
+        return df.iloc[0].to_dict()
+
+    def order_items(self, order_id):
+        df = self._read("SELECT * FROM items WHERE orderId=? ORDER BY rowid", (order_id,))
+        return df.drop(columns="rowid")
+
+    def items_for(self, order_ids):
+        """Items of several orders at once (in storage order)."""
+        ids = json.dumps(list(order_ids), ensure_ascii=False)
+        df = self._read("SELECT * FROM items WHERE orderId IN (SELECT value FROM json_each(?)) ORDER BY rowid", (ids,))
+        return df.drop(columns="rowid")
+
+    def items_at(self, order_id, positions, columns=None):
+        """Rows ``positions`` (0-based, in ``order_items`` order; all rows when
+        None) of one order, indexed by position; only ``columns`` if given."""
+        rowids = self._item_rowids(order_id)
+        positions = list(range(len(rowids)) if positions is None else positions)
+        picked = json.dumps([rowids[p] for p in positions])
+        cols = "*" if columns is None else ", ".join(map(_q, ["rowid"] + [c for c in columns if c in self._columns("items")]))
+        df = self._read(f"SELECT {cols} FROM items WHERE rowid IN (SELECT value FROM json_each(?))", (picked,))
+        df = df.set_index("rowid").reindex([rowids[p] for p in positions])
+        df.index = positions
+        return df
+
+    def orders_frame(self):
+        return self._cached("orders", lambda: self._read("SELECT * FROM orders ORDER BY rowid"))
+
+    def items_frame(self):
+        return self._cached("items", lambda: self._read("SELECT * FROM items ORDER BY rowid").drop(columns="rowid"))
+
+    def item_columns(self):
+        return [c for c in self._columns("items") if c != "rowid"]
+
+    def iter_items(self, batch_size=10_000):
+        """All items in storage order, ``batch_size`` rows at a time (keyset paging)."""
+        last = 0
+        while True:
+            batch = self._read("SELECT * FROM items WHERE rowid > ? ORDER BY rowid LIMIT ?", (last, batch_size))
+            if batch.empty:
+                return
+            last = int(batch["rowid"].iloc[-1])
+            yield batch.drop(columns="rowid")
+
+    def query_orders(self, customer=None, sort_by="orderId", ascending=True, offset=0, limit=30, ids=None):
+        cols = self._columns("orders")
+        conds, params = [], []
+        if customer and "orderer.companyName" in cols:
+            conds.append(f"{_q('orderer.companyName')} LIKE ?")
+            params.append(f"%{customer}%")
+        if ids is not None:
+            conds.append("orderId IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(ids), ensure_ascii=False))
+        where = f"WHERE {' AND '.join(conds)}" if conds else ""
+        n = self._scalar(f"SELECT COUNT(*) FROM orders {where}", params)
+        if sort_by not in cols:
+            sort_by = "orderId"
+        key = f"CAST({_q(sort_by)} AS REAL)" if sort_by.startswith("totalPriceInfo.") else _q(sort_by)
+        order = f"{key} IS NULL, {key} {'ASC' if ascending else 'DESC'}, rowid"
+        page = self._read(f"SELECT * FROM orders {where} ORDER BY {order} LIMIT ? OFFSET ?", params + [limit, offset])
+        return page, n
+
+    def summary(self):
+        """Order count, total amount and top customer.
+
+        Kept up to date by this process's writes; rebuilt with one aggregate
+        query when another process has written in between.
+        """
+        with self._lock:
+            version = self.version
+            if version != self._stats_version:
+                self._rebuild_stats()
+                self._stats_version = version
+            return self._stats.summary()
+
+    def search(self, text="", fields=tuple(FIELDS), match="substring", min_total=None, max_total=None):
+        """orderIds matching a text / totalPrice search (see ``search.SearchIndex``),
+        or None without conditions. The index is read from the database on
+        first use (and after another process wrote), then kept up to date by
+        this process's writes."""
+        if not has_conditions(text, min_total, max_total):
+            return None
+        with self._lock:
+            return self._index("search").search(text, fields, match, min_total, max_total)
+
+    def sales(self, dim, period=None):
+        """Sales totals by "customer", "item", "tax" or "date" (see
+        ``analytics.SalesIndex``). Built with one GROUP BY per dimension on
+        first use (and after another process wrote), then kept up to date by
+        this process's writes."""
+        with self._lock:
+            return self._index("sales").table(dim, period)
+
+    def order_revision(self, order_id):
+        row = self._fetch("SELECT rev FROM revisions WHERE orderId=?", (order_id,))
+        return row[0][0] if row else 0
+
+    def transaction(self):
+        """One write transaction around several calls (nested writes join it).
+
+        ``BEGIN IMMEDIATE`` takes SQLite's write lock up front, so a
+        check-then-write sequence is atomic across threads and processes.
+        """
+        return self._write()
+
+    def has_source(self, source_key):
+        return self._scalar("SELECT COUNT(*) FROM uploads WHERE sourceKey=?", (source_key,)) > 0
+
+    def known_digests(self, order_ids):
+        """``{orderId: key digest}`` for those of ``order_ids`` already stored (see ``dedup``).
+
+        Orders stored before digests were recorded get theirs from the header row.
+        """
+        with self._lock:
+            ids = pd.unique(np.asarray(list(order_ids), dtype=object))
+            bloom = self._id_filter()
+            if bloom is not None:
+                ids = ids[bloom.might_contain(ids)]
+            cols = [c for c in ORDER_KEY_COLS if c in self._columns("orders")]
+            select = "o.orderId, k.digest" + "".join(f", o.{_q(c)}" for c in cols)
+            out, legacy = {}, []
+            for start in range(0, len(ids), 500):
+                part = list(ids[start:start + 500])
+                for row in self._conn.execute(f"SELECT {select} FROM orders o LEFT JOIN order_keys k USING (orderId) "
+                                              f"WHERE o.orderId IN ({', '.join('?' * len(part))})", part):
+                    if row[1] is None:
+                        legacy.append(dict(zip(["orderId"] + cols, row[:1] + row[2:])))
+                    else:
+                        out[row[0]] = row[1]
+            if legacy:
+                out.update(key_digests(pd.DataFrame(legacy)).items())
+            return out
+
+    # ---- writes ----
+    def append(self, orders, items, sources=(), digests=None):
+        """Add a normalized batch. Items of an already known orderId are added to
+        that order; its existing header row is kept. ``sources`` are the
+        content keys of the uploads the batch came from; ``digests`` the
+        orders' key digests, if the caller has them already.
+        ``dedup.register`` wraps this with duplicate / collision handling."""
+        with self._write():
+            if len(orders):
+                orders = orders.drop_duplicates("orderId")
+                orders = orders[~orders["orderId"].isin(self._existing_ids(orders["orderId"]))]
+                self._insert("orders", orders, "INSERT OR IGNORE")
+                self._stats.add(orders)
+                self._feed("add", orders=orders)
+                if len(orders):
+                    digests = key_digests(orders) if digests is None else digests
+                    self._conn.executemany("INSERT OR REPLACE INTO order_keys VALUES (?, ?)",
+                                           [(oid, int(digests[oid])) for oid in orders["orderId"]])
+                    if self._bloom:
+                        self._bloom.add(orders["orderId"].to_numpy())
+            if len(items):
+                self._insert("items", items)
+                self._bump(items["orderId"].unique())
+                self._feed("add", items=items)
+            self._conn.executemany("INSERT OR IGNORE INTO uploads VALUES (?)", [(k,) for k in sources])
+
+    def update_order(self, order_id, fields):
+        """Set header ``fields`` of one order; an unknown orderId is added as a
+        new order without items (as ``OrderStore.update_order`` does)."""
+        if not fields:
+            return
+        with self._write():
+            old = self._order_row(order_id)
+            if old is None:
+                self._conn.execute("INSERT OR IGNORE INTO orders (orderId) VALUES (?)", (order_id,))
+                self._stats.add(pd.DataFrame([fields]))
+                digest = key_digests(pd.DataFrame([{**fields, "orderId": order_id}])).iloc[0]
+                self._conn.execute("INSERT OR REPLACE INTO order_keys VALUES (?, ?)", (order_id, int(digest)))
+                if self._bloom:
+                    self._bloom.add([order_id])
+            else:
+                self._stats.change(old, fields)
+            self._ensure_columns("orders", list(fields))
+            if self._indexes:
+                self._feed("remove", orders=self._index_rows("orders", order_id))
+            sets = ", ".join(f"{_q(c)}=?" for c in fields)
+            self._conn.execute(f"UPDATE orders SET {sets} WHERE orderId=?", _rows(pd.DataFrame([fields]))[0] + (order_id,))
+            self._bump([order_id])
+            if self._indexes:
+                self._feed("add", orders=self._index_rows("orders", order_id))
+
+    def replace_items(self, order_id, items):
+        items = items.copy()
+        if "orderId" in items.columns:
+            items["orderId"] = order_id
+        else:
+            items.insert(0, "orderId", order_id)
+        self.replace_items_many(items, [order_id])
+
+    def replace_items_many(self, items, order_ids):
+        """Swap the items of all ``order_ids`` for the rows of ``items`` (by orderId)."""
+        order_ids = list(order_ids)
+        with self._write():
+            if self._indexes:
+                self._feed("remove", items=self._index_rows("items", order_ids))
+            self._conn.executemany("DELETE FROM items WHERE orderId=?", [(oid,) for oid in order_ids])
+            if len(items):
+                self._insert("items", items)
+            self._bump(order_ids)
+            self._feed("add", items=items)
+
+    def patch_items(self, order_id, updates=None, added=None, deleted=()):
+        """Edit some of one order's items in place (see ``OrderStore.patch_items``):
+        only the edited cells, deleted rows and added rows are written."""
+        deleted = set(deleted)
+        updates = {p: cells for p, cells in (updates or {}).items() if p not in deleted and cells}
+        with self._write():
+            rowids = self._item_rowids(order_id)
+            touched = [rowids[p] for p in sorted(deleted | set(updates))]
+            if self._indexes:
+                self._feed("remove", items=self._index_item_rows(touched))
+            for p, cells in updates.items():
+                self._ensure_columns("items", list(cells))
+                sets = ", ".join(f"{_q(c)}=?" for c in cells)
+                self._conn.execute(f"UPDATE items SET {sets} WHERE rowid=?", _rows(pd.DataFrame([cells]))[0] + (rowids[p],))
+            self._conn.executemany("DELETE FROM items WHERE rowid=?", [(rowids[p],) for p in deleted])
+            if added is not None and len(added):
+                first = self._scalar("SELECT COALESCE(MAX(rowid), 0) + 1 FROM items")
+                self._insert("items", added.assign(orderId=order_id))
+                touched += list(range(first, first + len(added)))
+            self._bump([order_id])
+            if self._indexes:
+                self._feed("add", items=self._index_item_rows(touched))
+
+    def update_orders(self, headers):
+        """Write header fields of many known orders (a frame indexed by orderId)."""
+        if not len(headers) or not len(headers.columns):
+            return
+        with self._write():
+            headers = headers[headers.index.isin(self._existing_ids(headers.index))]
+            for order_id, fields in zip(headers.index, headers.to_dict("records")):
+                self._stats.change(self._order_row(order_id), fields)
+            if self._indexes:
+                self._feed("remove", orders=self._index_rows("orders", headers.index))
+            self._ensure_columns("orders", list(headers.columns))
+            sets = ", ".join(f"{_q(c)}=?" for c in headers.columns)
+            self._conn.executemany(f"UPDATE orders SET {sets} WHERE orderId=?",
+                                   [row + (oid,) for row, oid in zip(_rows(headers), headers.index)])
+            self._bump(headers.index)
+            if self._indexes:
+                self._feed("add", orders=self._index_rows("orders", headers.index))
+
+    def delete(self, order_id):
+        self.delete_orders([order_id])
+
+    def delete_orders(self, order_ids):
+        order_ids = [(oid,) for oid in order_ids]
+        with self._write():
+            for (oid,) in order_ids:
+                old = self._order_row(oid)
+                if old is not None:
+                    self._stats.remove(old)
+                if self._indexes:
+                    self._feed("remove", self._index_rows("orders", oid), self._index_rows("items", oid))
+            for t in ("items", "orders", "order_keys"):
+                self._conn.executemany(f"DELETE FROM {t} WHERE orderId=?", order_ids)
+            self._bump(oid for (oid,) in order_ids)
+
+    def clear(self):
+        with self._write():
+            for t in ("items", "orders", "uploads", "revisions", "order_keys"):
+                self._conn.execute(f"DELETE FROM {t}")
+            self._stats.reset()
+            for index in self._indexes.values():
+                index.reset()
+
+    def close(self):
+        self._conn.close()
+
+    # ---- internals ----
+    @contextmanager
+    def _write(self):
+        # one transaction per logical write; bumps the shared version on commit
+        with self._lock:
+            if self._tx_depth:  # inside transaction(): join it
+                self._tx_depth += 1
+                try:
+                    yield
+                finally:
+                    self._tx_depth -= 1
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._columns_cache = {}  # another connection may have added columns
+            version = self.version
+            if version != self._stats_version:
+                self._stats_version = None  # deltas on stale stats are moot; summary() rebuilds
+            if version != self._bloom_version and self._bloom:
+                self._bloom = None  # another process wrote; may lack its IDs
+            if version != self._indexes_version:
+                self._indexes = {}
+            self._tx_depth = 1
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                self._columns_cache = {}
+                self._stats_version = None
+                if self._bloom:
+                    self._bloom = None
+                self._indexes = {}
+                raise
+            finally:
+                self._tx_depth = 0
+            self._conn.execute("UPDATE meta SET value=value+1 WHERE key='version'")
+            self._conn.execute("COMMIT")
+            if self._stats_version is not None:
+                self._stats_version = version + 1
+            if self._bloom:
+                self._bloom_version = version + 1
+            if self._indexes:
+                self._indexes_version = version + 1
+
+    def _insert(self, table, df, verb="INSERT"):
+        df = df.loc[:, ~df.columns.duplicated()]
+        cols = [str(c) for c in df.columns]
+        self._ensure_columns(table, cols)
+        sql = f"{verb} INTO {table} ({', '.join(map(_q, cols))}) VALUES ({', '.join('?' * len(cols))})"
+        self._conn.executemany(sql, _rows(df))
+
+    def _bump(self, order_ids):
+        self._conn.executemany("INSERT INTO revisions VALUES (?, 1) ON CONFLICT(orderId) DO UPDATE SET rev=rev+1",
+                               [(oid,) for oid in order_ids])
+
+    def _existing_ids(self, ids, chunk=500):
+        ids = list(ids)
+        found = []
+        for start in range(0, len(ids), chunk):
+            part = ids[start:start + chunk]
+            found += [r[0] for r in self._conn.execute(
+                f"SELECT orderId FROM orders WHERE orderId IN ({', '.join('?' * len(part))})", part)]
+        return found
+
+    def _id_filter(self):
+        # Bloom filter of the stored orderIds, rebuilt when stale or over capacity
+        if self._bloom is False:
+            return None
+        version, n = self.version, len(self)
+        if self._bloom is None or self._bloom_version != version or self._bloom.count > self._bloom.capacity:
+            bloom = BloomFilter(capacity=2 * n)
+            cur = self._conn.execute("SELECT orderId FROM orders")
+            while rows := cur.fetchmany(100_000):
+                bloom.add([r[0] for r in rows])
+            self._bloom, self._bloom_version = bloom, version
+        return self._bloom
+
+    def _index(self, name):
+        # an in-memory index, (re)built from the database when missing or stale
+        version = self.version
+        if version != self._indexes_version:
+            self._indexes, self._indexes_version = {}, version
+        if name not in self._indexes:
+            if name == "search":
+                index = SearchIndex()
+                index.add(self._index_rows("orders", names=["search"]), self._index_rows("items", names=["search"]))
+            else:
+                index = SalesIndex()
+                for dim in DIMENSIONS:
+                    index.add_groups(dim, self._sales_groups(dim))
+            self._indexes[name] = index
+        return self._indexes[name]
+
+    def _feed(self, method, orders=None, items=None):
+        # the rows a write adds / removes, to every index built so far
+        for index in self._indexes.values():
+            getattr(index, method)(orders=orders, items=items)
+
+    def _index_cols(self, table, names=None):
+        # the columns the (built) indexes read from ``table``
+        want = {c for name in (names or self._indexes) for c in _INDEX_COLS[name][table]}
+        return ["orderId"] + [c for c in self._columns(table) if c in want]
+
+    def _index_rows(self, table, order_ids=None, names=None):
+        # index input rows for the whole table or some orders
+        sql = f"SELECT {', '.join(map(_q, self._index_cols(table, names)))} FROM {table}"
+        if order_ids is None:
+            return self._read(sql)
+        ids = [order_ids] if isinstance(order_ids, str) else list(order_ids)
+        return self._read(f"{sql} WHERE orderId IN (SELECT value FROM json_each(?))", (json.dumps(ids, ensure_ascii=False),))
+
+    def _item_rowids(self, order_id):
+        return [r[0] for r in self._fetch("SELECT rowid FROM items WHERE orderId=? ORDER BY rowid", (order_id,))]
+
+    def _index_item_rows(self, rowids):
+        return self._read(f"SELECT {', '.join(map(_q, self._index_cols('items')))} FROM items "
+                          "WHERE rowid IN (SELECT value FROM json_each(?))", (json.dumps(rowids),))
+
+    def _sales_groups(self, dim):
+        # one dimension of SalesIndex as a GROUP BY; non-numeric amounts count as 0
+        table, keys, _, measures = DIMENSIONS[dim]
+        cols = self._columns(table)
+        sel = [_q(c) if c in cols else f"NULL AS {_q(c)}" for c in keys]
+        for m in measures:
+            c = MEASURES[m]
+            if c is None:
+                sel.append(f"COUNT(*) AS {m}")
+            elif c in cols:
+                sel.append(f"TOTAL(CASE WHEN typeof({_q(c)}) IN ('integer', 'real') THEN {_q(c)} END) AS {m}")
+            else:
+                sel.append(f"0 AS {m}")
+        return self._read(f"SELECT {', '.join(sel)} FROM {table} GROUP BY {', '.join(str(i + 1) for i in range(len(keys)))}")
+
+    def _order_row(self, order_id):
+        cols = [c for c in (CUSTOMER_COL, TOTAL_COL) if c in self._columns("orders")]
+        row = self._conn.execute(f"SELECT 1{''.join(', ' + _q(c) for c in cols)} FROM orders WHERE orderId=?", (order_id,)).fetchone()
+        return None if row is None else dict(zip(cols, row[1:]))
+
+    def _rebuild_stats(self):
+        self._stats.reset()
+        cols = self._columns("orders")
+        self._stats.count = self._scalar("SELECT COUNT(*) FROM orders")
+        if TOTAL_COL in cols:
+            # non-numeric totals count as 0, as in OrderStats
+            self._stats.total = float(self._scalar(
+                f"SELECT TOTAL(CASE WHEN typeof({_q(TOTAL_COL)}) IN ('integer', 'real') THEN {_q(TOTAL_COL)} END) FROM orders"))
+        if CUSTOMER_COL in cols:
+            counts = self._fetch(f"SELECT {_q(CUSTOMER_COL)}, COUNT(*) FROM orders WHERE {_q(CUSTOMER_COL)} IS NOT NULL GROUP BY 1")
+            self._stats.add_counts(dict(counts))
+
+    def _columns(self, table):
+        if table not in self._columns_cache:
+            with self._lock:
+                self._columns_cache[table] = [r[1] for r in self._conn.execute(f"PRAGMA table_info({table})")]
+        return self._columns_cache[table]
+
+    def _ensure_columns(self, table, cols):
+        have = set(self._columns(table))
+        for c in cols:
+            if c not in have:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {_q(c)}")
+                self._columns_cache[table].append(c)
+                have.add(c)
+
+    def _scalar(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()[0]
+
+    def _fetch(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _read(self, sql, params=()):
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=list(params))
+
+    def _cached(self, key, fn):
+        version = self.version
+        if version != self._cache_version:
+            self._cache, self._cache_version = {}, version
+            self._columns_cache = {}  # another process may have added columns
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
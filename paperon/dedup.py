@@ -0,0 +1,156 @@
+"""Duplicate / collision checks for incoming orders against a store.
+
+An orderId is a truncated hash of the order key (customer, person, totals),
+so an ID that is already registered means either the same order imported
+again (a duplicate) or a different order whose key hashes alike (a
+collision). Stores keep a 64-bit digest of every order's key as it was first
+registered, and ``register`` compares a batch against them in O(batch):
+
+* collisions are re-keyed to a wide ID, so they never merge into an
+  unrelated order;
+* duplicates follow ``policy``: ``skip`` drops them, ``merge`` adds only the
+  items the stored order does not have yet, ``replace`` swaps the stored
+  order for the incoming one.
+"""
+import hashlib
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .normalize import canon_value, canonical_key, wide_order_id
+from .schema import ORDER_KEY_COLS
+
+POLICIES = ("skip", "merge", "replace")
+POLICY_LABELS = {"skip": "スキップ", "merge": "マージ（不足明細のみ追加）", "replace": "置き換え"}
+
+
+def order_keys(orders):
+    """Canonical key text of each order (Series indexed by orderId)."""
+    cols = [c for c in ORDER_KEY_COLS if c in orders.columns]
+    rows = orders[cols].itertuples(index=False, name=None)
+    return pd.Series([canonical_key(r) for r in rows], index=orders["orderId"].to_numpy(), dtype=object)
+
+
+def key_digest(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+def key_digests(orders):
+    """64-bit key digest of each order (Series indexed by orderId)."""
+    return order_keys(orders).map(key_digest)
+
+
+def rekey(frame, mapping):
+    if not mapping or not len(frame):
+        return frame
+    frame = frame.copy()
+    frame["orderId"] = frame["orderId"].map(lambda oid: mapping.get(oid, oid))
+    return frame
+
+
+class BloomFilter:
+    """Probabilistic set of strings: no false negatives, about ``error``
+    false positives once ``capacity`` keys are in. Adds and lookups are
+    vectorized over a whole batch of keys."""
+
+    def __init__(self, capacity, error=0.01):
+        self.capacity = max(int(capacity), 1024)
+        self.size = int(-self.capacity * math.log(error) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, keys):
+        keys = np.asarray(keys, dtype=object)
+        h1 = pd.util.hash_array(keys, hash_key="paperon-bloom-01")
+        h2 = pd.util.hash_array(keys, hash_key="paperon-bloom-02") | np.uint64(1)
+        i = np.arange(self.hashes, dtype=np.uint64)[:, None]
+        return (h1 + i * h2) % np.uint64(self.size)  # double hashing; uint64 wraps around
+
+    def add(self, keys):
+        pos = self._positions(keys)
+        np.bitwise_or.at(self.bits, pos >> np.uint64(3), (1 << (pos & np.uint64(7))).astype(np.uint8))
+        self.count += len(keys)
+
+    def might_contain(self, keys):
+        if not len(keys):
+            return np.zeros(0, dtype=bool)
+        pos = self._positions(keys)
+        return ((self.bits[pos >> np.uint64(3)] >> (pos & np.uint64(7)).astype(np.uint8)) & 1).all(axis=0).astype(bool)
+
+
+@dataclass
+class DedupReport:
+    policy: str = "skip"
+    new: int = 0
+    duplicates: list = field(default_factory=list)  # orderIds registered before with the same key
+    collisions: dict = field(default_factory=dict)  # incoming orderId -> wide ID it was stored under
+    merged_items: int = 0
+
+    def message(self):
+        parts = []
+        if self.duplicates:
+            n = len(self.duplicates)
+            if self.policy == "merge":
+                parts.append(f"重複 {n:,} 件をマージ（追加明細 {self.merged_items:,} 件）")
+            else:
+                parts.append(f"重複 {n:,} 件を{POLICY_LABELS[self.policy]}")
+        if self.collisions:
+            parts.append(f"ID衝突 {len(self.collisions):,} 件を別IDで登録")
+        return " / ".join(parts)
+
+
+def _missing_items(store, items, order_ids):
+    # incoming item rows the stored orders lack (as a multiset, so repeated lines count)
+    cols = [c for c in items.columns if c != "orderId"]
+    have = store.items_for(order_ids).reindex(columns=["orderId"] + cols)
+    counts = Counter((oid, tuple(map(canon_value, r))) for oid, *r in have.itertuples(index=False, name=None))
+    keep = []
+    wanted = items["orderId"].isin(order_ids).to_numpy()
+    for p, (oid, *r) in zip(np.flatnonzero(wanted), items[["orderId"] + cols].iloc[wanted].itertuples(index=False, name=None)):
+        row = (oid, tuple(map(canon_value, r)))
+        if counts[row]:
+            counts[row] -= 1
+        else:
+            keep.append(p)
+    return np.asarray(keep, dtype=np.intp)
+
+
+def register(store, orders, items, sources=(), policy="skip"):
+    """Append a normalized batch to ``store`` with duplicate / collision handling.
+
+    Runs in one ``store.transaction()`` and returns a ``DedupReport``.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"unknown policy: {policy!r} (expected one of {', '.join(POLICIES)})")
+    report = DedupReport(policy)
+    with store.transaction():
+        digests = None
+        if len(orders):
+            orders = orders.drop_duplicates("orderId")
+            keys = order_keys(orders)
+            digests = keys.map(key_digest)
+            known = store.known_digests(orders["orderId"])
+            clash = {oid: wide_order_id(keys[oid]) for oid, d in known.items() if d != digests[oid]}
+            if clash:
+                orders, items = rekey(orders, clash), rekey(items, clash)
+                digests.index = [clash.get(oid, oid) for oid in digests.index]
+                known = store.known_digests(orders["orderId"])  # an earlier import may hold the wide ID already
+                report.collisions = clash
+            dup = [oid for oid, d in known.items() if d == digests[oid]]
+            report.duplicates, report.new = dup, len(orders) - len(dup)
+            if dup and policy == "replace":
+                store.delete_orders(dup)
+            elif dup:
+                orders = orders[~orders["orderId"].isin(dup)]
+                rest = items[~items["orderId"].isin(dup)]
+                if policy == "merge":
+                    extra = items.take(_missing_items(store, items, dup))
+                    report.merged_items = len(extra)
+                    rest = pd.concat([rest, extra]).sort_index()
+                items = rest
+        store.append(orders, items, sources, digests=digests)
+    return report
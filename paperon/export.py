@@ -0,0 +1,161 @@
+"""Batch-wise export of the order store to XLSX / CSV / Parquet files."""
+import codecs
+import importlib.util
+import os
+import tempfile
+import weakref
+import zipfile
+
+import pandas as pd
+
+from .schema import MONEY_COLS
+
+DEFAULT_BATCH_ROWS = 10_000
+FORMATS = {
+    "xlsx": ("sales_after_edit.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("sales_after_edit_csv.zip", "application/zip"),
+    "parquet": ("sales_after_edit_parquet.zip", "application/zip"),
+}
+_NUMERIC_COLS = set(MONEY_COLS) | {"items.count"}
+_REQUIRES = {"xlsx": "xlsxwriter", "parquet": "pyarrow"}  # writer libraries, imported on use
+
+
+def missing_formats():
+    """``{format: module}`` of the formats whose writer library is not installed."""
+    return {fmt: mod for fmt, mod in _REQUIRES.items() if importlib.util.find_spec(mod) is None}
+
+
+def _sheets(store, batch_size):
+    orders = store.orders_frame()
+
+    def order_batches():
+        for start in range(0, len(orders), batch_size):
+            yield orders.iloc[start:start + batch_size]
+
+    return [("Orders", list(orders.columns), order_batches()),
+            ("OrderItems", store.item_columns(), store.iter_items(batch_size))]
+
+
+def _cells(batch, columns):
+    batch = batch.reindex(columns=columns)
+    return batch.astype(object).where(batch.notna(), None).itertuples(index=False, name=None)
+
+
+def write_xlsx(store, path, batch_size=DEFAULT_BATCH_ROWS):
+    """Stream both sheets through xlsxwriter's constant_memory mode (rows are
+    flushed to disk as they are written)."""
+    import xlsxwriter
+
+    wb = xlsxwriter.Workbook(path, {"constant_memory": True})
+    try:
+        bold = wb.add_format({"bold": True})
+        for name, columns, batches in _sheets(store, batch_size):
+            ws = wb.add_worksheet(name)
+            ws.write_row(0, 0, columns, bold)
+            r = 1
+            for batch in batches:
+                for row in _cells(batch, columns):
+                    ws.write_row(r, 0, row)
+                    r += 1
+    finally:
+        wb.close()
+
+
+def _write_csv(raw, columns, batches):
+    raw.write(codecs.BOM_UTF8)  # so Excel opens it as UTF-8
+    header = True
+    for batch in batches:
+        raw.write(batch.reindex(columns=columns).to_csv(index=False, header=header).encode("utf-8"))
+        header = False
+    if header:
+        raw.write(pd.DataFrame(columns=columns).to_csv(index=False).encode("utf-8"))
+
+
+def write_csv_zip(store, path, batch_size=DEFAULT_BATCH_ROWS):
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, columns, batches in _sheets(store, batch_size):
+            with zf.open(f"{name}.csv", "w") as raw:
+                _write_csv(raw, columns, batches)
+
+
+def _arrow_schema(columns):
+    import pyarrow as pa
+
+    return pa.schema([(c, pa.float64() if c in _NUMERIC_COLS else pa.string()) for c in columns])
+
+
+def _arrow_batch(batch, columns):
+    out = {}
+    for c in columns:
+        col = batch[c] if c in batch.columns else pd.Series(None, index=batch.index, dtype=object)
+        if c in _NUMERIC_COLS:
+            out[c] = pd.to_numeric(col, errors="coerce").astype("float64")
+        else:
+            out[c] = col.astype(object).where(col.notna(), None).map(lambda v: v if v is None else str(v))
+    return pd.DataFrame(out, index=batch.index)
+
+
+def _write_parquet(raw, columns, batches):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(columns)
+    with pq.ParquetWriter(raw, schema) as pw:
+        for batch in batches:
+            pw.write_table(pa.Table.from_pandas(_arrow_batch(batch, columns), schema=schema, preserve_index=False))
+
+
+def write_parquet_zip(store, path, batch_size=DEFAULT_BATCH_ROWS):
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, columns, batches in _sheets(store, batch_size):
+            with zf.open(f"{name}.parquet", "w") as raw:
+                _write_parquet(raw, columns, batches)
+
+
+WRITERS = {"xlsx": write_xlsx, "csv": write_csv_zip, "parquet": write_parquet_zip}
+_TABLE_WRITERS = {"csv": _write_csv, "parquet": _write_parquet}
+
+
+def write_tables(store, out_dir, fmt="csv", batch_size=DEFAULT_BATCH_ROWS):
+    """Plain files in ``out_dir``: Orders/OrderItems.{csv,parquet}, or sales.xlsx."""
+    os.makedirs(out_dir, exist_ok=True)
+    if fmt == "xlsx":
+        path = os.path.join(out_dir, "sales.xlsx")
+        write_xlsx(store, path, batch_size)
+        return [path]
+    paths = []
+    for name, columns, batches in _sheets(store, batch_size):
+        paths.append(os.path.join(out_dir, f"{name}.{fmt}"))
+        with open(paths[-1], "wb") as raw:
+            _TABLE_WRITERS[fmt](raw, columns, batches)
+    return paths
+
+
+def export_store(store, path, fmt="xlsx", batch_size=DEFAULT_BATCH_ROWS):
+    WRITERS[fmt](store, path, batch_size)
+    return path
+
+
+def export_to_tempfile(store, fmt="xlsx", batch_size=DEFAULT_BATCH_ROWS):
+    fd, path = tempfile.mkstemp(prefix="paperon-export-", suffix=os.path.splitext(FORMATS[fmt][0])[1])
+    os.close(fd)
+    try:
+        return export_store(store, path, fmt, batch_size)
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def _remove(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class TempExport:
+    """An ``export_to_tempfile`` file that is deleted once this object is
+    dropped (e.g. with the Streamlit session holding it), by ``remove()``,
+    or at interpreter exit, whichever comes first."""
+
+    def __init__(self, store, fmt="xlsx", batch_size=DEFAULT_BATCH_ROWS):
+        self.path = export_to_tempfile(store, fmt, batch_size)
+        self.remove = weakref.finalize(self, _remove, self.path)
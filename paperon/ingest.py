@@ -0,0 +1,175 @@
+"""Chunked CSV ingestion: parse and normalize a PaperOn export in bounded batches."""
+import codecs
+import os
+
+import pandas as pd
+
+from .normalize import StreamingNormalizer
+from .profiling import stage
+from .schema import HEADER_COLS, MONEY_COLS
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Read header/money cells as text: a chunk's dtype inference must not change how
+# an amount is spelled in the order key ("1000" vs "1000.0"). Money columns that
+# are float over the whole file are read as float instead (``_float_money_cols``).
+_TEXT_COLS = dict.fromkeys(HEADER_COLS + MONEY_COLS, str)
+
+
+_SAMPLE_BYTES = 64 * 1024
+_BOM = codecs.BOM_UTF8
+
+
+def _raw_buffer(file):
+    # UploadedFile/BytesIO expose their buffer without a copy
+    if hasattr(file, "getbuffer"):
+        return file.getbuffer()
+    file.seek(0)
+    return file.read()
+
+
+def _candidates(raw):
+    if bytes(raw[:3]) == _BOM:
+        return ["utf-8-sig"]
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(bytes(raw[:_SAMPLE_BYTES]), final=False)
+        return ["utf-8", "cp932"]
+    except UnicodeDecodeError:
+        return ["cp932", "utf-8"]
+
+
+def decode_upload(file):
+    """Decode the whole upload once; returns ``(encoding, text)`` or ``(None, None)``.
+
+    A sample of the raw bytes picks the likely codec, and decoding the full
+    buffer is the validity check, so late cp932 bytes cannot slip through.
+    The text is the whole file: it is parsed from memory, not decoded twice.
+    """
+    with stage("decode"):
+        return _decode(file)
+
+
+def _decode(file):
+    raw = _raw_buffer(file)
+    try:
+        for enc in _candidates(raw):
+            try:
+                return enc, str(raw, enc)
+            except UnicodeDecodeError:
+                continue
+        return None, None
+    finally:
+        if isinstance(raw, memoryview):
+            raw.release()
+
+
+def detect_encoding(file):
+    return decode_upload(file)[0]
+
+
+class TextSource:
+    """Minimal read-only file over an already decoded string.
+
+    Hands the CSV parser slices of ``text`` instead of copying the whole
+    string into a StringIO buffer.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.size = len(text)
+        self._pos = 0
+
+    def read(self, n=-1):
+        end = self.size if n is None or n < 0 else min(self._pos + n, self.size)
+        out = self.text[self._pos:end]
+        self._pos = end
+        return out
+
+    def readline(self, limit=-1):
+        end = self.text.find("\n", self._pos)
+        end = self.size if end < 0 else end + 1
+        if limit is not None and limit >= 0:
+            end = min(end, self._pos + limit)
+        out = self.text[self._pos:end]
+        self._pos = end
+        return out
+
+    def __iter__(self):
+        return iter(self.readline, "")
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, pos, whence=os.SEEK_SET):
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._pos, os.SEEK_END: self.size}[whence]
+        self._pos = max(0, min(base + pos, self.size))
+        return self._pos
+
+
+def _file_size(file):
+    size = getattr(file, "size", None)
+    if size is None:
+        pos = file.tell()
+        size = file.seek(0, os.SEEK_END)
+        file.seek(pos)
+    return size or 1
+
+
+def _float_money_cols(file, encoding, chunksize):
+    # Money columns a single pd.read_csv of the whole file types as float64
+    # (plain numbers with gaps, e.g. header totals on the first row only). The
+    # historical keys spell those amounts "1000.0", so the chunks must get them
+    # as floats as well; one chunk's own inference is not enough to tell.
+    kinds = {}
+    file.seek(0)
+    with stage("scan"), pd.read_csv(file, encoding=encoding, chunksize=chunksize, usecols=lambda c: c in MONEY_COLS) as reader:
+        for chunk in reader:
+            for c, dtype in chunk.dtypes.items():
+                kinds.setdefault(c, set()).add(dtype.kind)
+    return [c for c, k in kinds.items() if "f" in k and "O" not in k]
+
+
+def iter_normalized_csv(file, normalizer, encoding=None, chunksize=DEFAULT_CHUNK_ROWS):
+    """Yield ``(items_chunk, fraction_read)`` while feeding ``normalizer``.
+
+    Orders (including the one still open at the chunk boundary) are available
+    at any point via ``normalizer.orders()``.
+    """
+    size = _file_size(file)
+    dtype = {**_TEXT_COLS, **dict.fromkeys(_float_money_cols(file, encoding, chunksize), float)}
+    file.seek(0)
+    reader = pd.read_csv(file, encoding=encoding, chunksize=chunksize, dtype=dtype)
+    with reader:
+        while True:
+            with stage("parse") as info:
+                chunk = next(reader, None)
+                info["rows"] = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                return
+            items = normalizer.feed(chunk)
+            yield items, min(file.tell() / size, 1.0)
+
+
+def read_normalized_csv(file, encoding=None, chunksize=DEFAULT_CHUNK_ROWS, on_progress=None):
+    """Streaming counterpart of ``pd.read_csv`` + ``normalize_tables``.
+
+    ``file`` is a binary file (pass ``encoding``) or a ``TextSource``. The CSV
+    is parsed and normalized chunk by chunk, but every chunk's items end up in
+    the one table returned, so peak memory still grows with the file size.
+    Callers that can use the items chunk by chunk take ``iter_normalized_csv``.
+    """
+    normalizer = StreamingNormalizer()
+    parts = []
+    for items, frac in iter_normalized_csv(file, normalizer, encoding, chunksize):
+        parts.append(items)
+        if on_progress is not None:
+            on_progress(frac, normalizer)
+    items = pd.concat(parts) if parts else pd.DataFrame(columns=["orderId"])
+    return normalizer.orders(), items
+
+
+def read_columns(file, encoding=None):
+    file.seek(0)
+    cols = pd.read_csv(file, encoding=encoding, nrows=0).columns
+    file.seek(0)
+    return list(cols)
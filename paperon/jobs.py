@@ -0,0 +1,181 @@
+"""Background registration jobs (a thread pool plus job records the UI can poll)."""
+import io
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+
+from .cache import content_key
+from .dedup import register
+from .ingest import TextSource, decode_upload, read_normalized_csv
+from .profiling import Profiler, stage
+
+ACTIVE = ("queued", "running")
+
+
+class Cancelled(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    id: int
+    name: str
+    owner: str = None
+    status: str = "queued"  # queued / running / done / error / cancelled / skipped
+    progress: float = 0.0
+    rows_read: int = 0
+    items: int = 0
+    orders: int = 0
+    message: str = ""
+    error: str = None
+    created: float = field(default_factory=time.time)
+    started: float = None
+    finished: float = None
+    profile: list = None  # Profiler records, when requested
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def active(self):
+        return self.status in ACTIVE
+
+    @property
+    def seconds(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise Cancelled()
+
+
+class JobQueue:
+    """Runs ``fn(job)`` callables on worker threads, keeping a record per job.
+
+    Job fields are written only by the worker running it; readers just poll
+    them. Finished jobs are kept (up to ``keep``) so a UI can show outcomes.
+    """
+
+    def __init__(self, max_workers=1, keep=50):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="paperon-job")
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.keep = keep
+
+    def submit(self, name, fn, owner=None):
+        job = Job(next(self._ids), name, owner)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run, job, fn)
+        return job
+
+    def jobs(self, owner=None):
+        with self._lock:
+            return [j for j in self._jobs.values() if owner is None or j.owner == owner]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def forget(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and not job.active:
+                del self._jobs[job_id]
+
+    def shutdown(self, wait=True):
+        for job in self.jobs():
+            job.cancel()
+        self._pool.shutdown(wait=wait)
+
+    def _run(self, job, fn):
+        job.started = time.time()
+        try:
+            job.check_cancelled()
+            job.status = "running"
+            fn(job)
+            if job.status == "running":
+                job.status = "done"
+                job.progress = 1.0
+        except Cancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status, job.error = "error", f"{type(e).__name__}: {e}"
+        finally:
+            job.finished = time.time()
+
+    def _prune(self):
+        done = [j for j in self._jobs.values() if not j.active]
+        for j in done[:max(len(done) - self.keep, 0)]:
+            del self._jobs[j.id]
+
+
+def csv_import_job(store, data, key=None, cache=None, profile=None, policy="skip"):
+    """A job function registering one CSV upload (``data`` = the raw bytes).
+
+    Progress follows the rows actually parsed; cancellation is checked between
+    chunks. The normalized tables are registered in one ``dedup.register``
+    call (``policy`` for orders already in the store), so a cancelled or
+    failed job leaves the store untouched. That is why the chunks are not
+    handed to the store one by one (the memory store cannot roll back a
+    half-registered file): the decoded text and the file's normalized tables
+    are held until the commit, and peak memory grows with the file size.
+    ``profile`` is None (off) or the ``memory`` flag for a Profiler whose
+    records land on the job.
+    """
+    def run(job):
+        with Profiler(job.name, memory=profile) if profile is not None else nullcontext() as prof:
+            _import(job, store, data, key, cache, policy)
+        if prof is not None:
+            job.profile = prof.records()
+    return run
+
+
+def _import(job, store, data, key, cache, policy):
+    buf = io.BytesIO(data)
+    key = key or content_key(buf)
+    if store.has_source(key):
+        job.status, job.message = "skipped", "同じ内容のCSVは既に登録済みです"
+        return
+    result = cache.get(("normalized", key)) if cache is not None else None
+    if result is None:
+        job.message = "文字コードを判定しています"
+        enc, text = decode_upload(buf)
+        if enc is None:
+            raise ValueError("エンコーディング判定に失敗しました")
+        job.check_cancelled()
+
+        def on_progress(frac, norm):
+            job.progress = min(frac, 1.0) * 0.95  # the rest is the commit
+            job.rows_read, job.items = norm.rows_read, norm.items_count
+            job.message = f"{norm.rows_read:,} 行 / 明細 {norm.items_count:,} 件"
+            job.check_cancelled()
+
+        result = read_normalized_csv(TextSource(text), on_progress=on_progress)
+        if cache is not None:
+            cache.put(("normalized", key), result)
+    orders, items = result
+    job.check_cancelled()
+    job.message = "ストアに登録しています"
+    with store.transaction():
+        if store.has_source(key):  # a concurrent job registered the same file
+            job.status, job.message = "skipped", "同じ内容のCSVは既に登録済みです"
+            return
+        with stage("merge", len(items)):
+            report = register(store, orders, items, sources=[key], policy=policy)
+    job.orders, job.items = len(orders), len(items)
+    job.message = f"注文 {len(orders):,} 件 / 明細 {len(items):,} 件を登録しました"
+    if report.message():
+        job.message += f"（{report.message()}）"
@@ -0,0 +1,96 @@
+"""Running summary KPIs (order count, total amount, top customer) kept up to date by deltas."""
+import heapq
+import math
+import numbers
+from collections import Counter
+
+import pandas as pd
+
+CUSTOMER_COL = "orderer.companyName"
+TOTAL_COL = "totalPriceInfo.totalPrice"
+
+
+def _amount(v):
+    # same rule as the old summary: non-numeric / missing totals count as 0
+    if isinstance(v, numbers.Real) and not isinstance(v, bool):
+        return 0.0 if math.isnan(v) else float(v)
+    v = pd.to_numeric(pd.Series([v], dtype=object), errors="coerce").iloc[0]
+    return 0.0 if pd.isna(v) else float(v)
+
+
+def _customer(v):
+    return None if v is None or (isinstance(v, float) and math.isnan(v)) or v is pd.NA else v
+
+
+class OrderStats:
+    """Order count, summed ``totalPrice`` and orders per customer.
+
+    Stores call ``add`` / ``change`` / ``remove`` with the affected order rows
+    as they mutate, so ``summary()`` costs the same for any number of orders.
+    The top customer comes from a max-heap with lazy deletion: every count
+    change pushes a fresh entry and outdated ones are dropped when they
+    surface. Ties go to the smallest customer name.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total = 0.0
+        self._customers = Counter()
+        self._heap = []
+
+    def add(self, orders):
+        """Register new orders (a frame with ``orderId`` and the header columns)."""
+        if not len(orders):
+            return
+        self.count += len(orders)
+        if TOTAL_COL in orders.columns:
+            self.total += float(pd.to_numeric(orders[TOTAL_COL], errors="coerce").fillna(0).sum())
+        if CUSTOMER_COL in orders.columns:
+            self.add_counts(orders[CUSTOMER_COL].value_counts(dropna=True))
+
+    def add_counts(self, counts):
+        """Add ``{customer: n_orders}`` (a dict or a value_counts Series)."""
+        for name, n in counts.items():
+            self._bump(name, int(n))
+
+    def change(self, old, new):
+        """One order's header went from ``old`` to ``new`` (dicts of its fields)."""
+        if TOTAL_COL in new:
+            self.total += _amount(new[TOTAL_COL]) - _amount(old.get(TOTAL_COL))
+        if CUSTOMER_COL in new:
+            before, after = _customer(old.get(CUSTOMER_COL)), _customer(new[CUSTOMER_COL])
+            if before != after:
+                self._bump(before, -1)
+                self._bump(after, 1)
+
+    def remove(self, old):
+        self.count -= 1
+        self.total -= _amount(old.get(TOTAL_COL))
+        self._bump(_customer(old.get(CUSTOMER_COL)), -1)
+
+    def top_customer(self):
+        """``(name, n_orders)`` of the customer with the most orders, or ``(None, 0)``."""
+        heap = self._heap
+        while heap and self._customers.get(heap[0][1], 0) != -heap[0][0]:
+            heapq.heappop(heap)
+        return (heap[0][1], -heap[0][0]) if heap else (None, 0)
+
+    def summary(self):
+        name, n = self.top_customer()
+        return {"orders": self.count, "total_amount": self.total, "top_customer": name, "top_customer_orders": n}
+
+    def _bump(self, name, delta):
+        if name is None:
+            return
+        n = self._customers[name] + delta
+        if n > 0:
+            self._customers[name] = n
+            heapq.heappush(self._heap, (-n, name))
+        else:
+            self._customers.pop(name, None)
+        if len(self._heap) > 2 * len(self._customers) + 64:
+            self._heap = [(-k, c) for c, k in self._customers.items()]
+            heapq.heapify(self._heap)
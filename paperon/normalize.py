@@ -0,0 +1,198 @@
+"""Columnar normalization of a PaperOn CSV into orders / items tables."""
+import hashlib
+import math
+import numbers
+import os
+
+import numpy as np
+import pandas as pd
+
+from .profiling import stage
+from .schema import HEADER_COLS, MONEY_COLS, ORDER_KEY_COLS, ORDER_BASE_COLS, ORDER_TOTAL_COLS
+
+_INT_RE = r"[+-]?\d+"
+# hex digits of SHA-1 in an orderId: 8 is the width the app has always used (only
+# colliding orders get WIDE_ID_HEX), 16 makes collisions negligible for large volumes
+ID_HEX = min(max(int(os.environ.get("PAPERON_ID_HEX", "8")), 8), 40)
+WIDE_ID_HEX = max(ID_HEX, 16)
+
+
+def to_order_id(key, width=None):
+    h = hashlib.sha1(key.encode("utf-8")).hexdigest()[:width or ID_HEX].upper()
+    return f"ORD-{h}"
+
+
+def canon_value(v):
+    """One spelling per key value, whatever dtype the frame (or SQLite) handed back."""
+    if v is None or v is pd.NA or (isinstance(v, float) and math.isnan(v)):
+        return ""
+    if isinstance(v, numbers.Real) and not isinstance(v, (bool, np.bool_)):
+        return repr(float(v))
+    return str(v)
+
+
+def canonical_key(values):
+    """Canonical key text of one order from its ORDER_KEY_COLS values."""
+    return "\x1f".join(map(canon_value, values))
+
+
+def wide_order_id(canon_key):
+    """The ``WIDE_ID_HEX`` orderId a colliding order is re-keyed to.
+
+    Always built from the ``canonical_key`` spelling, so the same order gets
+    the same wide ID whether it collided inside one file or against the store.
+    """
+    return to_order_id(canon_key, WIDE_ID_HEX)
+
+
+def to_order_ids(keys, seen=None, rows=None):
+    """orderIds for a Series of order keys.
+
+    Hashes each distinct key once and broadcasts back to the rows. When two
+    different keys truncate to the same ID, the key seen first keeps it and
+    the later one gets a ``wide_order_id`` (from the canonical key of its
+    first row in ``rows``, the frame the keys were made from). ``seen``
+    ({orderId: key}) carries that first-come state across the chunks of one
+    file.
+    """
+    codes, uniques = pd.factorize(keys, use_na_sentinel=False)
+    hashed = np.array([to_order_id(k) for k in uniques], dtype=object)
+    seen = {} if seen is None else seen
+    key_cols = [c for c in ORDER_KEY_COLS if rows is not None and c in rows.columns]
+    for i, (oid, k) in enumerate(zip(hashed, uniques)):
+        first = seen.setdefault(oid, k)
+        if first != k:
+            if key_cols:
+                k = canonical_key(rows[key_cols].iloc[np.flatnonzero(codes == i)[0]])
+            hashed[i] = wide_order_id(k)
+    return pd.Series(hashed[codes], index=keys.index)
+
+
+def to_number_series(s):
+    """Vectorized "1,234円" -> number conversion.
+
+    Mirrors the historical per-cell ``pd.to_numeric(str(v))`` conversion,
+    including its dtype: missing cells become ``pd.NA`` (object column),
+    otherwise the column is int64 / float64 as pandas would infer it. A float
+    column (plain numbers with gaps) therefore stays float, and its amounts are
+    spelled "1234.0" in the order key, as they always were.
+    """
+    # money strings repeat a lot (forward-filled headers), so clean each distinct value once
+    codes, uniques = pd.factorize(s)
+    na = codes < 0
+    if na.all():
+        return pd.Series(pd.NA, index=s.index, dtype=object)
+    txt = pd.Series(uniques).astype(str)
+    txt = txt.str.replace(",", "", regex=False).str.replace("円", "", regex=False).str.strip()
+    num = pd.to_numeric(txt, errors="coerce")
+    if not na.any():
+        return pd.Series(num.to_numpy().take(codes), index=s.index)
+    # cells keep their own int/float type when mixed with NA
+    vals = num.to_numpy(dtype=object)
+    intlike = txt.str.fullmatch(_INT_RE).to_numpy()
+    if intlike.any():
+        vals[intlike] = list(pd.to_numeric(txt[intlike]))
+    out = vals.take(codes)
+    out[na] = pd.NA
+    return pd.Series(out, index=s.index, dtype=object)
+
+
+def make_order_keys(items):
+    key_cols = [c for c in ORDER_KEY_COLS if c in items.columns]
+    if not key_cols:
+        return pd.Series("", index=items.index, dtype=object)
+    parts = [items[c].astype(str) for c in key_cols]
+    return parts[0].str.cat(parts[1:], sep="|") if len(parts) > 1 else parts[0]
+
+
+def _normalize_items(df_ff, seen=None):
+    if "items.name" not in df_ff.columns:
+        raise ValueError("CSVに 'items.name' 列がありません。PaperOnの出力列名をご確認ください。")
+    items = df_ff[df_ff["items.name"].notna()].copy()
+
+    present_money = [c for c in MONEY_COLS if c in items.columns]
+    with stage("money", len(items)):
+        for c in present_money:
+            items[c] = to_number_series(items[c])
+
+    with stage("hash", len(items)):
+        keys = make_order_keys(items)
+        if (keys == "").all():
+            keys = pd.Series(items.index.astype(str), index=items.index)
+            items.insert(0, "orderId", to_order_ids(keys, seen))
+        else:
+            items.insert(0, "orderId", to_order_ids(keys, seen, items))
+    return items
+
+
+def _order_agg_map(columns):
+    base_cols = [c for c in ORDER_BASE_COLS if c in columns]
+    return {**{c:"first" for c in base_cols}, **{c:"max" for c in ORDER_TOTAL_COLS if c in columns}}
+
+
+def aggregate_orders(frame):
+    # "first"/"max" are associative, so this also merges per-chunk partial aggregates
+    agg_map = _order_agg_map(frame.columns)
+    with stage("groupby", len(frame)):
+        orders = frame.groupby("orderId", as_index=False).agg(agg_map)
+    return orders[["orderId"] + list(agg_map)]
+
+
+def _ffill(frame, carry=None):
+    # same result as pandas' (deprecated) silent downcast after ffill/fillna, without the warning
+    with stage("ffill", len(frame)), pd.option_context("future.no_silent_downcasting", True):
+        frame = frame.ffill()
+        if carry is not None:
+            frame = frame.fillna(carry)
+        return frame.infer_objects()
+
+
+def normalize_tables(df):
+    present_headers = [c for c in HEADER_COLS if c in df.columns]
+    df_ff = df.copy()
+    if present_headers:
+        df_ff[present_headers] = _ffill(df_ff[present_headers])
+
+    items = _normalize_items(df_ff)
+    orders = aggregate_orders(items)
+    return orders, items
+
+
+class StreamingNormalizer:
+    """normalize_tables for a CSV that arrives in consecutive row chunks.
+
+    The header forward-fill state and the partial order aggregates are carried
+    across chunk boundaries, so feeding every chunk and calling ``orders()``
+    gives the same tables as normalizing the whole frame at once.
+    """
+
+    def __init__(self):
+        self._carry = None      # last forward-filled header row
+        self._partials = []     # per-chunk order aggregates
+        self._ids = {}          # orderId -> key, to widen colliding IDs consistently
+        self.rows_read = 0
+        self.items_count = 0
+
+    def feed(self, chunk):
+        present_headers = [c for c in HEADER_COLS if c in chunk.columns]
+        df_ff = chunk.copy()
+        if present_headers:
+            df_ff[present_headers] = _ffill(df_ff[present_headers], self._carry)
+            self._carry = df_ff[present_headers].iloc[-1] if len(df_ff) else self._carry
+        self.rows_read += len(chunk)
+
+        items = _normalize_items(df_ff, self._ids)
+        self.items_count += len(items)
+        if len(items):
+            self._partials.append(aggregate_orders(items))
+            if len(self._partials) >= 32:
+                self.orders()
+        return items
+
+    def orders(self):
+        """Orders seen so far; the last one may still grow with the next chunk."""
+        if not self._partials:
+            return pd.DataFrame(columns=["orderId"])
+        if len(self._partials) > 1:
+            self._partials = [aggregate_orders(pd.concat(self._partials, ignore_index=True))]
+        return self._partials[0].copy()
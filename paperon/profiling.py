@@ -0,0 +1,129 @@
+"""Opt-in per-stage timing / memory instrumentation.
+
+Pipeline code marks its stages with ``stage("name", rows)``; that is a no-op
+unless a ``Profiler`` is active in the current context::
+
+    with Profiler(memory=True) as prof:
+        orders, items = read_normalized_csv(...)
+    prof.records()   # [{"stage": "parse", "seconds": ..., "rows": ..., ...}, ...]
+
+Stages with the same name (one per CSV chunk, say) are summed into one record.
+Memory peaks come from tracemalloc, which is process-wide and slows Python
+allocation noticeably; they are only exact while one profiled run is active.
+"""
+import contextvars
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger("paperon.profile")
+
+_active = contextvars.ContextVar("paperon_profiler", default=None)
+
+
+class Profiler:
+    def __init__(self, name="run", memory=False):
+        self.name = name
+        self.memory = memory
+        self.seconds = 0.0
+        self._stats = {}      # stage -> {"seconds", "rows", "calls", "peak"}
+        self._stack = []      # open stages: [name, t0, mem_start, peak_abs]
+        self._token = None
+        self._started_tracing = False
+
+    def __enter__(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._token = _active.set(self)
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._t0
+        _active.reset(self._token)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return False
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            cur, peak = tracemalloc.get_traced_memory()
+            if self._stack:  # keep the enclosing stage's peak before resetting it
+                self._stack[-1][3] = max(self._stack[-1][3], peak)
+            tracemalloc.reset_peak()
+            frame = [name, time.perf_counter(), cur, cur]
+        else:
+            frame = [name, time.perf_counter(), 0, 0]
+        self._stack.append(frame)
+        info = {"rows": rows}
+        try:
+            yield info
+        finally:
+            self._stack.pop()
+            seconds = time.perf_counter() - frame[1]
+            peak = None
+            if tracing and tracemalloc.is_tracing():
+                peak_abs = max(frame[3], tracemalloc.get_traced_memory()[1])
+                peak = peak_abs - frame[2]
+                if self._stack:
+                    self._stack[-1][3] = max(self._stack[-1][3], peak_abs)
+            self.add(name, seconds, info["rows"], peak)
+
+    def add(self, name, seconds, rows=None, peak=None):
+        s = self._stats.setdefault(name, {"seconds": 0.0, "rows": 0, "calls": 0, "peak": None})
+        s["seconds"] += seconds
+        s["calls"] += 1
+        if rows is not None:
+            s["rows"] += int(rows)
+        if peak is not None:
+            s["peak"] = peak if s["peak"] is None else max(s["peak"], peak)
+
+    def records(self):
+        out = []
+        for name, s in self._stats.items():
+            out.append({
+                "run": self.name,
+                "stage": name,
+                "seconds": round(s["seconds"], 6),
+                "calls": s["calls"],
+                "rows": s["rows"] or None,
+                "rows_per_sec": round(s["rows"] / s["seconds"]) if s["rows"] and s["seconds"] else None,
+                "peak_mb": None if s["peak"] is None else round(s["peak"] / 1e6, 3),
+            })
+        if self.seconds:
+            out.append({"run": self.name, "stage": "total", "seconds": round(self.seconds, 6), "calls": 1,
+                        "rows": None, "rows_per_sec": None, "peak_mb": None})
+        return out
+
+    def log(self, **extra):
+        """Emit one JSON line per stage on the ``paperon.profile`` logger."""
+        for rec in self.records():
+            logger.info(json.dumps({**rec, **extra}, ensure_ascii=False))
+
+    def to_jsonl(self, **extra):
+        return "".join(json.dumps({**rec, **extra}, ensure_ascii=False) + "\n" for rec in self.records())
+
+
+def active():
+    return _active.get()
+
+
+@contextmanager
+def stage(name, rows=None):
+    """Time ``name`` on the active profiler, if any.
+
+    Yields a dict whose ``"rows"`` may be set inside the block when the row
+    count is only known afterwards.
+    """
+    prof = _active.get()
+    if prof is None:
+        yield {"rows": rows}
+        return
+    with prof.stage(name, rows) as info:
+        yield info
@@ -0,0 +1,221 @@
+"""Item price and order total recalculation (Page 2 save, bulk edits)."""
+import numpy as np
+import pandas as pd
+
+from .store import check_revision
+
+
+def recalc_line_prices(items):
+    """items.taxExcludedPrice = unit price x count, when both columns exist."""
+    if "items.taxExcludedUnitPrice" in items.columns and "items.count" in items.columns:
+        items["items.taxExcludedPrice"] = pd.to_numeric(items["items.taxExcludedUnitPrice"], errors="coerce") * pd.to_numeric(items["items.count"], errors="coerce")
+    return items
+
+
+def order_totals(items, tax_rate):
+    subtotal = 0.0
+    if "items.taxExcludedPrice" in items.columns:
+        subtotal = pd.to_numeric(items["items.taxExcludedPrice"], errors="coerce").fillna(0).sum()
+    tax = round(subtotal * tax_rate, 0)
+    return {"totalPriceInfo.subTotalPrice": subtotal, "totalPriceInfo.taxAmount": tax, "totalPriceInfo.totalPrice": subtotal + tax}
+
+
+def save_order_items(store, order_id, items, tax_rate, expected_revision=None):
+    """Recalculate ``items`` of one order, write them and the new totals back.
+
+    With ``expected_revision`` the save fails with ``ConflictError`` if the
+    order was written by someone else after that revision was read.
+    """
+    items = recalc_line_prices(items.copy())
+    totals = order_totals(items, tax_rate)
+    with store.transaction():
+        check_revision(store, order_id, expected_revision)
+        header = store.get_order(order_id)
+        store.replace_items(order_id, items)
+        store.update_order(order_id, {k: v for k, v in totals.items() if k in header})
+    return totals
+
+
+_LINE_INPUTS = {"items.taxExcludedUnitPrice", "items.count"}
+_PRICE = "items.taxExcludedPrice"
+_PRICE_COLS = ["items.taxExcludedUnitPrice", "items.count", _PRICE]
+
+
+def _num(value):
+    value = pd.to_numeric(value, errors="coerce")
+    return None if pd.isna(value) else value
+
+
+def save_order_patch(store, order_id, tax_rate, updates=None, added=None, deleted=(), expected_revision=None):
+    """Save an edit of one order's items given as a patch and update its totals.
+
+    ``updates`` ({row position: {column: value}}), ``added`` (a frame) and
+    ``deleted`` (positions) are what the item editor reports, with internal
+    column names. Line prices are recalculated for the touched rows only and
+    columns the editor does not show are kept. The totals are summed from the
+    items like ``save_order_items`` and ``bulk_update`` do, reading just the
+    line price column back. Raises ``ConflictError`` like ``save_order_items``.
+    """
+    deleted = sorted({int(p) for p in deleted})
+    updates = {int(p): dict(cells) for p, cells in (updates or {}).items() if int(p) not in deleted}
+    added = recalc_line_prices(pd.DataFrame(added if added is not None else []).reset_index(drop=True))
+    with store.transaction():
+        check_revision(store, order_id, expected_revision)
+        header = store.get_order(order_id)
+        old = store.items_at(order_id, sorted(updates), _PRICE_COLS).to_dict("index")
+        for p, cells in updates.items():
+            row = {**old[p], **cells}
+            if _LINE_INPUTS & cells.keys() and _LINE_INPUTS <= row.keys():
+                unit, count = _num(row["items.taxExcludedUnitPrice"]), _num(row["items.count"])
+                cells[_PRICE] = None if unit is None or count is None else unit * count
+        store.patch_items(order_id, updates, added, deleted)
+        totals = order_totals(store.items_at(order_id, None, [_PRICE]), tax_rate)
+        store.update_order(order_id, {k: v for k, v in totals.items() if k in header})
+    return totals
+
+
+# ---- bulk recalculation (many orders in one vectorized pass) ----
+TAX_BUCKETS = ("08", "10", "Etc")
+TAX_RATES = {"08": 0.08, "10": 0.10, "Etc": 0.0}
+_ITEM_TOUCHED = ["items.taxExcludedUnitPrice", "items.taxExcludedPrice", "items.taxAmount", "items.taxIncludedPrice"]
+
+
+def tax_buckets(items):
+    """Rate bucket of each item from ``items.taxInfo``: "08", "10" or "Etc".
+
+    Items without a rate (hand entries) count as standard-rate "10"."""
+    if "items.taxInfo" not in items.columns:
+        return pd.Series("10", index=items.index, dtype=object)
+    info = items["items.taxInfo"]
+    rate = pd.to_numeric(info.astype(str).str.normalize("NFKC").str.extract(r"(\d+(?:\.\d+)?)", expand=False), errors="coerce")
+    out = np.where(rate == 8, "08", np.where(rate == 10, "10", "Etc"))
+    out[info.isna().to_numpy()] = "10"
+    return pd.Series(out, index=items.index, dtype=object)
+
+
+def _whole(s):
+    # integral amounts back as int64, like the amounts parsed from the CSV
+    return s.astype("int64") if s.notna().all() and (s % 1 == 0).all() else s
+
+
+def bulk_recalc(items, prices=None, discount=None, nums=None, tax_rates=None):
+    """Reprice / discount ``items`` of many orders and recompute their totals.
+
+    prices: ``{items.num: new tax-excluded unit price}``.
+    discount: fraction taken off the unit price (0.1 = 10% off), for the
+        items whose number is in ``nums`` (all items when ``nums`` is None).
+    tax_rates: ``{"08"|"10"|"Etc": rate}`` overriding ``TAX_RATES``.
+
+    Line prices are unit price x count; taxes are computed per order and
+    rate bucket (``tax_buckets``) in one groupby over all items. Returns the
+    new items and a frame of header fields (totalPriceInfo.* and the per-rate
+    subTotals.*) indexed by orderId. The CSV's own subTotals.* only ride along
+    on the item rows (the orders table does not keep them), so the per-rate
+    split is recomputed from ``items.taxInfo`` instead of read back.
+    """
+    items = items.copy()
+    rates = {**TAX_RATES, **(tax_rates or {})}
+    if "items.taxExcludedUnitPrice" in items.columns and "items.num" in items.columns:
+        unit = pd.to_numeric(items["items.taxExcludedUnitPrice"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        num = items["items.num"].astype(str)
+        if prices:
+            new = pd.to_numeric(num.map(prices), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            unit = np.where(np.isnan(new), unit, new)
+        if discount:
+            hit = num.isin(nums).to_numpy() if nums else True
+            unit = np.where(hit, np.round(unit * (1 - discount)), unit)
+        items["items.taxExcludedUnitPrice"] = _whole(pd.Series(unit, index=items.index))
+    recalc_line_prices(items)
+    if "items.taxExcludedPrice" not in items.columns:
+        items["items.taxExcludedPrice"] = 0
+    items["items.taxExcludedPrice"] = _whole(items["items.taxExcludedPrice"])
+    price = pd.to_numeric(items["items.taxExcludedPrice"], errors="coerce").fillna(0)
+    bucket = tax_buckets(items)
+    line_tax = (price * bucket.map(rates).astype(float)).round(0)
+    # per-item tax columns are kept up to date where the CSV filled them in
+    for c, v in (("items.taxAmount", line_tax), ("items.taxIncludedPrice", price + line_tax)):
+        if c in items.columns and items[c].notna().any():
+            has = items[c].notna().to_numpy()
+            items[c] = items[c].astype(object)
+            items.loc[has, c] = _whole(v[has]).to_numpy()
+
+    sub = pd.DataFrame({"orderId": items["orderId"].to_numpy(), "bucket": bucket.to_numpy(), "price": price.to_numpy()})
+    sub = sub.groupby(["orderId", "bucket"], sort=False)["price"].sum().unstack(fill_value=0)
+    sub = sub.reindex(columns=list(TAX_BUCKETS), fill_value=0)
+    tax = (sub * pd.Series(rates)[list(TAX_BUCKETS)]).round(0)
+    head = {}
+    for b in TAX_BUCKETS:
+        head[f"subTotals.subTotalPriceExclude{b}"] = sub[b]
+        head[f"subTotals.taxAmount{b}"] = tax[b]
+        head[f"subTotals.totalPriceInclude{b}"] = sub[b] + tax[b]
+    head["totalPriceInfo.subTotalPrice"] = sub.sum(axis=1)
+    head["totalPriceInfo.taxAmount"] = tax.sum(axis=1)
+    head["totalPriceInfo.totalPrice"] = head["totalPriceInfo.subTotalPrice"] + head["totalPriceInfo.taxAmount"]
+    headers = pd.DataFrame({k: _whole(v) for k, v in head.items()})
+    headers.index.name = "orderId"
+    return items, headers
+
+
+def _changed(old, new, cols):
+    # rows whose values differ in any of ``cols`` (numbers compared as numbers)
+    diff = np.zeros(len(new), dtype=bool)
+    for c in cols:
+        if c not in new.columns:
+            continue
+        if c not in old.columns:
+            diff |= new[c].notna().to_numpy()
+            continue
+        a = pd.to_numeric(old[c], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        b = pd.to_numeric(new[c], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        diff |= ~((a == b) | (np.isnan(a) & np.isnan(b)))
+    return diff
+
+
+def _bulk_plan(store, order_ids, prices, discount, nums, tax_rates):
+    # (result, items to rewrite, their orders, changed headers) of a bulk edit
+    items = store.items_for(order_ids)
+    if not len(items):
+        return {"orders": 0, "items": 0, "total_before": 0.0, "total_after": 0.0}, items, set(), pd.DataFrame()
+    new_items, headers = bulk_recalc(items, prices, discount, nums, tax_rates)
+    old_headers, _ = store.query_orders(ids=headers.index, limit=len(headers))
+    old_headers = old_headers.set_index("orderId").reindex(headers.index)
+    # per-rate columns only where the data has them or the bucket is used
+    keep = [c for c in headers.columns if not c.startswith("subTotals.") or c in old_headers.columns or headers[c].any()]
+    headers = headers[keep]
+    item_diff = _changed(items, new_items, _ITEM_TOUCHED)
+    touched = set(new_items.loc[item_diff, "orderId"])
+    changed = headers.index.isin(touched)
+    if tax_rates:  # every order's taxes may move, not just the repriced ones
+        stored = [c for c in headers.columns if c in old_headers.columns]
+        changed |= _changed(old_headers, headers, stored)
+        # fields the orders table does not hold yet: against the same edit at the old rates
+        _, at_old = bulk_recalc(items, prices, discount, nums)
+        changed |= _changed(at_old.reindex(headers.index), headers, [c for c in headers.columns if c not in stored])
+    changed = headers.index[changed]
+    before = pd.to_numeric(old_headers.loc[changed, "totalPriceInfo.totalPrice"], errors="coerce") \
+        if "totalPriceInfo.totalPrice" in old_headers.columns else pd.Series(dtype=float)
+    result = {"orders": len(changed), "items": int(item_diff.sum()),
+              "total_before": float(before.fillna(0).sum()),
+              "total_after": float(headers.loc[changed, "totalPriceInfo.totalPrice"].sum())}
+    return result, new_items[new_items["orderId"].isin(touched)], touched, headers.loc[changed]
+
+
+def bulk_update(store, order_ids, prices=None, discount=None, nums=None, tax_rates=None, dry_run=False):
+    """Apply ``bulk_recalc`` to the orders ``order_ids`` of ``store``.
+
+    Only orders whose items or totals actually change are written, in one
+    ``replace_items_many`` and one ``update_orders`` call inside a single
+    transaction. Returns ``{"orders", "items", "total_before", "total_after"}``
+    for the changed orders; ``dry_run`` computes it from a plain read, without
+    opening the write transaction.
+    """
+    order_ids = list(order_ids)
+    if dry_run:  # a preview only reads: no write transaction, no version bump
+        return _bulk_plan(store, order_ids, prices, discount, nums, tax_rates)[0]
+    with store.transaction():
+        result, rewrite, touched, headers = _bulk_plan(store, order_ids, prices, discount, nums, tax_rates)
+        if len(rewrite):
+            store.replace_items_many(rewrite, sorted(touched))
+        if len(headers):
+            store.update_orders(headers)
+    return result
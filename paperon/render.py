@@ -0,0 +1,29 @@
+"""HTML fragments for the Streamlit UI (no Streamlit import needed)."""
+
+
+def yen_fmt(x):
+    try:
+        x = float(x)
+        return f"{x:,.0f} 円"
+    except Exception:
+        return "-"
+
+
+def order_card_html(r):
+    total = yen_fmt(r.get("totalPriceInfo.totalPrice", None))
+    sub = yen_fmt(r.get("totalPriceInfo.subTotalPrice", None))
+    tax = yen_fmt(r.get("totalPriceInfo.taxAmount", None))
+    cust = r.get("orderer.companyName","-")
+    person = r.get("orderer.personName","-")
+    return f'''
+    <div class="order-card">
+      <div class="order-id">{r["orderId"]}</div>
+      <div class="order-cust">{cust}</div>
+      <div class="order-meta">担当: {person if person else "-"}</div>
+      <div style="margin-top:8px;">
+        <span class="badge">小計 {sub}</span>
+        <span class="badge" style="margin-left:6px;">税 {tax}</span>
+        <span class="badge" style="margin-left:6px;background:#DCFCE7;border-color:#BBF7D0;color:#166534;">合計 {total}</span>
+      </div>
+    </div>
+    '''
@@ -0,0 +1,29 @@
+"""Column layout of the PaperOn CSV export."""
+
+HEADER_COLS = [
+  "supplier.companyName","supplier.department","supplier.personName","supplier.postalCode","supplier.address","supplier.tel","supplier.fax",
+  "orderer.companyName","orderer.department","orderer.personName","orderer.owner","orderer.postalCode","orderer.address","orderer.tel","orderer.fax","orderer.email","orderer.homepage",
+  "totalPriceInfo.totalPrice","totalPriceInfo.subTotalPrice","totalPriceInfo.taxAmount","totalPriceInfo.taxInfo",
+  "subTotals.totalPriceInclude08","subTotals.totalPriceInclude10","subTotals.totalPriceIncludeEtc",
+  "subTotals.subTotalPriceExclude08","subTotals.subTotalPriceExclude10","subTotals.subTotalPriceExcludeEtc",
+  "subTotals.discount","subTotals.taxAmount08","subTotals.taxAmount10","subTotals.taxAmountEtc","subTotals.taxInfo","subTotals.etcAmount"
+]
+ITEM_COLS = [
+  "items.name","items.num","items.count","items.date","items.discount","items.etc","items.quantityUnit",
+  "items.taxExcludedUnitPrice","items.taxExcludedPrice","items.taxIncludedUnitPrice","items.taxIncludedPrice","items.taxAmount","items.taxInfo"
+]
+MONEY_COLS = [
+  "items.taxExcludedUnitPrice","items.taxExcludedPrice","items.taxIncludedUnitPrice","items.taxIncludedPrice","items.taxAmount",
+  "totalPriceInfo.totalPrice","totalPriceInfo.subTotalPrice","totalPriceInfo.taxAmount",
+  "subTotals.totalPriceInclude08","subTotals.totalPriceInclude10","subTotals.totalPriceIncludeEtc",
+  "subTotals.subTotalPriceExclude08","subTotals.subTotalPriceExclude10","subTotals.subTotalPriceExcludeEtc",
+  "subTotals.discount","subTotals.taxAmount08","subTotals.taxAmount10","subTotals.taxAmountEtc","subTotals.etcAmount"
+]
+
+# Header fields that identify an order (see normalize.make_order_keys)
+ORDER_KEY_COLS = [
+  "orderer.companyName","orderer.personName",
+  "totalPriceInfo.subTotalPrice","totalPriceInfo.taxAmount","totalPriceInfo.totalPrice"
+]
+ORDER_BASE_COLS = ["orderer.companyName","orderer.personName"]
+ORDER_TOTAL_COLS = ["totalPriceInfo.subTotalPrice","totalPriceInfo.taxAmount","totalPriceInfo.totalPrice"]
@@ -0,0 +1,143 @@
+"""Incremental search index over orders and their items.
+
+Text search covers customer, person, item name and item number. Every
+distinct (field, text) is a *term* that knows the orders containing it, and
+terms are indexed by their 1- and 2-character grams: a query intersects the
+gram sets of its word, verifies the few surviving terms and unions their
+orders, so its cost follows the number of matching terms rather than the
+number of items. Text is NFKC-folded and lower-cased (全角/半角 and case do
+not matter). Stores feed the index the rows each write adds or removes.
+"""
+import functools
+import math
+import unicodedata
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+from .kpi import CUSTOMER_COL, TOTAL_COL
+
+FIELDS = {"customer": CUSTOMER_COL, "person": "orderer.personName", "item": "items.name", "num": "items.num"}
+ORDER_FIELDS = ("customer", "person")
+ITEM_FIELDS = ("item", "num")
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def fold(text):
+    return unicodedata.normalize("NFKC", text).lower().strip()
+
+
+def has_conditions(text="", min_total=None, max_total=None):
+    """Whether a search has anything to filter on (no index needed otherwise)."""
+    return bool((text or "").split()) or min_total is not None or max_total is not None
+
+
+def _grams(text):
+    return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _text(s):
+    # item numbers may come back as floats (123.0) when the column has gaps
+    if s.dtype.kind == "f" and (s.dropna() % 1 == 0).all():
+        s = s.astype("Int64")
+    return s.astype(str)
+
+
+def _totals(orders):
+    if TOTAL_COL not in orders.columns:
+        return np.full(len(orders), np.nan)
+    return pd.to_numeric(orders[TOTAL_COL], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+class SearchIndex:
+    """See module docstring. ``add`` / ``remove`` take frames with an ``orderId``
+    column: order header rows and/or item rows."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._ids = {}                   # (field, folded text) -> term id
+        self._texts = []                 # term id -> folded text
+        self._orders = []                # term id -> Counter {orderId: rows}
+        self._grams = defaultdict(set)   # (field, gram) -> term ids
+        self._totals = {}                # orderId -> totalPrice (NaN if not a number)
+        self._by_total = None            # (sorted totals, orderIds), rebuilt on demand
+
+    def add(self, orders=None, items=None):
+        self._apply(orders, items, 1)
+
+    def remove(self, orders=None, items=None):
+        self._apply(orders, items, -1)
+
+    def search(self, text="", fields=tuple(FIELDS), match="substring", min_total=None, max_total=None):
+        """Set of orderIds matching every word of ``text`` (in any of ``fields``,
+        ``match`` = "substring" or "prefix") and the totalPrice range.
+        None when there is no condition at all."""
+        hits = None
+        for word in fold(text or "").split():
+            found = set()
+            for field in fields:
+                for tid in self._match(field, word, match):
+                    found.update(self._orders[tid])
+            hits = found if hits is None else hits & found
+            if not hits:
+                return set()
+        if min_total is None and max_total is None:
+            return hits
+        lo = -math.inf if min_total is None else min_total
+        hi = math.inf if max_total is None else max_total
+        if hits is not None:
+            return {oid for oid in hits if lo <= self._totals.get(oid, math.nan) <= hi}
+        if self._by_total is None:
+            ids = np.array(list(self._totals), dtype=object)
+            vals = np.array(list(self._totals.values()), dtype=float)
+            order = np.argsort(vals, kind="stable")  # NaN sorts last
+            self._by_total = (vals[order], ids[order])
+        vals, ids = self._by_total
+        return set(ids[np.searchsorted(vals, lo, "left"):np.searchsorted(vals, hi, "right")])
+
+    def _match(self, field, word, match):
+        grams = {word} if len(word) == 1 else {word[i:i + 2] for i in range(len(word) - 1)}
+        sets = sorted((self._grams.get((field, g), ()) for g in grams), key=len)
+        if not sets[0]:
+            return []
+        cand = set(sets[0]).intersection(*sets[1:])
+        test = str.startswith if match == "prefix" else str.__contains__
+        return [tid for tid in cand if self._orders[tid] and test(self._texts[tid], word)]
+
+    def _apply(self, orders, items, sign):
+        for fields, frame in ((ORDER_FIELDS, orders), (ITEM_FIELDS, items)):
+            if frame is None or not len(frame):
+                continue
+            for field in fields:
+                col = FIELDS[field]
+                if col not in frame.columns:
+                    continue
+                ok = frame[col].notna().to_numpy()
+                pairs = pd.DataFrame({"t": _text(frame[col][ok]).to_numpy(), "o": frame["orderId"].to_numpy()[ok]})
+                for (text, oid), n in pairs.value_counts(sort=False).items():
+                    self._count(field, fold(text), oid, sign * n)
+        if orders is not None and len(orders):
+            if sign > 0:
+                self._totals.update(zip(orders["orderId"], _totals(orders)))
+            else:
+                for oid in orders["orderId"]:
+                    self._totals.pop(oid, None)
+            self._by_total = None
+
+    def _count(self, field, text, oid, n):
+        tid = self._ids.get((field, text))
+        if tid is None:
+            if n <= 0 or not text:
+                return
+            tid = self._ids[field, text] = len(self._texts)
+            self._texts.append(text)
+            self._orders.append(Counter())
+            for g in _grams(text):
+                self._grams[field, g].add(tid)
+        rows = self._orders[tid]
+        rows[oid] += n
+        if rows[oid] <= 0:
+            del rows[oid]
@@ -0,0 +1,473 @@
+"""In-memory order store: order headers plus their items, indexed by orderId."""
+import functools
+import itertools
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .compact import Segment
+from .dedup import key_digests
+from .kpi import OrderStats
+from .search import FIELDS, SearchIndex, has_conditions
+
+_COMPACT_SEGMENTS = 64
+
+
+class ConflictError(Exception):
+    """The order was changed by someone else since it was read."""
+
+
+def check_revision(store, order_id, expected):
+    """Raise ConflictError unless ``order_id`` is still at revision ``expected``.
+
+    Call it inside ``store.transaction()`` together with the write it guards.
+    """
+    if expected is not None and store.order_revision(order_id) != expected:
+        raise ConflictError(order_id)
+
+
+def _concat(parts, **kw):
+    """pd.concat of item / order frames without pandas 2.2's all-NA FutureWarning.
+
+    A column with nothing in it is left out of a part when another part has
+    values for it; concat fills the gap with NA just the same, and the result
+    dtype comes from the values (what the deprecated behaviour did).
+    """
+    filled = {c for p in parts for c in p.columns if p[c].notna().any()}
+    cols = list(dict.fromkeys(c for p in parts for c in p.columns))
+    parts = [p.drop(columns=[c for c in p.columns if c in filled and not p[c].notna().any()]) for p in parts]
+    return pd.concat(parts, **kw).reindex(columns=cols)
+
+
+def _locked(fn):
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return fn(self, *args, **kwargs)
+    return wrapper
+
+
+class OrderStore:
+    """Orders and items kept so that one order can be read or rewritten in O(order size).
+
+    Items live in append-only segments (one per registered batch, compactly
+    encoded, see ``compact.Segment``); ``_where`` maps each orderId to the row
+    positions of its items inside those segments.
+    Replacing an order's items tombstones the old rows and appends a new small
+    segment, and the segments are compacted once enough garbage piles up.
+
+    Frames returned by ``orders_frame()``/``items_frame()`` are cached per
+    version and shared; treat them as read-only. Every call takes the store's
+    lock, so one instance can serve all Streamlit sessions of a process;
+    ``transaction()`` holds it across a check-then-write sequence, and
+    ``order_revision()`` changes whenever an order is written.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._lock = threading.RLock()
+        self.clear()
+
+    # ---- reads ----
+    def __len__(self):
+        return len(self._orders)
+
+    def __contains__(self, order_id):
+        return order_id in self._orders.index
+
+    @property
+    def empty(self):
+        return len(self._orders) == 0
+
+    def order_ids(self):
+        return self._orders.index.tolist()
+
+    def order_revision(self, order_id):
+        return self._revs.get(order_id, 0)
+
+    def transaction(self):
+        """The store's lock, for several calls that must not interleave with other writers."""
+        return self._lock
+
+    @_locked
+    def get_order(self, order_id):
+        row = self._orders.loc[order_id].to_dict()
+        row["orderId"] = order_id
+        return row
+
+    @_locked
+    def order_items(self, order_id):
+        parts = [self._segments[seg].take(pos) for seg, pos in self._where.get(order_id, [])]
+        if not parts:  # no items (yet): the item columns, like the SQLite store
+            return pd.DataFrame(columns=self.item_columns() or ["orderId"])
+        out = _concat(parts) if len(parts) > 1 else parts[0]
+        return out.reset_index(drop=True)
+
+    @_locked
+    def items_for(self, order_ids):
+        """Items of several orders at once (in storage order)."""
+        by_seg = {}
+        for order_id in order_ids:
+            for seg, pos in self._where.get(order_id, []):
+                by_seg.setdefault(seg, []).append(pos)
+        parts = [self._segments[seg].take(np.sort(np.concatenate(p))) for seg, p in sorted(by_seg.items())]
+        if not parts:
+            return pd.DataFrame(columns=["orderId"])
+        return _concat(parts, ignore_index=True)
+
+    @_locked
+    def items_at(self, order_id, positions, columns=None):
+        """Rows ``positions`` (0-based, in ``order_items`` order; all rows when
+        None) of one order, indexed by position; only ``columns`` if given."""
+        flat = self._flat(order_id)
+        positions = list(range(len(flat)) if positions is None else positions)
+        out = self._take_rows([flat[p] for p in positions], columns)
+        out.index = positions
+        return out
+
+    @_locked
+    def summary(self):
+        """Order count, total amount and top customer, maintained incrementally."""
+        return self._stats.summary()
+
+    @_locked
+    def orders_frame(self):
+        if self._cache.get("orders") is None:
+            self._cache["orders"] = self._orders.reset_index()
+        return self._cache["orders"]
+
+    @_locked
+    def search(self, text="", fields=tuple(FIELDS), match="substring", min_total=None, max_total=None):
+        """orderIds matching a text / totalPrice search (see ``search.SearchIndex``),
+        or None without conditions. The index is built on first use and then
+        kept up to date by every write."""
+        if not has_conditions(text, min_total, max_total):
+            return None
+        if "search" not in self._indexes:
+            self._build_index("search", SearchIndex())
+        return self._indexes["search"].search(text, fields, match, min_total, max_total)
+
+    @_locked
+    def sales(self, dim, period=None):
+        """Sales totals by "customer", "item", "tax" or "date" (see
+        ``analytics.SalesIndex``). Built on first use, then kept up to date by
+        every write."""
+        if "sales" not in self._indexes:
+            from .analytics import SalesIndex  # analytics -> recalc -> store
+            self._build_index("sales", SalesIndex())
+        return self._indexes["sales"].table(dim, period)
+
+    @_locked
+    def query_orders(self, customer=None, sort_by="orderId", ascending=True, offset=0, limit=30, ids=None):
+        """One page of orders, filtered by customer substring and/or to the
+        orderIds ``ids`` (e.g. from ``search``), and sorted.
+
+        Returns ``(page, n_matches)``; only ``limit`` rows are materialized.
+        """
+        orders = self.orders_frame()
+        pos = self._sorted_positions(sort_by, ascending)
+        if ids is not None:
+            hit = np.zeros(len(orders), dtype=bool)
+            at = self._orders.index.get_indexer(list(ids))
+            hit[at[at >= 0]] = True
+            pos = pos[hit[pos]]
+        if customer and "orderer.companyName" in orders.columns:
+            if "names" not in self._cache:
+                self._cache["names"] = orders["orderer.companyName"].astype(str).str.lower()
+            hit = self._cache["names"].str.contains(customer.lower(), regex=False).to_numpy()
+            pos = pos[hit[pos]]
+        return orders.take(pos[offset:offset + limit]), len(pos)
+
+    @_locked
+    def item_columns(self):
+        return list(dict.fromkeys(c for seg in self._segments for c in seg.columns))
+
+    def iter_items(self, batch_size=10_000):
+        """Live items in storage order, ``batch_size`` rows at a time."""
+        with self._lock:  # segments are immutable; the tombstone masks are not
+            parts = [(seg, alive.copy()) for seg, alive in zip(self._segments, self._alive)]
+        for seg, alive in parts:
+            for start in range(0, len(seg), batch_size):
+                mask = alive[start:start + batch_size]
+                if mask.all():
+                    yield seg.slice(start, start + batch_size)
+                elif mask.any():
+                    yield seg.take(np.flatnonzero(mask) + start)
+
+    def has_source(self, source_key):
+        return source_key in self._sources
+
+    @_locked
+    def known_digests(self, order_ids):
+        """``{orderId: key digest}`` for those of ``order_ids`` already stored (see ``dedup``)."""
+        keys = self._keys
+        return {oid: keys[oid] for oid in order_ids if oid in keys}
+
+    @_locked
+    def items_frame(self):
+        if self._cache.get("items") is None:
+            self._cache["items"] = self._live_items()
+        return self._cache["items"]
+
+    @_locked
+    def memory_usage(self):
+        """Deep byte size of the stored orders and items (caches excluded)."""
+        return int(self._orders.memory_usage(deep=True).sum()) + sum(seg.memory_usage() for seg in self._segments)
+
+    def _sorted_positions(self, sort_by, ascending):
+        key = ("sorted", sort_by, ascending)
+        if key not in self._cache:
+            orders = self.orders_frame()
+            if sort_by not in orders.columns:
+                pos = np.arange(len(orders))
+            else:
+                col = orders[sort_by]
+                if sort_by.startswith("totalPriceInfo."):
+                    col = pd.to_numeric(col, errors="coerce")
+                pos = col.reset_index(drop=True).sort_values(ascending=ascending, na_position="last", kind="stable").index.to_numpy()
+            self._cache[key] = pos
+        return self._cache[key]
+
+    # ---- writes ----
+    @_locked
+    def append(self, orders, items, sources=(), digests=None):
+        """Add a normalized batch. Items of an already known orderId are added to
+        that order; its existing header row is kept. ``sources`` are the
+        content keys of the uploads the batch came from; ``digests`` the
+        orders' key digests, if the caller has them already.
+        ``dedup.register`` wraps this with duplicate / collision handling."""
+        if len(orders):
+            new = orders.drop_duplicates("orderId")
+            new = new[~new["orderId"].isin(self._orders.index)]
+            if len(new):
+                digests = key_digests(new) if digests is None else digests
+                self._keys.update((oid, int(digests[oid])) for oid in new["orderId"])
+                self._feed("add", orders=new)
+                new = new.set_index("orderId")
+                self._orders = _concat([self._orders, new]) if len(self._orders) else new
+                self._stats.add(new)
+        if len(items):
+            self._feed("add", items=items)
+            seg = self._add_segment(items)
+            for order_id, pos in items.groupby("orderId", sort=False).indices.items():
+                self._where.setdefault(order_id, []).append((seg, pos))
+                self._bump(order_id)
+        self._sources.update(sources)
+        self._touch()
+
+    @_locked
+    def update_order(self, order_id, fields):
+        """Set header ``fields`` of one order; an unknown orderId is added as a
+        new order without items."""
+        known = order_id in self._orders.index
+        if known:
+            self._stats.change(self._orders.loc[order_id].to_dict(), fields)
+        else:
+            self._stats.add(pd.DataFrame([fields]))
+            self._keys[order_id] = int(key_digests(pd.DataFrame([{**fields, "orderId": order_id}])).iloc[0])
+        if self._indexes and known:
+            self._feed("remove", orders=self._orders.loc[[order_id]].reset_index())
+        for col, value in fields.items():
+            self._orders.loc[order_id, col] = value
+        if self._indexes:
+            self._feed("add", orders=self._orders.loc[[order_id]].reset_index())
+        self._bump(order_id)
+        self._touch()
+
+    def replace_items(self, order_id, items):
+        """Swap one order's items for ``items`` (orderId is filled in)."""
+        items = items.copy()
+        if "orderId" in items.columns:
+            items["orderId"] = order_id
+        else:
+            items.insert(0, "orderId", order_id)
+        self.replace_items_many(items, [order_id])
+
+    @_locked
+    def replace_items_many(self, items, order_ids):
+        """Swap the items of all ``order_ids`` for the rows of ``items`` (by orderId)."""
+        order_ids = list(order_ids)
+        if self._indexes:
+            self._feed("remove", items=self.items_for(order_ids))
+        for order_id in order_ids:
+            self._drop_items(order_id)
+        if len(items):
+            seg = self._add_segment(items)
+            for order_id, pos in items.groupby("orderId", sort=False).indices.items():
+                self._where[order_id] = [(seg, pos)]
+        for order_id in order_ids:
+            self._bump(order_id)
+        self._feed("add", items=items)
+        self._touch()
+        self._maybe_compact()
+
+    @_locked
+    def patch_items(self, order_id, updates=None, added=None, deleted=()):
+        """Edit some of one order's items in place.
+
+        ``updates`` maps row positions (as in ``order_items``) to ``{column:
+        value}``, ``added`` is a frame of rows to append and ``deleted`` lists
+        positions to drop. Other rows and columns are left alone: the touched
+        rows move into a new small segment and keep their place in the order.
+        """
+        deleted = set(deleted)
+        updates = {p: cells for p, cells in (updates or {}).items() if p not in deleted}
+        changed = sorted(updates)
+        flat = self._flat(order_id)
+        touched = sorted(deleted | set(changed))
+        before = {}
+        for p in touched:
+            seg, row = flat[p]
+            before[p] = self._segments[seg].records([row])[0]
+        new = [{**before[p], **updates[p]} for p in changed]
+        if added is not None and len(added):
+            new += added.to_dict("records")
+        new = pd.DataFrame.from_records(new).assign(orderId=order_id) if new else pd.DataFrame()
+        for seg, row in (flat[p] for p in touched):
+            self._alive[seg][row] = False
+            self._dead += 1
+        seg = self._add_segment(new) if len(new) else None
+        rows, k = [], 0
+        for p, where in enumerate(flat):
+            if p in updates:
+                where, k = (seg, k), k + 1
+            if p not in deleted:
+                rows.append(where)
+        rows += [(seg, j) for j in range(k, len(new))]
+        runs = [(s, np.array([r for _, r in run])) for s, run in itertools.groupby(rows, key=lambda w: w[0])]
+        if runs:
+            self._where[order_id] = runs
+        else:
+            self._where.pop(order_id, None)
+        if self._indexes:
+            self._feed("remove", items=pd.DataFrame.from_records(list(before.values())))
+            self._feed("add", items=new)
+        self._bump(order_id)
+        self._touch()
+        self._maybe_compact()
+
+    @_locked
+    def update_orders(self, headers):
+        """Write header fields of many known orders (a frame indexed by orderId)."""
+        headers = headers[headers.index.isin(self._orders.index)]
+        if not len(headers):
+            return
+        old = self._orders.loc[headers.index]
+        for before, after in zip(old.to_dict("records"), headers.to_dict("records")):
+            self._stats.change(before, after)
+        if self._indexes:
+            self._feed("remove", orders=old.reset_index())
+        for col in headers.columns:
+            values = headers[col]
+            if col not in self._orders.columns:
+                self._orders[col] = pd.Series(pd.NA, index=self._orders.index, dtype=object)
+            if self._orders[col].dtype != values.dtype:
+                self._orders[col] = self._orders[col].astype(object)  # no silent upcasts of the stored column
+            self._orders.loc[headers.index, col] = values
+        if self._indexes:
+            self._feed("add", orders=self._orders.loc[headers.index].reset_index())
+        for order_id in headers.index:
+            self._bump(order_id)
+        self._touch()
+
+    def delete(self, order_id):
+        self.delete_orders([order_id])
+
+    @_locked
+    def delete_orders(self, order_ids):
+        order_ids = list(order_ids)
+        known = self._orders.index.intersection(order_ids)
+        for row in self._orders.loc[known].to_dict("records"):
+            self._stats.remove(row)
+        if self._indexes:
+            self._feed("remove", self._orders.loc[known].reset_index(), self.items_for(order_ids))
+        for order_id in order_ids:
+            self._drop_items(order_id)
+            self._keys.pop(order_id, None)
+            self._bump(order_id)
+        self._orders = self._orders.drop(index=known)
+        self._touch()
+        self._maybe_compact()
+
+    @_locked
+    def clear(self):
+        self._orders = pd.DataFrame(index=pd.Index([], name="orderId"))
+        self._segments = []
+        self._alive = []
+        self._where = {}
+        self._dead = 0
+        self._sources = set()  # content keys of registered uploads
+        self._stats = OrderStats()
+        self._revs = {}  # orderId -> write counter (optimistic concurrency)
+        self._keys = {}  # orderId -> key digest as first registered (duplicate / collision checks)
+        self._indexes = {}  # "search" / "sales" -> SearchIndex / SalesIndex, built on first use
+        self._touch()
+
+    @_locked
+    def compact(self):
+        items = self._live_items()
+        if len(items):
+            # keep each order's rows in their order_items order (patched rows sit in later segments)
+            start = np.cumsum([0] + [len(a) for a in self._alive])
+            rank = np.cumsum(np.concatenate(self._alive)) - 1
+            items = items.take(rank[np.concatenate([start[seg] + pos for parts in self._where.values() for seg, pos in parts])])
+            items = items.reset_index(drop=True)
+        self._segments, self._alive, self._where, self._dead = [], [], {}, 0
+        if len(items):
+            self._add_segment(items)
+            self._where = {k: [(0, v)] for k, v in items.groupby("orderId", sort=False).indices.items()}
+
+    # ---- internals ----
+    def _live_items(self):
+        parts = [seg.frame() if alive.all() else seg.take(np.flatnonzero(alive))
+                 for seg, alive in zip(self._segments, self._alive) if alive.any()]
+        return _concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+    def _add_segment(self, items):
+        self._segments.append(Segment(items))
+        self._alive.append(np.ones(len(items), dtype=bool))
+        return len(self._segments) - 1
+
+    def _flat(self, order_id):
+        # (segment, row) of each of the order's items, in order_items order
+        return [(seg, int(r)) for seg, pos in self._where.get(order_id, []) for r in pos]
+
+    def _take_rows(self, rows, columns=None):
+        # the items at (segment, row) pairs, in the order given
+        if not rows:
+            return pd.DataFrame(columns=["orderId"])
+        parts, order = [], []
+        for seg in sorted({s for s, _ in rows}):
+            ks = [k for k, (s, _) in enumerate(rows) if s == seg]
+            parts.append(self._segments[seg].take(np.array([rows[k][1] for k in ks]), columns))
+            order += ks
+        if len(parts) == 1:  # the common case: one segment, rows already in order
+            return parts[0].reset_index(drop=True)
+        return _concat(parts, ignore_index=True).iloc[np.argsort(order)].reset_index(drop=True)
+
+    def _drop_items(self, order_id):
+        for seg, pos in self._where.pop(order_id, []):
+            self._alive[seg][pos] = False
+            self._dead += len(pos)
+
+    def _maybe_compact(self):
+        live = sum(len(s) for s in self._segments) - self._dead
+        if len(self._segments) > _COMPACT_SEGMENTS or self._dead > max(live, 1024):
+            self.compact()
+
+    def _build_index(self, name, index):
+        index.add(self.orders_frame(), self.items_frame())
+        self._indexes[name] = index
+
+    def _feed(self, method, orders=None, items=None):
+        # the rows a write adds / removes, to every index built so far
+        for index in self._indexes.values():
+            getattr(index, method)(orders=orders, items=items)
+
+    def _bump(self, order_id):
+        self._revs[order_id] = self._revs.get(order_id, 0) + 1
+
+    def _touch(self):
+        self.version += 1
+        self._cache = {}
@@ -0,0 +1,60 @@
+import io
+
+import pandas as pd
+import pytest
+
+from benchmarks.synth import synth_frame
+from paperon.db import SqliteOrderStore
+from paperon.ingest import read_normalized_csv
+from paperon.schema import HEADER_COLS, MONEY_COLS
+from paperon.store import OrderStore
+
+
+def _csv(n_orders=40, items_per_order=5, seed=0, money="yen", header_rows="first", encoding="utf-8-sig"):
+    """A synthetic PaperOn CSV export (bytes).
+
+    money: "yen" -> "1,234円", "plain" -> "1234".
+    header_rows: "first" fills header cells on each order's first row only,
+        "all" repeats them on every item row.
+    """
+    frame = synth_frame(n_orders, items_per_order, seed)
+    if money == "plain":
+        for c in MONEY_COLS:
+            frame[c] = frame[c].str.replace(",", "", regex=False).str.replace("円", "", regex=False)
+    if header_rows == "all":
+        frame[HEADER_COLS] = frame[HEADER_COLS].ffill()
+    return frame.to_csv(index=False).encode(encoding)
+
+
+@pytest.fixture
+def make_csv():
+    return _csv
+
+
+@pytest.fixture
+def read_frame():
+    # what the app did with an upload: one pd.read_csv with pandas' own dtype inference
+    return lambda data, encoding="utf-8-sig": pd.read_csv(io.BytesIO(data), encoding=encoding)
+
+
+@pytest.fixture
+def tables():
+    """Normalized (orders, items) of a 40-order export."""
+    return read_normalized_csv(io.BytesIO(_csv(40, items_per_order=5)), "utf-8-sig")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    """An empty store of each kind; tests using it must pass for both."""
+    return OrderStore() if request.param == "memory" else SqliteOrderStore(str(tmp_path / "orders.db"))
+
+
+def _same_values(a, b):
+    a, b = (f.reset_index(drop=True).astype(object) for f in (a, b))
+    pd.testing.assert_frame_equal(a.where(a.notna(), None), b.where(b.notna(), None))
+
+
+@pytest.fixture
+def same_values():
+    """Assert two frames hold the same values, whatever dtype or missing marker each side uses."""
+    return _same_values
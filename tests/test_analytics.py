@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+
+from paperon.db import SqliteOrderStore
+from paperon.dedup import register
+from paperon.recalc import bulk_update, save_order_patch
+from paperon.store import OrderStore
+
+SALES = [("customer", None), ("item", None), ("tax", None), ("date", None), ("date", "month")]
+
+
+def _plain(df, by):
+    # compare values, not the dtype / missing marker each backend hands back
+    df = df.sort_values(by).reset_index(drop=True).astype(object)
+    return df.where(df.notna(), None).apply(lambda c: c.map(lambda v: float(v) if isinstance(v, (int, float)) else v))
+
+
+def _same_sales(a, b):
+    for dim, period in SALES:
+        x, y = a.sales(dim, period), b.sales(dim, period)
+        pd.testing.assert_frame_equal(_plain(x, list(x.columns[:1])), _plain(y, list(y.columns[:1])))
+
+
+def _edit(store, orders):
+    ids = list(orders["orderId"])
+    store.sales("item")  # built before the writes, so they go through the delta path
+    added = pd.DataFrame([{"items.name": "追加", "items.num": "X-1", "items.count": 2, "items.taxExcludedUnitPrice": 150}])
+    save_order_patch(store, ids[0], 0.1, {0: {"items.count": 9}}, added, [1])
+    store.update_order(ids[1], {"orderer.companyName": "新得意先"})
+    bulk_update(store, ids[:30], prices={num: 999 for num in store.items_for(ids[:3])["items.num"]})
+    store.delete_orders(ids[-5:])
+
+
+def test_sales_deltas_match_a_rebuild(store, tables):
+    register(store, *tables)
+    _edit(store, tables[0])
+    fresh = OrderStore()
+    fresh.append(store.orders_frame(), store.items_frame())
+    _same_sales(store, fresh)
+
+
+def test_memory_and_sqlite_stores_agree(tables, tmp_path):
+    orders, items = tables
+    stores = [OrderStore(), SqliteOrderStore(str(tmp_path / "t.db"))]
+    half = orders["orderId"].iloc[:20]
+    for s in stores:
+        register(s, orders[orders["orderId"].isin(half)], items[items["orderId"].isin(half)])
+        register(s, orders[~orders["orderId"].isin(half)], items[~items["orderId"].isin(half)])
+        _edit(s, orders)
+    mem, db = stores
+    pd.testing.assert_frame_equal(_plain(mem.orders_frame(), "orderId"), _plain(db.orders_frame(), "orderId"))
+    assert mem.search("得意先") == db.search("得意先") != set()
+    page = [s.query_orders(None, "totalPriceInfo.totalPrice", False, limit=20)[0]["orderId"].tolist() for s in stores]
+    assert page[0] == page[1]
+    for oid in mem.order_ids()[:10]:
+        pd.testing.assert_frame_equal(_plain(mem.order_items(oid), "items.name"), _plain(db.order_items(oid), "items.name"))
+    _same_sales(mem, db)
+
+
+@pytest.mark.parametrize("dim,period", SALES[1:])
+def test_sales_add_up_to_the_items(store, tables, dim, period):
+    store.append(*tables)
+    table = store.sales(dim, period)
+    assert table["amount"].sum() == pd.to_numeric(tables[1]["items.taxExcludedPrice"], errors="coerce").sum()
+    assert table["lines"].sum() == len(tables[1])
+
+
+def test_customer_sales_add_up_to_the_orders(store, tables):
+    store.append(*tables)
+    table = store.sales("customer")
+    assert table["orders"].sum() == len(tables[0])
+    assert table["total"].sum() == tables[0]["totalPriceInfo.totalPrice"].sum()
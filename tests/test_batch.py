@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+
+from paperon.batch import import_files, import_paths
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_matches_the_files_one_by_one(make_csv, workers):
+    a, b = make_csv(20, seed=1), make_csv(30, seed=2, encoding="cp932")
+    done = []
+    batch = import_files([("b.csv", b), ("a.csv", a), ("a2.csv", a), ("bad.csv", b"\x81\xff" * 50)],
+                         max_workers=workers, on_file_done=lambda n, total, res: done.append((n, total)))
+    assert sorted(done) == [(n, 4) for n in range(1, 5)]
+    status = {f.name: f.status for f in batch.files}
+    assert status == {"a.csv": "ok", "a2.csv": "duplicate", "b.csv": "ok", "bad.csv": "error"}
+    singles = [import_files([(n, d)], max_workers=1) for n, d in (("a.csv", a), ("b.csv", b))]
+    assert len(batch.items) == sum(len(s.items) for s in singles)
+    assert sorted(batch.orders["orderId"]) == sorted(pd.concat([s.orders for s in singles])["orderId"].unique())
+
+
+def test_already_registered_files_are_skipped(make_csv, tmp_path):
+    (tmp_path / "a.csv").write_bytes(make_csv(10, seed=1))
+    (tmp_path / "b.csv").write_bytes(make_csv(10, seed=2))
+    first = import_paths([str(tmp_path)], max_workers=1)
+    known = set(first.sources)
+    again = import_paths([str(tmp_path)], max_workers=1, skip_key=known.__contains__)
+    assert len(known) == 2 and {f.status for f in again.files} == {"registered"} and len(again.items) == 0
@@ -0,0 +1,36 @@
+import io
+
+import pandas as pd
+
+from paperon.cache import ResultCache, content_key, nbytes
+
+
+def test_content_key_follows_the_bytes(make_csv):
+    data = make_csv(5)
+    assert content_key(io.BytesIO(data)) == content_key(io.BytesIO(bytes(data)))
+    assert content_key(io.BytesIO(data)) != content_key(io.BytesIO(data + b"\n"))
+
+
+def test_content_key_leaves_the_file_position_alone():
+    f = io.BufferedReader(io.BytesIO(b"abc"))
+    content_key(f)
+    assert f.read() == b"abc"
+
+
+def test_cache_computes_once():
+    cache, calls = ResultCache(), []
+    compute = lambda: calls.append(1) or pd.DataFrame({"a": range(10)})
+    first = cache.get_or_compute("k", compute)
+    assert cache.get_or_compute("k", compute) is first
+    assert len(calls) == 1 and (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_evicts_least_recently_used():
+    frame = pd.DataFrame({"a": range(1000)})
+    cache = ResultCache(max_bytes=nbytes(frame) * 2)
+    cache.put("a", frame)
+    cache.put("b", frame.copy())
+    cache.get("a")
+    cache.put("c", frame.copy())
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.size <= cache.max_bytes
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+import paperon
+from paperon.cli import main
+from paperon.db import SqliteOrderStore
+
+
+def test_cli_writes_tables_and_appends_to_a_db(make_csv, tmp_path):
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "a.csv").write_bytes(make_csv(12, seed=1))
+    (tmp_path / "in" / "b.csv").write_bytes(make_csv(8, seed=2, encoding="cp932"))
+    db = str(tmp_path / "orders.db")
+    args = [str(tmp_path / "in"), "-o", str(tmp_path / "out"), "--db", db, "-j", "1", "-q"]
+    assert main(args) == 0
+    items = pd.read_csv(tmp_path / "out" / "OrderItems.csv", encoding="utf-8-sig")
+    assert len(items) == len(SqliteOrderStore(db).items_frame()) == 20 * 5
+    assert main(args) == 0  # the same files again: skipped, nothing appended twice
+    assert len(SqliteOrderStore(db).items_frame()) == 20 * 5
+
+
+def test_cli_needs_an_output(tmp_path):
+    with pytest.raises(SystemExit):
+        main([str(tmp_path)])
+
+
+def test_cli_names_a_missing_writer_library(make_csv, tmp_path, monkeypatch, capsys):
+    (tmp_path / "a.csv").write_bytes(make_csv(4))
+    monkeypatch.setattr("paperon.export.missing_formats", lambda: {"parquet": "pyarrow"})
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / "a.csv"), "-o", str(tmp_path / "out"), "-f", "parquet", "-q"])
+    assert "pyarrow" in capsys.readouterr().err
+    assert not (tmp_path / "out").exists()
+
+
+def test_package_api_is_lazy():
+    assert "normalize_tables" in paperon.__all__
+    assert paperon.normalize_tables is paperon.normalize.normalize_tables
@@ -0,0 +1,42 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from paperon.compact import Segment
+from paperon.ingest import read_normalized_csv
+
+
+def _items(make_csv):
+    # 400 rows: above the size under which batches are stored as they are
+    return read_normalized_csv(io.BytesIO(make_csv(80)), "utf-8-sig")[1].reset_index(drop=True)
+
+
+def test_segment_round_trip(make_csv, same_values):
+    items = _items(make_csv)
+    seg = Segment(items)
+    assert list(seg.frame().columns) == list(items.columns)
+    same_values(seg.frame(), items)
+    pos = np.array([5, 0, 399, 17])
+    same_values(seg.take(pos), items.take(pos))
+    same_values(seg.slice(10, 20), items.iloc[10:20])
+
+
+def test_segment_is_smaller(make_csv):
+    items = _items(make_csv)
+    assert Segment(items).memory_usage() < items.memory_usage(deep=True).sum() / 3
+
+
+def test_store_reads_back_what_it_was_given(store, make_csv, same_values):
+    orders, items = read_normalized_csv(io.BytesIO(make_csv(80)), "utf-8-sig")
+    store.append(orders, items)
+    same_values(store.items_frame(), items)
+    oid = orders["orderId"].iloc[9]
+    same_values(store.order_items(oid), items[items["orderId"] == oid])
+
+
+def test_all_na_text_column(make_csv):
+    items = _items(make_csv)
+    items["items.note"] = pd.Series([None] * len(items), dtype=object)
+    out = Segment(items).take(np.array([0, 3]))
+    assert out["items.note"].isna().all()
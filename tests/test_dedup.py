@@ -0,0 +1,97 @@
+import pytest
+
+from benchmarks.synth import synth_frame
+from paperon import normalize
+from paperon.batch import import_files
+from paperon.dedup import BloomFilter, register
+from paperon.normalize import WIDE_ID_HEX, normalize_tables
+
+
+@pytest.fixture
+def tiny_ids(monkeypatch):
+    # 16 possible narrow IDs: a few dozen orders are bound to collide
+    monkeypatch.setattr(normalize, "ID_HEX", 1)
+
+
+def _collided(raw):
+    """(orders, items) of ``raw`` and the orderId of one order widened inside it."""
+    orders, items = normalize_tables(raw)
+    wide = orders["orderId"][orders["orderId"].str.len() == len("ORD-") + WIDE_ID_HEX]
+    assert len(wide)
+    return orders, items, wide.iloc[0]
+
+
+def _file_of(raw, items, order_id):
+    return raw.loc[items.index[items["orderId"] == order_id]]
+
+
+@pytest.mark.parametrize("policy", ["skip", "merge", "replace"])
+def test_reimport_policies(store, tables, policy):
+    orders, items = tables
+    register(store, orders, items)
+    oid = orders["orderId"].iloc[0]
+    store.update_order(oid, {"orderer.personName": "編集済み"})
+    first = items[items["orderId"] == oid].index[0]
+    store.replace_items(oid, store.order_items(oid).iloc[1:])  # the re-import has one item the store lacks
+    report = register(store, orders, items, policy=policy)
+    assert sorted(report.duplicates) == sorted(orders["orderId"]) and report.new == 0
+    assert len(store.orders_frame()) == len(orders)
+    n_items = len(store.items_frame())
+    if policy == "skip":
+        assert n_items == len(items) - 1 and store.get_order(oid)["orderer.personName"] == "編集済み"
+    elif policy == "merge":
+        assert report.merged_items == 1 and n_items == len(items)
+        assert items.loc[first, "items.name"] in set(store.order_items(oid)["items.name"])
+    else:
+        assert n_items == len(items) and store.get_order(oid)["orderer.personName"] != "編集済み"
+
+
+def test_same_id_different_key_is_rekeyed(store, tables):
+    orders, items = tables
+    register(store, orders, items)
+    oid = orders["orderId"].iloc[0]
+    other = orders[orders["orderId"] == oid].assign(**{"orderer.personName": "別人"})
+    report = register(store, other, items[items["orderId"] == oid])
+    wide = report.collisions[oid]
+    assert wide != oid and report.new == 1 and not report.duplicates
+    assert store.get_order(wide)["orderer.personName"] == "別人"
+    assert store.get_order(oid)["orderer.personName"] != "別人"
+
+
+def test_unknown_policy(store, tables):
+    with pytest.raises(ValueError):
+        register(store, *tables, policy="keep")
+
+
+def test_bloom_filter_has_no_false_negatives():
+    keys = [f"ORD-{i:08X}" for i in range(5000)]
+    bloom = BloomFilter(5000)
+    bloom.add(keys)
+    assert bloom.might_contain(keys).all()
+    assert bloom.might_contain([f"X-{i}" for i in range(5000)]).mean() < 0.05
+
+
+def test_collided_order_reimported_from_another_file(store, tiny_ids):
+    raw = synth_frame(40)
+    orders, items, wide = _collided(raw)
+    register(store, orders, items)
+    n_orders, n_items = len(store.orders_frame()), len(store.items_frame())
+
+    again = normalize_tables(_file_of(raw, items, wide))
+    assert again[0]["orderId"].iloc[0] != wide  # alone in its file it keeps the narrow ID
+    report = register(store, *again)
+    assert report.duplicates == [wide] and report.new == 0
+    assert report.collisions == {again[0]["orderId"].iloc[0]: wide}
+    assert len(store.orders_frame()) == n_orders and len(store.items_frame()) == n_items
+
+
+def test_collided_order_across_batch_files(tiny_ids):
+    raw = synth_frame(40)
+    orders, items, wide = _collided(raw)
+    single = _file_of(raw, items, wide)
+    narrow = normalize_tables(single)[0]["orderId"].iloc[0]
+    files = [(name, frame.to_csv(index=False).encode("utf-8")) for name, frame in [("a.csv", raw), ("b.csv", single)]]
+    batch = import_files(files, max_workers=1)
+    assert batch.collisions == {("b.csv", narrow): wide}
+    assert sorted(batch.orders["orderId"]) == sorted(orders["orderId"])
+    assert len(batch.items) == len(items)
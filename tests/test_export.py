@@ -0,0 +1,58 @@
+import gc
+import io
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+
+from paperon import export
+from paperon.export import FORMATS, TempExport, export_store, export_to_tempfile, missing_formats
+
+
+def _read_back(path, fmt):
+    if fmt == "xlsx":
+        sheets = pd.read_excel(path, sheet_name=None)
+        return sheets["Orders"], sheets["OrderItems"]
+    read = {"csv": lambda f: pd.read_csv(f, encoding="utf-8-sig"), "parquet": pd.read_parquet}[fmt]
+    with zipfile.ZipFile(path) as z:
+        return tuple(read(io.BytesIO(z.read(f"{name}.{fmt}"))) for name in ("Orders", "OrderItems"))
+
+
+@pytest.mark.parametrize("fmt", list(FORMATS))
+def test_export_writes_every_row(store, tables, tmp_path, fmt):
+    orders, items = tables
+    store.append(orders, items)
+    path = export_store(store, str(tmp_path / FORMATS[fmt][0]), fmt, batch_size=7)
+    got_orders, got_items = _read_back(path, fmt)
+    assert sorted(got_orders["orderId"]) == sorted(orders["orderId"])
+    assert len(got_items) == len(items)
+    assert got_items["items.taxExcludedPrice"].astype(float).sum() == items["items.taxExcludedPrice"].astype(float).sum()
+
+
+def test_export_to_tempfile(store, tables):
+    store.append(*tables)
+    path = export_to_tempfile(store, "csv")
+    try:
+        assert len(_read_back(path, "csv")[1]) == len(tables[1])
+    finally:
+        os.remove(path)
+
+
+def test_temp_export_is_removed_with_its_owner(store, tables):
+    store.append(*tables)
+    exp = TempExport(store, "csv")
+    path = exp.path
+    assert len(_read_back(path, "csv")[1]) == len(tables[1])
+    exp.remove()
+    assert not os.path.exists(path)
+
+    path = TempExport(store, "csv").path
+    gc.collect()
+    assert not os.path.exists(path)
+
+
+def test_missing_formats(monkeypatch):
+    assert missing_formats() == {}
+    monkeypatch.setitem(export._REQUIRES, "parquet", "no_such_parquet_library")
+    assert missing_formats() == {"parquet": "no_such_parquet_library"}
@@ -0,0 +1,65 @@
+import io
+
+import pandas as pd
+import pytest
+
+from benchmarks.bench_normalize import normalize_tables_rowwise
+from paperon.ingest import TextSource, decode_upload, read_normalized_csv
+from paperon.normalize import normalize_tables
+
+
+def _missing_as_none(df):
+    # NaN vs pd.NA in all-empty passthrough columns is not a difference
+    df = df.reset_index(drop=True).astype(object)
+    return df.where(df.notna(), None)
+
+
+@pytest.mark.parametrize("chunksize", [7, 1000])
+@pytest.mark.parametrize("money, header_rows", [("yen", "first"), ("yen", "all"), ("plain", "first"), ("plain", "all")])
+def test_streaming_matches_whole_frame(make_csv, read_frame, money, header_rows, chunksize):
+    data = make_csv(60, money=money, header_rows=header_rows)
+    orders, items = normalize_tables(read_frame(data))
+    s_orders, s_items = read_normalized_csv(io.BytesIO(data), "utf-8-sig", chunksize=chunksize)
+    pd.testing.assert_frame_equal(orders.reset_index(drop=True), s_orders.reset_index(drop=True))
+    pd.testing.assert_frame_equal(_missing_as_none(items), _missing_as_none(s_items))
+
+
+@pytest.mark.parametrize("chunksize", [7, 1000])
+@pytest.mark.parametrize("money, header_rows", [("yen", "first"), ("plain", "first"), ("plain", "all")])
+def test_streaming_matches_the_original_app(make_csv, read_frame, money, header_rows, chunksize):
+    # golden output: the row-wise normalize_tables the app shipped with
+    data = make_csv(60, money=money, header_rows=header_rows)
+    want_orders, want_items = normalize_tables_rowwise(read_frame(data))
+    orders, items = read_normalized_csv(io.BytesIO(data), "utf-8-sig", chunksize=chunksize)
+    pd.testing.assert_frame_equal(want_orders, orders.reset_index(drop=True))
+    pd.testing.assert_frame_equal(_missing_as_none(want_items), _missing_as_none(items))
+    assert (orders["totalPriceInfo.totalPrice"].dtype.kind == "f") == (money == "plain" and header_rows == "first")
+
+
+def test_progress_reaches_the_end(make_csv):
+    seen = []
+    read_normalized_csv(io.BytesIO(make_csv(30)), "utf-8-sig", chunksize=20, on_progress=lambda frac, _: seen.append(frac))
+    assert len(seen) == 8 and seen == sorted(seen) and seen[-1] == 1.0
+
+
+@pytest.mark.parametrize("encoding, detected", [("utf-8-sig", "utf-8-sig"), ("utf-8", "utf-8"), ("cp932", "cp932")])
+def test_decode_upload(make_csv, encoding, detected):
+    data = make_csv(20, encoding=encoding)
+    assert decode_upload(io.BytesIO(data)) == (detected, data.decode(encoding))
+
+
+def test_decode_upload_sees_late_cp932_bytes():
+    # the sample looks like UTF-8; only the full decode finds the Shift_JIS tail
+    data = b"a,b\n" + b"1,2\n" * 40_000 + "3,得意先\n".encode("cp932")
+    assert decode_upload(io.BytesIO(data))[0] == "cp932"
+
+
+def test_decode_upload_gives_up_on_binary():
+    assert decode_upload(io.BytesIO(b"\x81\xff" * 100)) == (None, None)
+
+
+def test_text_source_reads_like_a_file(make_csv):
+    text = make_csv(10).decode("utf-8-sig")
+    orders, items = read_normalized_csv(TextSource(text), chunksize=9)
+    s_orders, _ = read_normalized_csv(io.StringIO(text), chunksize=9)
+    pd.testing.assert_frame_equal(orders, s_orders)
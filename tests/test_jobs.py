@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from paperon.jobs import JobQueue, csv_import_job
+
+
+@pytest.fixture
+def queue():
+    q = JobQueue()
+    yield q
+    q.shutdown()
+
+
+def _wait(job, timeout=30):
+    for _ in range(timeout * 100):
+        if not job.active:
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError(f"job {job.id} still {job.status}")
+
+
+def test_import_job_registers_once(queue, store, make_csv):
+    data = make_csv()
+    job = _wait(queue.submit("a.csv", csv_import_job(store, data)))
+    assert job.status == "done" and job.progress == 1.0
+    assert job.orders == len(store) and job.items > 0
+    again = _wait(queue.submit("a.csv", csv_import_job(store, data)))
+    assert again.status == "skipped"
+    assert len(store) == job.orders
+
+
+def test_failed_job_leaves_the_store_untouched(queue, store):
+    job = _wait(queue.submit("bad.csv", csv_import_job(store, b"\x00\xff\xfe" * 50)))
+    assert job.status == "error" and job.error
+    assert len(store) == 0
+
+
+def test_cancel_before_start(queue, store, make_csv):
+    gate = threading.Event()
+    blocker = queue.submit("wait", lambda job: gate.wait(5))
+    job = queue.submit("a.csv", csv_import_job(store, make_csv()))
+    queue.cancel(job.id)
+    gate.set()
+    assert _wait(job).status == "cancelled"
+    assert _wait(blocker).status == "done"
+    assert len(store) == 0
+
+
+def test_forget_keeps_active_jobs(queue):
+    gate = threading.Event()
+    job = queue.submit("wait", lambda job: gate.wait(5))
+    queue.forget(job.id)
+    assert queue.get(job.id) is job
+    gate.set()
+    _wait(job)
+    queue.forget(job.id)
+    assert queue.get(job.id) is None
@@ -0,0 +1,39 @@
+import pandas as pd
+
+from paperon.db import SqliteOrderStore
+from paperon.kpi import CUSTOMER_COL, TOTAL_COL
+
+
+def _recount(store):
+    orders = store.orders_frame()
+    if not len(orders):
+        return {"orders": 0, "total_amount": 0.0, "top_customer": None, "top_customer_orders": 0}
+    counts = orders[CUSTOMER_COL].value_counts()
+    return {"orders": len(orders), "total_amount": float(pd.to_numeric(orders[TOTAL_COL], errors="coerce").fillna(0).sum()),
+            "top_customer": min(counts[counts == counts.max()].index), "top_customer_orders": int(counts.max())}
+
+
+def test_summary_follows_every_write(store, tables):
+    orders, items = tables
+    store.append(orders, items)
+    assert store.summary() == _recount(store)
+    ids = orders["orderId"].tolist()
+    for oid in ids[:6]:
+        store.update_order(oid, {CUSTOMER_COL: "大口得意先"})
+    store.update_order(ids[7], {TOTAL_COL: 1_000_000})
+    assert store.summary() == _recount(store)
+    assert store.summary()["top_customer"] == "大口得意先"
+    for oid in ids[:4]:
+        store.delete(oid)
+    assert store.summary() == _recount(store)
+    store.clear()
+    assert store.summary() == _recount(store) and store.summary()["orders"] == 0
+
+
+def test_sqlite_summary_sees_other_connections(tmp_path, tables):
+    path = str(tmp_path / "orders.db")
+    a, b = SqliteOrderStore(path), SqliteOrderStore(path)
+    a.append(*tables)
+    a.summary()
+    b.delete(tables[0]["orderId"].iloc[0])
+    assert a.summary() == _recount(a) and a.summary()["orders"] == len(tables[0]) - 1
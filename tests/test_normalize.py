@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+
+from benchmarks.bench_normalize import normalize_tables_rowwise
+from paperon.normalize import normalize_tables
+
+
+@pytest.mark.parametrize("money", ["yen", "plain"])
+@pytest.mark.parametrize("header_rows", ["first", "all"])
+def test_matches_rowwise_implementation(make_csv, read_frame, header_rows, money):
+    raw = read_frame(make_csv(60, money=money, header_rows=header_rows))
+    orders, items = normalize_tables(raw)
+    want_orders, want_items = normalize_tables_rowwise(raw)
+    pd.testing.assert_frame_equal(orders, want_orders)
+    pd.testing.assert_frame_equal(items, want_items)
+
+
+def test_one_order_per_key(make_csv, read_frame):
+    orders, items = normalize_tables(read_frame(make_csv(30)))
+    assert orders["orderId"].is_unique and len(orders) == 30
+    assert set(items["orderId"]) == set(orders["orderId"])
+    assert orders["orderId"].str.fullmatch(r"ORD-[0-9A-F]{8}").all()
+
+
+def test_missing_item_name_column():
+    with pytest.raises(ValueError):
+        normalize_tables(pd.DataFrame({"orderer.companyName": ["A"]}))
@@ -0,0 +1,30 @@
+import io
+import json
+
+from paperon.ingest import read_normalized_csv
+from paperon.profiling import Profiler, active, stage
+
+
+def test_stages_are_a_no_op_without_a_profiler():
+    with stage("x", 10) as info:
+        info["rows"] = 5
+    assert active() is None
+
+
+def test_profiler_sums_stages_per_name(make_csv):
+    with Profiler("upload", memory=True) as prof:
+        read_normalized_csv(io.BytesIO(make_csv(30)), "utf-8-sig", chunksize=40)
+    recs = {r["stage"]: r for r in prof.records()}
+    assert recs["parse"]["calls"] == 5 and recs["parse"]["rows"] == 150
+    assert recs["total"]["seconds"] >= recs["parse"]["seconds"]
+    assert recs["parse"]["peak_mb"] is not None
+    assert all(json.loads(line)["run"] == "upload" for line in prof.to_jsonl().splitlines())
+
+
+def test_nested_stages():
+    with Profiler() as prof:
+        with stage("outer"):
+            with stage("inner", 3):
+                pass
+    recs = {r["stage"]: r for r in prof.records()}
+    assert recs["inner"]["rows"] == 3 and recs["outer"]["seconds"] >= recs["inner"]["seconds"]
@@ -0,0 +1,132 @@
+import pandas as pd
+import pytest
+
+from paperon.db import SqliteOrderStore
+from paperon.recalc import bulk_update, save_order_items, save_order_patch
+from paperon.store import ConflictError, OrderStore
+
+
+def test_save_recalculates_line_prices_and_totals(store, tables):
+    store.append(*tables)
+    oid = tables[0]["orderId"].iloc[0]
+    items = store.order_items(oid)
+    items.loc[0, "items.count"] = 10
+    totals = save_order_items(store, oid, items, 0.1)
+    saved = store.order_items(oid)
+    assert saved.loc[0, "items.taxExcludedPrice"] == saved.loc[0, "items.taxExcludedUnitPrice"] * 10
+    assert totals["totalPriceInfo.subTotalPrice"] == saved["items.taxExcludedPrice"].sum()
+    assert store.get_order(oid)["totalPriceInfo.totalPrice"] == totals["totalPriceInfo.totalPrice"]
+
+
+def test_stale_revision_is_rejected(store, tables):
+    store.append(*tables)
+    oid = tables[0]["orderId"].iloc[0]
+    seen = store.order_revision(oid)
+    save_order_items(store, oid, store.order_items(oid), 0.1, expected_revision=seen)  # someone else saves first
+    assert store.order_revision(oid) != seen
+    before = store.order_items(oid)
+    with pytest.raises(ConflictError):
+        save_order_items(store, oid, before.head(1), 0.1, expected_revision=seen)
+    assert len(store.order_items(oid)) == len(before)
+
+
+def test_revisions_are_shared_between_connections(tmp_path, tables):
+    path = str(tmp_path / "orders.db")
+    a, b = SqliteOrderStore(path), SqliteOrderStore(path)
+    a.append(*tables)
+    oid = tables[0]["orderId"].iloc[0]
+    seen = b.order_revision(oid)
+    a.update_order(oid, {"orderer.personName": "別の人"})
+    with pytest.raises(ConflictError):
+        save_order_items(b, oid, b.order_items(oid), 0.1, expected_revision=seen)
+
+
+def test_bulk_reprice_rewrites_matching_items(store, tables):
+    store.append(*tables)
+    ids = list(tables[0]["orderId"])
+    num = store.order_items(ids[0])["items.num"].iloc[0]
+    hit = set(store.items_frame().query("`items.num` == @num")["orderId"])
+    res = bulk_update(store, ids, prices={num: 1})
+    assert res["orders"] == len(hit) and res["total_after"] < res["total_before"]
+    for oid in hit:
+        items = store.order_items(oid)
+        assert (items.loc[items["items.num"] == num, "items.taxExcludedUnitPrice"] == 1).all()
+        assert store.get_order(oid)["totalPriceInfo.subTotalPrice"] == items["items.taxExcludedPrice"].sum()
+
+
+def test_bulk_dry_run_writes_nothing(store, tables, same_values):
+    store.append(*tables)
+    ids = list(tables[0]["orderId"])
+    before = store.orders_frame(), store.items_frame()
+    res = bulk_update(store, ids, discount=0.5, dry_run=True)
+    assert res["orders"] == len(ids)
+    same_values(store.orders_frame(), before[0])
+    same_values(store.items_frame(), before[1])
+
+
+def test_bulk_dry_run_leaves_the_shared_version_alone(tmp_path, tables):
+    db = SqliteOrderStore(str(tmp_path / "orders.db"))
+    db.append(*tables)
+    version = db.version
+    bulk_update(db, list(tables[0]["orderId"]), discount=0.5, dry_run=True)
+    assert db.version == version
+
+
+def test_bulk_current_rates_change_nothing(store, tables):
+    store.append(*tables)
+    ids = list(tables[0]["orderId"])
+    before = store.orders_frame()
+    assert bulk_update(store, ids, tax_rates={"08": 0.08, "10": 0.10}, dry_run=True)["orders"] == 0
+    assert bulk_update(store, ids, tax_rates={"08": 0.08, "10": 0.10})["orders"] == 0
+    assert store.orders_frame().equals(before)
+
+
+def test_bulk_new_rate_moves_every_order(store, tables):
+    store.append(*tables)
+    ids = list(tables[0]["orderId"])
+    res = bulk_update(store, ids, tax_rates={"10": 0.11}, dry_run=True)
+    assert res["orders"] == len(ids) and res["items"] == 0
+    assert res["total_after"] > res["total_before"]
+
+
+def _edit(store, order_id):
+    items = store.order_items(order_id)
+    added = items.iloc[[0]].drop(columns="orderId").assign(**{"items.count": 3})
+    updates = {1: {"items.count": 7}}
+    full = items.copy()
+    full.loc[1, "items.count"] = 7
+    full = pd.concat([full.drop(index=2), added.assign(orderId=order_id)], ignore_index=True)
+    return updates, added, [2], full
+
+
+def test_patch_save_matches_full_save(tables, same_values):
+    stores = [OrderStore(), OrderStore()]
+    for s in stores:
+        s.append(*tables)
+    order_id = tables[0]["orderId"].iloc[3]
+    updates, added, deleted, full = _edit(stores[0], order_id)
+    patched = save_order_patch(stores[0], order_id, 0.1, updates, added, deleted)
+    saved = save_order_items(stores[1], order_id, full, 0.1)
+    assert patched == pytest.approx(saved)
+    same_values(stores[0].order_items(order_id), stores[1].order_items(order_id))
+    assert stores[0].get_order(order_id) == stores[1].get_order(order_id)
+
+
+def test_patch_save_checks_the_revision(store, tables):
+    store.append(*tables)
+    order_id = tables[0]["orderId"].iloc[0]
+    seen = store.order_revision(order_id)
+    save_order_patch(store, order_id, 0.1, {0: {"items.count": 2}}, expected_revision=seen)
+    with pytest.raises(ConflictError):
+        save_order_patch(store, order_id, 0.1, {0: {"items.count": 3}}, expected_revision=seen)
+    assert store.order_items(order_id)["items.count"].iloc[0] == 2
+
+
+def test_patch_save_totals_the_items_like_bulk_update(store, tables):
+    store.append(*tables)
+    order_id = tables[0]["orderId"].iloc[0]
+    header = store.get_order(order_id)
+    store.update_order(order_id, {"totalPriceInfo.subTotalPrice": header["totalPriceInfo.subTotalPrice"] - 100})
+    totals = save_order_patch(store, order_id, 0.1, deleted=[0])
+    assert totals["totalPriceInfo.subTotalPrice"] == store.order_items(order_id)["items.taxExcludedPrice"].sum()
+    assert store.get_order(order_id)["totalPriceInfo.subTotalPrice"] == totals["totalPriceInfo.subTotalPrice"]
@@ -0,0 +1,59 @@
+import unicodedata
+
+import pandas as pd
+import pytest
+
+from paperon.search import FIELDS, has_conditions
+
+
+def _fold(v):
+    return unicodedata.normalize("NFKC", str(v)).lower()
+
+
+def _brute(store, text, min_total=None, max_total=None):
+    # every order whose fields (header or any item) contain each word, then the total range
+    orders, items = store.orders_frame(), store.items_frame()
+    texts = {}
+    for frame in (orders, items):
+        for col in FIELDS.values():
+            if col in frame.columns:
+                for oid, v in zip(frame["orderId"], frame[col]):
+                    if pd.notna(v):
+                        texts.setdefault(oid, []).append(_fold(v))
+    hits = set(orders["orderId"])
+    for word in _fold(text).split():
+        hits = {oid for oid in hits if any(word in t for t in texts.get(oid, ()))}
+    totals = dict(zip(orders["orderId"], pd.to_numeric(orders["totalPriceInfo.totalPrice"], errors="coerce")))
+    if min_total is not None:
+        hits = {oid for oid in hits if totals[oid] >= min_total}
+    if max_total is not None:
+        hits = {oid for oid in hits if totals[oid] <= max_total}
+    return hits
+
+
+QUERIES = [("得意先1", None, None), ("商品", 150000, None), ("ｐ－０００１", None, None), ("担当 得意先", None, 120000), ("", 100000, 200000), ("該当なし", None, None)]
+
+
+@pytest.mark.parametrize("text,lo,hi", QUERIES)
+def test_search_matches_brute_force(store, tables, text, lo, hi):
+    store.append(*tables)
+    store.search("x")  # build the index first, so the writes below go through it
+    oid, other = tables[0]["orderId"].iloc[:2]
+    items = store.order_items(oid)
+    items.loc[0, "items.name"] = "差し替え商品"
+    store.replace_items(oid, items)
+    store.update_order(other, {"orderer.companyName": "得意先１２３"})
+    store.delete_orders(list(tables[0]["orderId"].iloc[-3:]))
+    assert store.search(text, min_total=lo, max_total=hi) == _brute(store, text, lo, hi)
+
+
+def test_no_condition_skips_the_index(store, tables, monkeypatch):
+    store.append(*tables)
+    for module in ("paperon.store", "paperon.db"):
+        monkeypatch.setattr(f"{module}.SearchIndex", None)  # building one would fail
+    assert store.search("  ") is None
+
+
+def test_has_conditions():
+    assert not has_conditions() and not has_conditions(" \u3000")
+    assert has_conditions("a") and has_conditions(min_total=0) and has_conditions(max_total=0)
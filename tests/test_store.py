@@ -0,0 +1,128 @@
+from paperon.db import SqliteOrderStore
+from paperon.store import OrderStore
+
+
+def _load(store, tables):
+    store.append(*tables)
+    return tables
+
+
+def test_append_keeps_orders_and_items(store, tables, same_values):
+    orders, items = _load(store, tables)
+    assert len(store) == len(orders) and set(store.order_ids()) == set(orders["orderId"])
+    same_values(store.orders_frame().sort_values("orderId"), orders.sort_values("orderId"))
+    same_values(store.items_frame(), items)
+
+
+def test_order_items_and_header(store, tables, same_values):
+    orders, items = _load(store, tables)
+    oid = orders["orderId"].iloc[7]
+    same_values(store.order_items(oid), items[items["orderId"] == oid])
+    assert store.get_order(oid)["orderer.companyName"] == orders.set_index("orderId").loc[oid, "orderer.companyName"]
+
+
+def test_replace_items_touches_one_order(store, tables, same_values):
+    orders, items = _load(store, tables)
+    oid, other = orders["orderId"].iloc[:2]
+    new = items[items["orderId"] == other].head(2).drop(columns="orderId")
+    store.replace_items(oid, new)
+    same_values(store.order_items(oid), new.assign(orderId=oid)[items.columns])
+    same_values(store.order_items(other), items[items["orderId"] == other])
+    assert len(store.items_frame()) == len(items) - (items["orderId"] == oid).sum() + 2
+
+
+def test_delete(store, tables):
+    orders, items = _load(store, tables)
+    oid = orders["orderId"].iloc[3]
+    store.delete(oid)
+    assert oid not in store.order_ids() and len(store) == len(orders) - 1
+    assert oid not in set(store.items_frame()["orderId"])
+    assert len(store.order_items(oid)) == 0
+
+
+def test_items_for_a_known_order_are_added_to_it(store, tables):
+    orders, items = _load(store, tables)
+    oid = orders["orderId"].iloc[0]
+    extra = items[items["orderId"] == oid].head(1)
+    store.append(orders[orders["orderId"] == oid].assign(**{"orderer.personName": "別人"}), extra)
+    assert len(store.order_items(oid)) == (items["orderId"] == oid).sum() + 1
+    assert store.get_order(oid)["orderer.personName"] != "別人"
+
+
+def test_many_edits_compact_without_losing_rows(store, tables, same_values):
+    orders, items = _load(store, tables)
+    for _ in range(3):
+        for oid in orders["orderId"]:
+            store.replace_items(oid, store.order_items(oid))
+    assert len(store.items_frame()) == len(items)
+    for oid in orders["orderId"].iloc[:5]:
+        same_values(store.order_items(oid), items[items["orderId"] == oid])
+
+
+def test_reads_with_an_all_na_column_do_not_warn(store, tables, recwarn):
+    orders, items = tables
+    half = orders["orderId"].iloc[:20]
+    first = items["orderId"].isin(half)
+    store.append(orders[orders["orderId"].isin(half)], items[first].assign(**{"items.discount": None}))
+    store.append(orders[~orders["orderId"].isin(half)], items[~first].assign(**{"items.discount": 5.5}))
+    assert store.items_frame()["items.discount"].notna().sum() == (~first).sum()
+    store.items_for(list(orders["orderId"]))
+    assert not [w for w in recwarn if issubclass(w.category, FutureWarning)]
+
+
+def test_update_order_adds_an_unknown_order(store, tables):
+    orders, _ = _load(store, tables)
+    store.update_order("ORD-NEW", {"orderer.companyName": "新規得意先", "totalPriceInfo.totalPrice": 1100})
+    assert len(store) == len(orders) + 1 and "ORD-NEW" in store.order_ids()
+    assert store.get_order("ORD-NEW")["orderer.companyName"] == "新規得意先"
+    assert len(store.order_items("ORD-NEW")) == 0
+    assert store.summary()["orders"] == len(orders) + 1
+    assert store.search("新規得意先") == {"ORD-NEW"}
+
+
+def test_query_orders_pages_through_the_sorted_orders(store, tables):
+    orders, _ = _load(store, tables)
+    pages = [store.query_orders(None, "totalPriceInfo.totalPrice", False, offset=o, limit=7) for o in range(0, len(orders), 7)]
+    assert {n for _, n in pages} == {len(orders)}
+    got = [oid for page, _ in pages for oid in page["orderId"]]
+    want = orders.sort_values("totalPriceInfo.totalPrice", ascending=False, kind="stable")["orderId"].tolist()
+    assert got == want
+
+
+def test_query_orders_filters_by_customer(store, tables):
+    orders, _ = _load(store, tables)
+    name = orders["orderer.companyName"].iloc[0]
+    page, n = store.query_orders(name[-3:], limit=100)
+    assert n == orders["orderer.companyName"].str.contains(name[-3:], regex=False).sum() == len(page)
+    assert page["orderer.companyName"].str.contains(name[-3:], regex=False).all()
+
+
+def test_sqlite_store_persists(tmp_path, tables, same_values):
+    path = str(tmp_path / "orders.db")
+    db = SqliteOrderStore(path)
+    orders, items = _load(db, tables)
+    oid = orders["orderId"].iloc[0]
+    db.update_order(oid, {"orderer.personName": "更新後"})
+    db.append(orders.head(0), items.head(0), sources=["upload-1"])
+    db.close()
+    again = SqliteOrderStore(path)
+    assert len(again) == len(orders) and again.has_source("upload-1")
+    assert again.get_order(oid)["orderer.personName"] == "更新後"
+    same_values(again.items_frame(), items)
+
+
+def test_stores_agree(tmp_path, tables, same_values):
+    mem, db = OrderStore(), SqliteOrderStore(str(tmp_path / "orders.db"))
+    for s in (mem, db):
+        orders, items = _load(s, tables)
+        s.replace_items(orders["orderId"].iloc[0], items.head(3).drop(columns="orderId"))
+        s.delete(orders["orderId"].iloc[1])
+        s.update_order(orders["orderId"].iloc[2], {"orderer.companyName": "新得意先"})
+        s.update_order("ORD-NEW", {"orderer.companyName": "新規得意先", "totalPriceInfo.totalPrice": 1100})
+    same_values(mem.orders_frame().sort_values("orderId"), db.orders_frame().sort_values("orderId"))
+    assert mem.summary() == db.summary()
+    for oid in mem.order_ids():
+        same_values(mem.order_items(oid), db.order_items(oid))
+    for args in [(None, "totalPriceInfo.totalPrice", False), ("得意先", "orderer.companyName", True)]:
+        a, b = mem.query_orders(*args, limit=15), db.query_orders(*args, limit=15)
+        assert a[1] == b[1] and a[0]["orderId"].tolist() == b[0]["orderId"].tolist()